@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the task organizer Lambda handler
+Seeds a local moto DynamoDB (or a SQLite task store) with synthetic
+corpora of existing tasks, then sends task requests through
+lambda_handler with a fake Bedrock that has a fixed model latency.
+Reports latency percentiles, DynamoDB capacity units, Bedrock calls and
+prompt tokens per ingested task, and saves the run as JSON so it can be
+compared with earlier runs.
+
+Usage: bench_lambda.py [--sizes 100,1000,10000,100000] [--requests 50] [--batch 1]
+                       [--bedrock-ms 300] [--store dynamodb|sqlite]
+                       [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+for path in (ROOT, ROOT / 'aws'):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+for name, value in (('AWS_DEFAULT_REGION', 'us-east-1'), ('AWS_ACCESS_KEY_ID', 'testing'),
+                    ('AWS_SECRET_ACCESS_KEY', 'testing')):
+    os.environ.setdefault(name, value)
+
+DEFAULT_SIZES = '100,1000,10000'
+DEFAULT_OUTPUT_DIR = ROOT / 'bench_results'
+
+# DynamoDB bills reads per 4 KB and writes per 1 KB
+READ_UNIT_BYTES = 4096
+WRITE_UNIT_BYTES = 1024
+
+# Links returned by the fake model for each link prompt
+LINKS_PER_TASK = 2
+
+VERBS = ['Review', 'Draft', 'Schedule', 'Prepare', 'Update', 'Book', 'Email', 'Plan', 'Fix', 'Buy']
+SUBJECTS = [
+    ('Work', 'quarterly report', 'reporting'),
+    ('Work', 'sprint retro notes', 'team'),
+    ('Work', 'client proposal', 'sales'),
+    ('Projects', 'garden shed plans', 'diy'),
+    ('Projects', 'website redesign', 'web'),
+    ('Personal', 'birthday party', 'family'),
+    ('Personal', 'car insurance renewal', 'admin'),
+    ('Health', 'dentist appointment', 'checkup'),
+    ('Health', 'running schedule', 'fitness'),
+    ('Shopping', 'groceries for the week', 'food'),
+    ('Shopping', 'new running shoes', 'gear'),
+    ('Learning', 'Spanish lesson', 'language'),
+]
+QUALIFIERS = ['', 'before Friday', 'with Sam', 'for next week', 'after the call', 'this weekend']
+
+_EXPRESSION_TOKEN = re.compile(r"#?[A-Za-z_][A-Za-z0-9_]*")
+_EXPRESSION_CLAUSE = re.compile(r"\b(SET|REMOVE|ADD|DELETE)\b", re.IGNORECASE)
+
+def attribute_size(value):
+    """Stored size in bytes of a typed DynamoDB attribute value"""
+    kind, data = next(iter(value.items()))
+    if kind == 'S':
+        return len(data.encode('utf-8'))
+    if kind == 'B':
+        return len(data) * 3 // 4
+    if kind == 'N':
+        digits = data.lstrip('-').replace('.', '').strip('0')
+        return (len(digits) + 1) // 2 + 1
+    if kind in ('BOOL', 'NULL'):
+        return 1
+    if kind == 'L':
+        return 3 + sum(attribute_size(element) + 1 for element in data)
+    if kind == 'M':
+        return 3 + sum(len(name.encode('utf-8')) + attribute_size(element) + 1 for name, element in data.items())
+    if kind == 'SS':
+        return sum(len(element.encode('utf-8')) for element in data)
+    if kind == 'NS':
+        return sum(attribute_size({'N': element}) for element in data)
+    if kind == 'BS':
+        return sum(len(element) * 3 // 4 for element in data)
+    raise ValueError(f"Unknown attribute type: {kind}")
+
+def item_size(item):
+    """Stored size in bytes of a typed DynamoDB item"""
+    return sum(len(name.encode('utf-8')) + attribute_size(value) for name, value in item.items())
+
+def read_units(size, consistent=False):
+    units = max(1, math.ceil(size / READ_UNIT_BYTES))
+    return units if consistent else units / 2
+
+def write_units(size):
+    return max(1, math.ceil(size / WRITE_UNIT_BYTES))
+
+class CapacityMeter:
+    """Estimates the DynamoDB capacity units used by a boto3 session
+    
+    moto reports a flat unit per call, so request and response items are
+    sized here and rounded the way DynamoDB bills them. Every write also
+    costs one write per global secondary index holding the item (all
+    indexes here project every attribute), and items read through a
+    projection are billed at their full stored size when it is known.
+    """
+    
+    def __init__(self):
+        self.key_names = {}
+        self.index_keys = {}
+        self.stored = {}
+        self.reset()
+    
+    def reset(self):
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self.calls = Counter()
+    
+    def attach(self, session):
+        """Meter every DynamoDB client the boto3 session creates from now on"""
+        session.events.register('before-call.dynamodb', self.before_call)
+        session.events.register('after-call.dynamodb', self.after_call)
+    
+    def before_call(self, model, params, context, **kwargs):
+        context['metered_request'] = json.loads(params.get('body') or b'{}')
+    
+    def after_call(self, http_response, model, context, **kwargs):
+        if http_response.status_code >= 300:
+            return
+        request = context.get('metered_request', {})
+        response = json.loads(http_response.content or b'{}')
+        self.calls[model.name] += 1
+        
+        handler = {
+            'CreateTable': self._create_table,
+            'PutItem': self._put_item,
+            'UpdateItem': self._update_item,
+            'DeleteItem': self._delete_item,
+            'BatchWriteItem': self._batch_write,
+            'TransactWriteItems': self._transact_write,
+            'GetItem': self._get_item,
+            'BatchGetItem': self._batch_get,
+            'Query': self._query,
+            'Scan': self._query,
+        }.get(model.name)
+        if handler is not None:
+            handler(request, response)
+    
+    def summary(self, tasks):
+        return {
+            'read_units': round(self.read_units, 1),
+            'write_units': self.write_units,
+            'read_units_per_task': round(self.read_units / tasks, 2),
+            'write_units_per_task': round(self.write_units / tasks, 2),
+            'calls': dict(sorted(self.calls.items()))
+        }
+    
+    def _key(self, table, item):
+        return table, json.dumps([item.get(name) for name in self.key_names.get(table, ())], sort_keys=True)
+    
+    def _indexes_holding(self, table, item):
+        return {
+            index for index, names in self.index_keys.get(table, {}).items()
+            if all(name in item for name in names)
+        }
+    
+    def _create_table(self, request, response):
+        table = request['TableName']
+        self.key_names[table] = [key['AttributeName'] for key in request['KeySchema']]
+        self.index_keys[table] = {
+            index['IndexName']: [key['AttributeName'] for key in index['KeySchema']]
+            for index in request.get('GlobalSecondaryIndexes', [])
+        }
+    
+    def _put(self, table, item, factor=1):
+        key = self._key(table, item)
+        size = item_size(item)
+        _, old_indexes = self.stored.get(key, (0, set()))
+        indexes = self._indexes_holding(table, item)
+        self.stored[key] = (size, indexes)
+        self.write_units += factor * write_units(size) * (1 + len(indexes | old_indexes))
+    
+    def _update(self, table, update, factor=1):
+        key = self._key(table, update['Key'])
+        size, indexes = self.stored.get(key, (item_size(update['Key']), set()))
+        names = update.get('ExpressionAttributeNames', {})
+        
+        # Index membership follows the index key attributes being set or removed
+        touched = set(indexes)
+        clauses = _EXPRESSION_CLAUSE.split(update.get('UpdateExpression', ''))
+        for action, clause in zip(clauses[1::2], clauses[2::2]):
+            attributes = {names.get(token, token) for token in _EXPRESSION_TOKEN.findall(clause)}
+            for index, index_names in self.index_keys.get(table, {}).items():
+                if not attributes & set(index_names):
+                    continue
+                touched.add(index)
+                if action.upper() == 'REMOVE':
+                    indexes = indexes - {index}
+                else:
+                    indexes = indexes | {index}
+        
+        self.stored[key] = (size, indexes)
+        self.write_units += factor * write_units(size) * (1 + len(touched))
+    
+    def _delete(self, table, item_key, factor=1):
+        size, indexes = self.stored.pop(self._key(table, item_key), (item_size(item_key), set()))
+        self.write_units += factor * write_units(size) * (1 + len(indexes))
+    
+    def _put_item(self, request, response):
+        self._put(request['TableName'], request['Item'])
+    
+    def _update_item(self, request, response):
+        self._update(request['TableName'], request)
+    
+    def _delete_item(self, request, response):
+        self._delete(request['TableName'], request['Key'])
+    
+    def _batch_write(self, request, response):
+        unprocessed = response.get('UnprocessedItems') or {}
+        for table, writes in request['RequestItems'].items():
+            for write in writes:
+                if write in unprocessed.get(table, []):
+                    continue
+                if 'PutRequest' in write:
+                    self._put(table, write['PutRequest']['Item'])
+                else:
+                    self._delete(table, write['DeleteRequest']['Key'])
+    
+    def _transact_write(self, request, response):
+        # Transactional writes cost twice as much
+        for entry in request['TransactItems']:
+            if 'Put' in entry:
+                self._put(entry['Put']['TableName'], entry['Put']['Item'], factor=2)
+            elif 'Update' in entry:
+                self._update(entry['Update']['TableName'], entry['Update'], factor=2)
+            elif 'Delete' in entry:
+                self._delete(entry['Delete']['TableName'], entry['Delete']['Key'], factor=2)
+            else:
+                self.read_units += 2
+    
+    def _stored_size(self, table, item):
+        stored = self.stored.get(self._key(table, item))
+        return stored[0] if stored else item_size(item)
+    
+    def _get_item(self, request, response):
+        item = response.get('Item')
+        size = self._stored_size(request['TableName'], item) if item else 0
+        self.read_units += read_units(size, request.get('ConsistentRead', False))
+    
+    def _batch_get(self, request, response):
+        for table, items in response.get('Responses', {}).items():
+            consistent = request['RequestItems'][table].get('ConsistentRead', False)
+            for item in items:
+                self.read_units += read_units(self._stored_size(table, item), consistent)
+    
+    def _query(self, request, response):
+        # Queries and scans are billed on the total size of a page
+        table = request['TableName']
+        size = sum(self._stored_size(table, item) for item in response.get('Items', []))
+        self.read_units += read_units(size, request.get('ConsistentRead', False))
+
+def synthetic_task(rng, i):
+    """Organized task number i of a reproducible synthetic corpus"""
+    category, subject, tag = SUBJECTS[rng.randrange(len(SUBJECTS))]
+    text = f"{rng.choice(VERBS)} {subject} {rng.choice(QUALIFIERS)}".strip() + f" #{i}"
+    return {
+        'task': text,
+        'category': category,
+        'priority': rng.choice(['high', 'medium', 'low']),
+        'estimated_time': rng.choice([15, 30, 45, 60, 90]),
+        'tags': [tag]
+    }
+
+def seed_corpus(store, size, rng, chunk=1000):
+    """Store size synthetic tasks that new tasks can be linked to"""
+    from shared.task_utils import build_task_item
+    
+    for start in range(0, size, chunk):
+        store.put_tasks([
+            build_task_item(f'corpus-{i:06d}', synthetic_task(rng, i), 'bench')
+            for i in range(start, min(size, start + chunk))
+        ])
+
+def bench_responder(prompt):
+    """Model replies for organize, batch organize and link prompts"""
+    if prompt.startswith('Analyze if this new task'):
+        return json.dumps([int(number) for number in re.findall(r"^\[(\d+)\] ", prompt, re.MULTILINE)][:LINKS_PER_TASK])
+    
+    organized = {'category': 'Work', 'priority': 'medium', 'estimated_time': 30, 'tags': ['bench']}
+    if prompt.startswith('Analyze each numbered task'):
+        return json.dumps([
+            dict(organized, index=int(index), task=text)
+            for index, text in re.findall(r"^(\d+)\. (.+)$", prompt, re.MULTILINE)
+        ])
+    return json.dumps(organized)
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+def latency_summary(timings):
+    ordered = sorted(timings)
+    return {
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 1)
+    }
+
+def reset_lambda_state(lambda_function, store_uri):
+    """Drop container-level state so each corpus starts cold"""
+    lambda_function.TASK_STORE = store_uri
+    lambda_function._bedrock_client = None
+    lambda_function._organization_cache = None
+    lambda_function._embedding_state = {}
+    lambda_function._task_store = None
+
+def run_corpus(size, args, workdir):
+    """Seed one corpus and time requests against it"""
+    import boto3
+    from moto import mock_aws
+    
+    import lambda_function
+    from shared.bedrock_client import ResilientBedrockClient
+    from tests.fakes import FakeBedrockClient, create_tables
+    
+    rng = random.Random(args.seed)
+    store_uri = 'dynamodb' if args.store == 'dynamodb' else f'sqlite:{workdir / f"tasks-{size}.sqlite"}'
+    
+    with mock_aws():
+        # moto gives each mock its own default session
+        meter = CapacityMeter()
+        meter.attach(boto3._get_default_session())
+        create_tables(boto3.resource('dynamodb'))
+        reset_lambda_state(lambda_function, store_uri)
+        if args.local_threshold is not None:
+            lambda_function.LOCAL_CONFIDENCE_THRESHOLD = args.local_threshold
+        
+        start = time.perf_counter()
+        seed_corpus(lambda_function.get_task_store(), size, rng)
+        seed_seconds = time.perf_counter() - start
+        
+        bedrock = FakeBedrockClient(bench_responder, latency=args.bedrock_ms / 1000)
+        lambda_function._bedrock_client = ResilientBedrockClient(client=bedrock)
+        meter.reset()
+        
+        timings = []
+        tasks = 0
+        for request in range(args.requests):
+            texts = [synthetic_task(rng, size + tasks + i)['task'] for i in range(args.batch)]
+            body = {'task': texts[0]} if args.batch == 1 else {'tasks': texts}
+            
+            start = time.perf_counter()
+            response = lambda_function.lambda_handler({'body': json.dumps({**body, 'source': 'bench'})}, None)
+            timings.append(time.perf_counter() - start)
+            if response['statusCode'] != 200:
+                raise RuntimeError(f"Request {request} failed: {response['body']}")
+            tasks += len(texts)
+    
+    return {
+        'corpus_size': size,
+        'requests': args.requests,
+        'tasks': tasks,
+        'seed_seconds': round(seed_seconds, 2),
+        'latency': latency_summary(timings),
+        'dynamodb': meter.summary(tasks),
+        'bedrock': {
+            'calls': bedrock.calls,
+            'calls_per_task': round(bedrock.calls / tasks, 2),
+            'prompt_tokens': bedrock.prompt_tokens,
+            'prompt_tokens_per_task': round(bedrock.prompt_tokens / tasks, 1),
+            'output_tokens': bedrock.output_tokens
+        }
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args):
+    """Run every corpus size and return the results document"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"⏱️  {size} existing tasks, {args.requests} requests of {args.batch}", file=sys.stderr)
+            # Lambda log lines would be timed too
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results.append(run_corpus(size, args, Path(workdir)))
+    
+    return {
+        'benchmark': 'lambda_handler',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'config': {
+            'store': args.store,
+            'requests': args.requests,
+            'batch': args.batch,
+            'bedrock_latency_ms': args.bedrock_ms,
+            'local_threshold': args.local_threshold,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+def print_report(document, baseline=None):
+    """Print one line per corpus size, with changes against a baseline run"""
+    previous = {}
+    if baseline is not None:
+        previous = {result['corpus_size']: result for result in baseline['results']}
+    
+    for result in document['results']:
+        latency = result['latency']
+        line = (
+            f"{result['corpus_size']:>7} tasks: p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, "
+            f"p99 {latency['p99_ms']} ms, {result['dynamodb']['read_units_per_task']} RCU + "
+            f"{result['dynamodb']['write_units_per_task']} WCU, {result['bedrock']['calls_per_task']} Bedrock calls, "
+            f"{result['bedrock']['prompt_tokens_per_task']} prompt tokens per task"
+        )
+        print(line)
+        
+        before = previous.get(result['corpus_size'])
+        if before is None:
+            continue
+        changes = []
+        for label, section, field in (('p95', 'latency', 'p95_ms'), ('RCU', 'dynamodb', 'read_units_per_task'),
+                                      ('WCU', 'dynamodb', 'write_units_per_task'),
+                                      ('tokens', 'bedrock', 'prompt_tokens_per_task')):
+            old, new = before[section][field], result[section][field]
+            if old:
+                changes.append(f"{label} {(new - old) / old:+.0%}")
+        print(f"{'':>14}vs baseline: {', '.join(changes)}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lambda_handler against local DynamoDB and fake Bedrock")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        type=lambda value: [int(size) for size in value.split(',')],
+                        help="comma-separated numbers of existing tasks, e.g. 100,1000,10000,100000")
+    parser.add_argument('--requests', type=int, default=50, help="requests timed per corpus")
+    parser.add_argument('--batch', type=int, default=1, help="tasks per request")
+    parser.add_argument('--bedrock-ms', type=float, default=300, help="fake Bedrock latency per call")
+    parser.add_argument('--local-threshold', type=float, default=None,
+                        help="local classifier threshold; above 1 sends every task to Bedrock")
+    parser.add_argument('--store', choices=('dynamodb', 'sqlite'), default='dynamodb')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', type=Path, default=None, help="results file (default: bench_results/)")
+    parser.add_argument('--baseline', type=Path, default=None, help="earlier results file to compare against")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    document = run_benchmark(args)
+    
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = DEFAULT_OUTPUT_DIR / f'lambda-{args.store}-{stamp}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2) + '\n')
+    
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(document, baseline)
+    print(f"💾 Saved results to {output}")
+    return document
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,9 @@ echo "🚀 Deploying Task Organizer to AWS..."
 # Create Lambda deployment package
 echo "📦 Creating Lambda deployment package..."
 cd "$(dirname "$0")"
+rm -f task_organizer.zip
 zip -r task_organizer.zip lambda_function.py
+(cd .. && zip -r aws/task_organizer.zip shared -x '*__pycache__*')
 
 # Deploy with Terraform
 echo "🏗️  Deploying infrastructure with Terraform..."
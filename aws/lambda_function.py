@@ -1,20 +1,126 @@
 import json
+import os
 import boto3
-import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from shared import metrics
+from shared.bedrock_client import CircuitBreaker, Deadline, ResilientBedrockClient
+from shared.changelog import Changelog, change_event
+from shared.link_index import TaskIndex
+from shared.local_classifier import confident_organization
+from shared.organization_cache import create_organization_cache
+from shared.prompts import (
+    ORGANIZE_PROMPT, batch_link_reply_tokens, build_batch_link_prompt, build_link_prompt, build_organize_prompt,
+    link_reply_tokens, max_batch_link_tasks, record_usage
+)
+from shared.link_queue import (
+    LINK_DONE, LINK_FAILED, LINK_PENDING, SQS_MAX_BATCH, SqsLinkQueue, make_link_job
+)
+from shared.task_store import DynamoDBTaskStore, create_task_store
+from shared.task_utils import (
+    TaskOrganizer, fallback_organization, organize_batch, organized_from_item, task_id_for
+)
+
+MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+# Batch ingestion: tasks are classified in chunks that fit a prompt token budget
+BATCH_MAX_TASKS = int(os.environ.get('BATCH_MAX_TASKS', '50'))
+BATCH_PROMPT_TOKEN_BUDGET = int(os.environ.get('BATCH_PROMPT_TOKEN_BUDGET', '2000'))
+
+# Bedrock calls must finish well inside the callers' 10 s timeout
+BEDROCK_BUDGET_SECONDS = float(os.environ.get('BEDROCK_BUDGET_SECONDS', '8'))
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get('BEDROCK_MAX_CONCURRENCY', '4'))
+BEDROCK_FAILURE_THRESHOLD = int(os.environ.get('BEDROCK_FAILURE_THRESHOLD', '5'))
+BEDROCK_RESET_SECONDS = float(os.environ.get('BEDROCK_RESET_SECONDS', '30'))
+
+# Tasks the local classifier is this confident about skip Bedrock; above 1 disables it
+LOCAL_CONFIDENCE_THRESHOLD = float(os.environ.get('LOCAL_CONFIDENCE_THRESHOLD', '0.75'))
+
+# Organization cache; the shared tier is skipped when the table name is empty
+ORGANIZATION_CACHE_TABLE = os.environ.get('ORGANIZATION_CACHE_TABLE', 'task-organization-cache')
+ORGANIZATION_CACHE_SIZE = int(os.environ.get('ORGANIZATION_CACHE_SIZE', '512'))
+ORGANIZATION_CACHE_TTL = int(os.environ.get('ORGANIZATION_CACHE_TTL', str(30 * 24 * 3600)))
+ORGANIZATION_CACHE_SALT = os.environ.get('ORGANIZATION_CACHE_SALT', '')
+
+# Link candidate selection
+LINK_CANDIDATES_K = int(os.environ.get('LINK_CANDIDATES_K', '20'))
+LINK_SCORING = os.environ.get('LINK_SCORING', 'bm25')
+
+# Linking mode: 'bedrock' asks the model about ranked candidates,
+# 'embedding' links by cosine similarity over stored task embeddings
+LINK_MODE = os.environ.get('LINK_MODE', 'bedrock')
+EMBEDDER = os.environ.get('EMBEDDER', 'hashing')
+EMBEDDING_DIMENSION = int(os.environ.get('EMBEDDING_DIMENSION', '256'))
+# Vectors are stored on task items; the search matrix is rebuilt from them this often
+EMBEDDING_REFRESH_SECONDS = float(os.environ.get('EMBEDDING_REFRESH_SECONDS', '60'))
+LINK_SIMILARITY_THRESHOLD = float(os.environ.get('LINK_SIMILARITY_THRESHOLD', '0.35'))
+
+# Asynchronous link discovery; links are found inline when no queue is set
+LINK_QUEUE_URL = os.environ.get('LINK_QUEUE_URL')
+LINK_MAX_ATTEMPTS = int(os.environ.get('LINK_MAX_ATTEMPTS', '3'))
+
+# Change feed written from the tasks table stream
+CHANGELOG_TABLE = os.environ.get('CHANGELOG_TABLE', 'task-changelog')
+
+# Task storage: 'dynamodb', or 'sqlite:PATH' for local bulk runs and benchmarks
+TASK_STORE = os.environ.get('TASK_STORE', 'dynamodb')
+
+# Fields of existing tasks needed for link candidate selection
+LINK_CANDIDATE_FIELDS = ('id', 'task', 'category', 'tags')
+
+# Bedrock client, embedding store, organization cache and task store live as long as the Lambda container
+_bedrock_client = None
+_embedding_state = {}
+_organization_cache = None
+_task_store = None
+
+@metrics.instrument
 def lambda_handler(event, context):
     """Main Lambda handler for task organization"""
+    hits, misses = cache_counts()
+    try:
+        return handle_request(event, context)
+    finally:
+        new_hits, new_misses = cache_counts()
+        metrics.count('CacheHits', new_hits - hits)
+        metrics.count('CacheMisses', new_misses - misses)
+
+def handle_request(event, context):
+    """Organize, store and link the task or tasks in an API request"""
     try:
         body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+        deadline = Deadline.from_context(context, BEDROCK_BUDGET_SECONDS)
+        if 'tasks' in body:
+            return handle_batch(body, deadline)
+        
         new_task = body['task']
         source = body.get('source', 'unknown')
         
-        organized_task = organize_with_bedrock(new_task)
-        task_id = store_task(organized_task, source)
+        task_id = task_id_for(body.get('idempotency_key'))
+        existing = find_stored_tasks([task_id]).get(task_id) if body.get('idempotency_key') else None
+        if existing is not None:
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({
+                    'id': task_id,
+                    'message': 'Task already stored',
+                    'organized_task': existing
+                })
+            }
+        
+        organized_task = organize_with_bedrock(new_task, deadline)
+        metrics.count_organizations([organized_task])
+        
+        link_queue = get_link_queue()
+        task_id = store_task(
+            organized_task, source, link_status=LINK_PENDING if link_queue is not None else None, task_id=task_id
+        )
         
-        # Find and store task links
-        find_and_store_links(task_id, organized_task)
+        # Find and store task links, off the request path when a queue is configured
+        schedule_links(link_queue, task_id, organized_task, deadline)
         
         return {
             'statusCode': 200,
@@ -33,139 +139,524 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def organize_with_bedrock(task):
-    """Use Bedrock to organize and categorize the task"""
-    bedrock = boto3.client('bedrock-runtime')
+def handle_batch(body, deadline=None):
+    """Organize, store and link a list of tasks in bulk"""
+    default_source = body.get('source', 'unknown')
+    
+    texts = []
+    sources = []
+    keys = []
+    for entry in body['tasks']:
+        if isinstance(entry, dict):
+            text, source = entry.get('task', ''), entry.get('source', default_source)
+            key = entry.get('idempotency_key')
+        else:
+            text, source, key = entry, default_source, None
+        if isinstance(text, str) and text.strip():
+            texts.append(text.strip())
+            sources.append(source)
+            keys.append(key)
+    
+    if not texts:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'No tasks provided'})
+        }
+    
+    if len(texts) > BATCH_MAX_TASKS:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'At most {BATCH_MAX_TASKS} tasks per batch'})
+        }
+    
+    # Retried submissions are answered from the tasks stored the first time
+    task_ids = [task_id_for(key) for key in keys]
+    existing = find_stored_tasks([task_id for task_id, key in zip(task_ids, keys) if key])
+    new = [i for i, task_id in enumerate(task_ids) if task_id not in existing]
+    
+    organized_new = []
+    if new:
+        organized_new = organize_batch_with_bedrock([texts[i] for i in new], deadline)
+        metrics.count_organizations(organized_new)
+        
+        link_queue = get_link_queue()
+        store_tasks_batch(
+            organized_new, [sources[i] for i in new],
+            link_status=LINK_PENDING if link_queue is not None else None,
+            task_ids=[task_ids[i] for i in new]
+        )
+        
+        # Link discovery runs once for the whole batch
+        jobs = [make_link_job(task_ids[i], task) for i, task in zip(new, organized_new)]
+        schedule_batch_links(link_queue, jobs, deadline)
+    
+    organized_tasks = [existing.get(task_id) for task_id in task_ids]
+    for i, task in zip(new, organized_new):
+        organized_tasks[i] = task
+    
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({
+            'ids': task_ids,
+            'message': f'{len(new)} tasks organized and stored, {len(task_ids) - len(new)} already stored',
+            'organized_tasks': organized_tasks
+        })
+    }
+
+def find_stored_tasks(task_ids):
+    """Organizations of tasks that are already stored, keyed by ID"""
+    if not task_ids:
+        return {}
     
-    prompt = f"""Analyze this task and return ONLY a JSON object with these fields:
-- "task": the original task text
-- "category": best category (Work, Personal, Projects, Health, Shopping, Learning)
-- "priority": high, medium, or low
-- "estimated_time": estimated minutes as integer
-- "tags": array of relevant tags
+    fields = ('id', 'task', 'category', 'priority', 'estimated_time', 'tags')
+    with metrics.span('TaskGet'):
+        items = get_task_store().get_tasks(task_ids, attributes=fields)
+    return {task_id: organized_from_item(item) for task_id, item in items.items()}
 
-Task: {task}
+@metrics.instrument
+def link_worker_handler(event, context):
+    """Lambda handler that drains a batch of link jobs from SQS"""
+    records = event.get('Records', [])
+    jobs = [json.loads(record['body']) for record in records]
+    results = process_link_jobs(jobs)
+    
+    # Failed jobs are retried by SQS until they run out of attempts
+    failures = []
+    for record, job, linked in zip(records, jobs, results):
+        if linked:
+            continue
+        attempts = int(record.get('attributes', {}).get('ApproximateReceiveCount', '1'))
+        if attempts < LINK_MAX_ATTEMPTS:
+            failures.append({'itemIdentifier': record['messageId']})
+        else:
+            set_link_status(job['task_id'], LINK_FAILED)
+    
+    return {'batchItemFailures': failures}
 
-Return only valid JSON, no other text."""
+def changelog_handler(event, context):
+    """Lambda handler that appends tasks table stream records to the changelog"""
+    events = [change_event(record) for record in event.get('Records', [])]
+    events = [change for change in events if change is not None]
+    
+    # Errors propagate so the stream retries the batch
+    if events:
+        Changelog(boto3.resource('dynamodb').Table(CHANGELOG_TABLE)).append(events)
+    
+    return {'recorded': len(events)}
+
+def get_link_queue():
+    """Return the link job queue, or None when links are found inline"""
+    if not LINK_QUEUE_URL:
+        return None
+    return SqsLinkQueue(LINK_QUEUE_URL)
+
+def schedule_links(link_queue, task_id, organized_task, deadline=None):
+    """Enqueue a link job for the task, or find links inline without a queue
+    
+    Inline link finding shares the request's deadline with organizing.
+    """
+    if link_queue is None:
+        find_and_store_links(task_id, organized_task, deadline=deadline)
+        return
+    
+    try:
+        link_queue.enqueue(make_link_job(task_id, organized_task))
+    except Exception as e:
+        print(f"Link enqueue error: {str(e)}")
+        linked = find_and_store_links(task_id, organized_task, deadline=deadline)
+        set_link_status(task_id, LINK_DONE if linked else LINK_FAILED)
+
+def schedule_batch_links(link_queue, jobs, deadline=None):
+    """Enqueue link jobs for a batch, or find their links inline without a queue
+    
+    Inline link finding uses batched prompts that share the request's deadline.
+    """
+    if link_queue is not None:
+        try:
+            link_queue.enqueue_many(jobs)
+            return
+        except Exception as e:
+            print(f"Link enqueue error: {str(e)}")
+    
+    results = find_and_store_batch_links(jobs, deadline)
+    if link_queue is not None:
+        for job, linked in zip(jobs, results):
+            if not linked:
+                set_link_status(job['task_id'], LINK_FAILED)
+
+def process_link_jobs(jobs):
+    """Find links for a batch of stored tasks, sharing one tasks scan"""
+    if not jobs:
+        return []
+    
+    existing_tasks = None
+    if LINK_MODE != 'embedding':
+        existing_tasks = scan_link_candidates()
+    
+    results = []
+    for job in jobs:
+        linked = find_and_store_links(job['task_id'], job['task'], existing_tasks)
+        if linked:
+            set_link_status(job['task_id'], LINK_DONE)
+        results.append(linked)
+    return results
+
+def find_and_store_batch_links(jobs, deadline=None):
+    """Find links for many new tasks with a few batched Bedrock calls
+    
+    Each call covers as many tasks as its reply budget allows and the calls
+    run concurrently over one tasks scan. Returns whether each job's links
+    were found.
+    """
+    if not jobs:
+        return []
+    if LINK_MODE == 'embedding':
+        return process_link_jobs(jobs)
+    
+    existing_tasks = scan_link_candidates()
+    tasks_by_id = {task['id']: task for task in existing_tasks}
+    with metrics.span('LinkRank'):
+        index = TaskIndex(scoring=LINK_SCORING)
+        index.add_all(existing_tasks)
+        
+        prompts = []
+        size = max_batch_link_tasks()
+        for start in range(0, len(jobs), size):
+            chunk = jobs[start:start + size]
+            candidate_lists = [
+                [tasks_by_id[task_id] for task_id, _ in
+                 index.search(job['task'], LINK_CANDIDATES_K, exclude=[job['task_id']])]
+                for job in chunk
+            ]
+            new_tasks = [dict(job['task'], id=job['task_id']) for job in chunk]
+            prompts.append(build_batch_link_prompt(new_tasks, candidate_lists))
+    
+    for prompt in prompts:
+        metrics.count('LinkCandidates', len(prompt.aliases))
+        metrics.count('LinkCandidatesDropped', prompt.dropped)
+    
+    with ThreadPoolExecutor(max_workers=min(BEDROCK_MAX_CONCURRENCY, len(prompts))) as pool:
+        answers = list(pool.map(lambda prompt: ask_batch_links(prompt, deadline), prompts))
+    
+    linked = set()
+    for links in answers:
+        for task_id, linked_task_ids in (links or {}).items():
+            if linked_task_ids:
+                store_links(task_id, linked_task_ids)
+            set_link_status(task_id, LINK_DONE)
+            linked.add(task_id)
+    return [job['task_id'] in linked for job in jobs]
+
+def ask_batch_links(prompt, deadline=None):
+    """Ask Bedrock for the links of every task in a batch link prompt
+    
+    Returns linked task IDs by new task ID, or None when the call failed.
+    """
+    if not prompt.aliases:
+        return {task_id: [] for task_id in prompt.labels.values()}
+    
+    if metrics.debug_enabled():
+        print(f"Prompt for batch link finding: {prompt.text}")
+    
+    try:
+        response = get_bedrock_client().invoke_model(
+            modelId=MODEL_ID,
+            body=json.dumps({
+                'anthropic_version': 'bedrock-2023-05-31',
+                'messages': [{'role': 'user', 'content': prompt.text}],
+                'max_tokens': batch_link_reply_tokens(prompt)
+            }),
+            deadline=deadline
+        )
+        
+        result = json.loads(response['body'].read())
+        record_usage('BatchLink', prompt, result)
+        return prompt.resolve_batch(json.loads(result['content'][0]['text']))
+    except Exception as e:
+        print(f"Batch link finding error: {str(e)}")
+        return None
+
+def drain_link_queue(link_queue, batch_size=SQS_MAX_BATCH):
+    """Process every job in an in-process link queue, returning the job count"""
+    processed = 0
+    
+    while True:
+        jobs = link_queue.receive(batch_size)
+        if not jobs:
+            return processed
+        
+        for job, linked in zip(jobs, process_link_jobs(jobs)):
+            if not linked:
+                set_link_status(job['task_id'], LINK_FAILED)
+        processed += len(jobs)
+
+def set_link_status(task_id, status):
+    """Record whether a task's links are still pending or final"""
+    get_task_store().set_link_status(task_id, status)
+
+def get_task_store():
+    """Return the container-wide task store"""
+    global _task_store
+    if _task_store is None:
+        _task_store = create_task_store(TASK_STORE)
+    return _task_store
+
+def get_bedrock_client():
+    """Return the container-wide deadline-aware Bedrock client"""
+    global _bedrock_client
+    if _bedrock_client is None:
+        _bedrock_client = ResilientBedrockClient(
+            max_concurrency=BEDROCK_MAX_CONCURRENCY,
+            default_budget=BEDROCK_BUDGET_SECONDS,
+            breaker=CircuitBreaker(BEDROCK_FAILURE_THRESHOLD, BEDROCK_RESET_SECONDS)
+        )
+    return _bedrock_client
+
+def cache_counts():
+    """Organization cache hits and misses so far in this container"""
+    if _organization_cache is None:
+        return 0, 0
+    stats = _organization_cache.stats()
+    return stats['hits'], stats['misses']
+
+def get_organization_cache():
+    """Return the container-wide organization cache
+    
+    The shared tier lives next to the tasks in DynamoDB, so other task
+    stores only get the in-memory tier.
+    """
+    global _organization_cache
+    if _organization_cache is None:
+        store = get_task_store()
+        shared = isinstance(store, DynamoDBTaskStore)
+        _organization_cache = create_organization_cache(
+            ORGANIZE_PROMPT,
+            MODEL_ID,
+            dynamodb=store.dynamodb if shared else None,
+            table_name=ORGANIZATION_CACHE_TABLE if shared else '',
+            local_size=ORGANIZATION_CACHE_SIZE,
+            ttl_seconds=ORGANIZATION_CACHE_TTL,
+            salt=ORGANIZATION_CACHE_SALT
+        )
+    return _organization_cache
+
+def organize_with_bedrock(task, deadline=None):
+    """Use Bedrock to organize and categorize the task"""
+    local = confident_organization(task, LOCAL_CONFIDENCE_THRESHOLD)
+    if local is not None:
+        return local
+    
+    cache = get_organization_cache()
+    cached = cache.get(task)
+    if cached is not None:
+        return cached
+    
+    bedrock = get_bedrock_client()
+    prompt = build_organize_prompt(task)
     
     try:
         response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-haiku-20240307-v1:0',
+            modelId=MODEL_ID,
             body=json.dumps({
                 'anthropic_version': 'bedrock-2023-05-31',
-                'messages': [{'role': 'user', 'content': prompt}],
+                'messages': [{'role': 'user', 'content': prompt.text}],
                 'max_tokens': 300
-            })
+            }),
+            deadline=deadline
         )
         
         result = json.loads(response['body'].read())
+        record_usage('Organize', prompt, result)
         organized_task = json.loads(result['content'][0]['text'])
         
-        # Ensure required fields exist
-        organized_task.setdefault('task', task)
+        # The prompt may hold a shortened copy, so keep the original text
+        organized_task['task'] = task
         organized_task.setdefault('category', 'Personal')
         organized_task.setdefault('priority', 'medium')
         organized_task.setdefault('estimated_time', 30)
         organized_task.setdefault('tags', [])
         
+        cache.put(task, organized_task)
         return organized_task
         
     except Exception as e:
         print(f"Bedrock error: {str(e)}")
-        # Fallback organization
-        return {
-            'task': task,
-            'category': 'Personal',
-            'priority': 'medium',
-            'estimated_time': 30,
-            'tags': []
-        }
+        return fallback_organization(task)
 
-def find_and_store_links(new_task_id, new_task):
-    """Find links between new task and existing tasks"""
-    dynamodb = boto3.resource('dynamodb')
-    tasks_table = dynamodb.Table('tasks')
-    links_table = dynamodb.Table('task-links')
-    
-    # Get existing tasks
-    response = tasks_table.scan()
-    existing_tasks = [item for item in response['Items'] if item['id'] != new_task_id]
-    
-    if not existing_tasks:
-        return
+def organize_batch_with_bedrock(texts, deadline=None):
+    """Organize many tasks, sending only uncertain cache misses to Bedrock in chunks"""
+    return organize_batch(
+        texts, get_bedrock_client(), get_organization_cache(), LOCAL_CONFIDENCE_THRESHOLD,
+        lambda text: organize_with_bedrock(text, deadline), deadline,
+        budget=BATCH_PROMPT_TOKEN_BUDGET, max_items=BATCH_MAX_TASKS, max_workers=BEDROCK_MAX_CONCURRENCY
+    )
+
+def scan_link_candidates():
+    """Read every task needed for link candidate selection"""
+    with metrics.span('TaskScan'):
+        tasks = get_task_store().scan_tasks(LINK_CANDIDATE_FIELDS)
+    metrics.count('ItemsScanned', len(tasks))
+    return tasks
+
+def select_link_candidates(new_task_id, new_task, existing_tasks, top_k=None, scoring=None):
+    """Pick the existing tasks most similar to the new task"""
+    index = TaskIndex(scoring=scoring or LINK_SCORING)
+    index.add_all(existing_tasks)
     
-    # Use Bedrock to find links
-    bedrock = boto3.client('bedrock-runtime')
+    tasks_by_id = {task['id']: task for task in existing_tasks}
+    ranked = index.search(
+        new_task,
+        LINK_CANDIDATES_K if top_k is None else top_k,
+        exclude=[new_task_id]
+    )
+    return [tasks_by_id[task_id] for task_id, _ in ranked]
+
+def get_embedding_store():
+    """Matrix of stored task vectors, rebuilt from the task store once it is stale"""
+    from shared.embeddings import EMBEDDING_ATTRIBUTE, EmbeddingStore
     
-    existing_tasks_text = "\n".join([
-        f"ID: {task['id']}, Task: {task['task']}, Category: {task['category']}"
-        for task in existing_tasks
-    ])
+    now = time.monotonic()
+    if 'store' not in _embedding_state or now - _embedding_state['loaded_at'] >= EMBEDDING_REFRESH_SECONDS:
+        with metrics.span('EmbeddingLoad'):
+            items = get_task_store().scan_tasks(('id', EMBEDDING_ATTRIBUTE))
+        _embedding_state.update({
+            'store': EmbeddingStore.from_items(items, EMBEDDING_DIMENSION),
+            'loaded_at': now
+        })
     
-    prompt = f"""Analyze if this new task has relationships with existing tasks.
+    return _embedding_state['store']
 
-New Task: {new_task['task']} (Category: {new_task['category']})
+def create_embedder():
+    """The configured embedder"""
+    from shared.embeddings import create_embedder
+    
+    bedrock = get_bedrock_client() if EMBEDDER == 'bedrock' else None
+    return create_embedder(EMBEDDER, bedrock, EMBEDDING_DIMENSION)
 
-Existing Tasks:
-{existing_tasks_text}
+def embed_task(task):
+    """Turn a task into a unit vector with the configured embedder"""
+    return create_embedder().embed(task)
 
-Return ONLY a JSON array of task IDs that are related to the new task. Consider:
-- Similar topics or projects
-- Dependencies (one task blocks another)
-- Sequential tasks in same category
-- Related shopping items
-- Connected work projects
+def remember_vectors(vectors):
+    """Add freshly stored vectors to this container's search matrix"""
+    store = _embedding_state.get('store')
+    if store is not None:
+        for task_id, vector in vectors.items():
+            store.add(task_id, vector)
 
-Return empty array [] if no relationships found.
-Example: ["task-id-1", "task-id-2"]"""
+def find_links_by_embedding(new_task_id, new_task):
+    """Find related tasks with a cosine top-K search over task embeddings"""
+    from shared.embeddings import EMBEDDING_ATTRIBUTE, decode_vector
+    
+    store = get_embedding_store()
     
-    print(f"Prompt for link finding: {prompt}")
+    # Tasks stored since the matrix was built still carry their vector
+    vector = store.get(new_task_id)
+    if vector is None:
+        item = get_task_store().get_tasks([new_task_id], ('id', EMBEDDING_ATTRIBUTE)).get(new_task_id, {})
+        vector = decode_vector(item[EMBEDDING_ATTRIBUTE]) if item.get(EMBEDDING_ATTRIBUTE) else embed_task(new_task)
+    
+    matches = store.search(
+        vector,
+        LINK_CANDIDATES_K,
+        exclude=[new_task_id],
+        min_score=LINK_SIMILARITY_THRESHOLD
+    )
+    return [task_id for task_id, _ in matches]
 
+def store_links(new_task_id, linked_task_ids):
+    """Write related links from the new task to each linked task"""
+    created_at = datetime.now().isoformat()
+    metrics.count('LinksWritten', len(linked_task_ids))
+    with metrics.span('LinkWrite'):
+        get_task_store().put_links([
+            {
+                'source_task_id': new_task_id,
+                'target_task_id': linked_id,
+                'link_type': 'related',
+                'created_at': created_at
+            }
+            for linked_id in linked_task_ids
+        ])
+
+def find_and_store_links(new_task_id, new_task, existing_tasks=None, deadline=None):
+    """Find links between new task and existing tasks
+    
+    Returns False when link discovery failed and should be retried.
+    """
+    if LINK_MODE == 'embedding':
+        try:
+            store_links(new_task_id, find_links_by_embedding(new_task_id, new_task))
+            return True
+        except Exception as e:
+            print(f"Embedding link finding error: {str(e)}")
+            return False
+    
+    # Only the closest existing tasks are sent to Bedrock
+    if existing_tasks is None:
+        existing_tasks = scan_link_candidates()
+    with metrics.span('LinkRank'):
+        candidates = select_link_candidates(new_task_id, new_task, existing_tasks)
+    metrics.count('LinkCandidates', len(candidates))
+    
+    if not candidates:
+        return True
+    
+    # Use Bedrock to find links
+    bedrock = get_bedrock_client()
+    
+    # Candidates are numbered per request, so the model never copies UUIDs
+    prompt = build_link_prompt(new_task, candidates)
+    metrics.count('LinkCandidatesDropped', prompt.dropped)
+    
+    # Whole prompts grow with the candidate list, so only sampled invocations log them
+    if metrics.debug_enabled():
+        print(f"Prompt for link finding: {prompt.text}")
+    
     try:
         response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-haiku-20240307-v1:0',
+            modelId=MODEL_ID,
             body=json.dumps({
                 'anthropic_version': 'bedrock-2023-05-31',
-                'messages': [{'role': 'user', 'content': prompt}],
-                'max_tokens': 200
-            })
+                'messages': [{'role': 'user', 'content': prompt.text}],
+                'max_tokens': link_reply_tokens(prompt)
+            }),
+            deadline=deadline
         )
         
         result = json.loads(response['body'].read())
-        print(f"Link finding result: {result}")
-        linked_task_ids = json.loads(result['content'][0]['text'])
+        record_usage('Link', prompt, result)
+        if metrics.debug_enabled():
+            print(f"Link finding result: {result}")
         
-        # Store links
-        for linked_id in linked_task_ids:
-            links_table.put_item(Item={
-                'source_task_id': new_task_id,
-                'target_task_id': linked_id,
-                'link_type': 'related',
-                'created_at': datetime.now().isoformat()
-            })
+        # Numbers the model made up or mangled map to no task and are dropped
+        store_links(new_task_id, prompt.resolve(json.loads(result['content'][0]['text'])))
+        return True
             
     except Exception as e:
         print(f"Link finding error: {str(e)}")
+        return False
 
-def store_task(organized_task, source):
-    """Store task in DynamoDB"""
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('tasks')
-    
-    task_id = str(uuid.uuid4())
-    
-    item = {
-        'id': task_id,
-        'task': organized_task['task'],
-        'category': organized_task['category'],
-        'priority': organized_task['priority'],
-        'estimated_time': organized_task['estimated_time'],
-        'tags': organized_task['tags'],
-        'source': source,
-        'timestamp': datetime.now().isoformat(),
-        'synced_to_obsidian': False,
-        'completed': False
-    }
+def get_task_organizer():
+    """Organizer storing tasks like the trigger pipelines do, with this container's clients
     
-    table.put_item(Item=item)
-    return task_id
\ No newline at end of file
+    In embedding mode tasks are stored with their vector, which is also
+    added to this container's search matrix.
+    """
+    return TaskOrganizer(
+        bedrock=get_bedrock_client(),
+        cache=get_organization_cache(),
+        store=get_task_store(),
+        local_threshold=LOCAL_CONFIDENCE_THRESHOLD,
+        embedder=create_embedder() if LINK_MODE == 'embedding' else None,
+        vector_sink=remember_vectors
+    )
+
+def store_task(organized_task, source, link_status=None, task_id=None):
+    """Store task in the task store"""
+    return get_task_organizer().store_task(organized_task, source, link_status=link_status, task_id=task_id)
+
+def store_tasks_batch(organized_tasks, sources, link_status=None, task_ids=None):
+    """Store many tasks with batched writes, returning their IDs"""
+    return get_task_organizer().store_tasks(organized_tasks, sources, link_status=link_status, task_ids=task_ids)
\ No newline at end of file
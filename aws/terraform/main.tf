@@ -17,11 +17,33 @@ resource "aws_dynamodb_table" "tasks" {
   billing_mode   = "PAY_PER_REQUEST"
   hash_key       = "id"
 
+  # Feeds the changelog writer
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   attribute {
     name = "id"
     type = "S"
   }
 
+  attribute {
+    name = "sync_pending"
+    type = "S"
+  }
+
+  attribute {
+    name = "timestamp"
+    type = "S"
+  }
+
+  # Sparse index: only tasks that still carry sync_pending are in it
+  global_secondary_index {
+    name            = "unsynced-index"
+    hash_key        = "sync_pending"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+
   tags = {
     Name = "TaskOrganizerTable"
   }
@@ -44,11 +66,67 @@ resource "aws_dynamodb_table" "task_links" {
     type = "S"
   }
 
+  # Reverse edges: look up the links pointing at a task by key
+  global_secondary_index {
+    name            = "target-index"
+    hash_key        = "target_task_id"
+    range_key       = "source_task_id"
+    projection_type = "ALL"
+  }
+
   tags = {
     Name = "TaskLinksTable"
   }
 }
 
+# Organization cache shared by all Lambda containers
+resource "aws_dynamodb_table" "organization_cache" {
+  name           = "task-organization-cache"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "cache_key"
+
+  attribute {
+    name = "cache_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name = "TaskOrganizationCacheTable"
+  }
+}
+
+# Per-user change feed pulled by the Mac change sync
+resource "aws_dynamodb_table" "task_changelog" {
+  name           = "task-changelog"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "user_id"
+  range_key      = "seq"
+
+  attribute {
+    name = "user_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "seq"
+    type = "N"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name = "TaskChangelogTable"
+  }
+}
+
 # Lambda Function
 resource "aws_lambda_function" "task_organizer" {
   filename         = "../task_organizer.zip"
@@ -59,9 +137,98 @@ resource "aws_lambda_function" "task_organizer" {
   timeout         = 30
   source_code_hash = filebase64sha256("../task_organizer.zip")
 
+  environment {
+    variables = {
+      LINK_CANDIDATES_K = var.link_candidates_k
+      LINK_SCORING      = var.link_scoring
+      LINK_MODE         = var.link_mode
+      EMBEDDER          = var.embedder
+      LINK_QUEUE_URL    = aws_sqs_queue.link_jobs.url
+
+      ORGANIZATION_CACHE_TABLE = aws_dynamodb_table.organization_cache.name
+      ORGANIZATION_CACHE_SALT  = var.organization_cache_salt
+
+      LOCAL_CONFIDENCE_THRESHOLD = var.local_confidence_threshold
+    }
+  }
+
   depends_on = [aws_cloudwatch_log_group.lambda_logs]
 }
 
+# Link job queue drained by the link worker
+resource "aws_sqs_queue" "link_jobs" {
+  name                       = "task-link-jobs"
+  visibility_timeout_seconds = 360
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.link_jobs_dlq.arn
+    maxReceiveCount     = 5
+  })
+}
+
+resource "aws_sqs_queue" "link_jobs_dlq" {
+  name = "task-link-jobs-dlq"
+}
+
+# Link worker Lambda, same package as the organizer
+resource "aws_lambda_function" "link_worker" {
+  filename         = "../task_organizer.zip"
+  function_name    = "task-organizer-link-worker"
+  role            = aws_iam_role.lambda_role.arn
+  handler         = "lambda_function.link_worker_handler"
+  runtime         = "python3.9"
+  timeout         = 60
+  source_code_hash = filebase64sha256("../task_organizer.zip")
+
+  environment {
+    variables = {
+      LINK_CANDIDATES_K = var.link_candidates_k
+      LINK_SCORING      = var.link_scoring
+      LINK_MODE         = var.link_mode
+      EMBEDDER          = var.embedder
+    }
+  }
+
+  depends_on = [aws_cloudwatch_log_group.link_worker_logs]
+}
+
+resource "aws_lambda_event_source_mapping" "link_jobs" {
+  event_source_arn                   = aws_sqs_queue.link_jobs.arn
+  function_name                      = aws_lambda_function.link_worker.arn
+  batch_size                         = 10
+  maximum_batching_window_in_seconds = 5
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
+# Changelog writer Lambda, consuming the tasks table stream
+resource "aws_lambda_function" "changelog_writer" {
+  filename         = "../task_organizer.zip"
+  function_name    = "task-organizer-changelog-writer"
+  role            = aws_iam_role.lambda_role.arn
+  handler         = "lambda_function.changelog_handler"
+  runtime         = "python3.9"
+  timeout         = 30
+  source_code_hash = filebase64sha256("../task_organizer.zip")
+
+  environment {
+    variables = {
+      CHANGELOG_TABLE = aws_dynamodb_table.task_changelog.name
+    }
+  }
+
+  depends_on = [aws_cloudwatch_log_group.changelog_writer_logs]
+}
+
+resource "aws_lambda_event_source_mapping" "task_stream" {
+  event_source_arn                   = aws_dynamodb_table.tasks.stream_arn
+  function_name                      = aws_lambda_function.changelog_writer.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  bisect_batch_on_function_error     = true
+  maximum_retry_attempts             = 10
+}
+
 # IAM Role for Lambda
 resource "aws_iam_role" "lambda_role" {
   name = "task-organizer-lambda-role"
@@ -98,6 +265,8 @@ resource "aws_iam_role_policy" "dynamodb_policy" {
         Effect = "Allow"
         Action = [
           "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:GetItem",
           "dynamodb:Scan",
           "dynamodb:Query",
@@ -105,8 +274,44 @@ resource "aws_iam_role_policy" "dynamodb_policy" {
         ]
         Resource = [
           aws_dynamodb_table.tasks.arn,
-          aws_dynamodb_table.task_links.arn
+          "${aws_dynamodb_table.tasks.arn}/index/*",
+          aws_dynamodb_table.task_links.arn,
+          "${aws_dynamodb_table.task_links.arn}/index/*",
+          aws_dynamodb_table.organization_cache.arn,
+          aws_dynamodb_table.task_changelog.arn
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = aws_dynamodb_table.tasks.stream_arn
+      }
+    ]
+  })
+}
+
+# Link queue access policy
+resource "aws_iam_role_policy" "link_queue_policy" {
+  name = "link-queue-access"
+  role = aws_iam_role.lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.link_jobs.arn
       }
     ]
   })
@@ -137,6 +342,16 @@ resource "aws_cloudwatch_log_group" "lambda_logs" {
   retention_in_days = 14
 }
 
+resource "aws_cloudwatch_log_group" "link_worker_logs" {
+  name              = "/aws/lambda/task-organizer-link-worker"
+  retention_in_days = 14
+}
+
+resource "aws_cloudwatch_log_group" "changelog_writer_logs" {
+  name              = "/aws/lambda/task-organizer-changelog-writer"
+  retention_in_days = 14
+}
+
 # API Gateway
 resource "aws_api_gateway_rest_api" "task_api" {
   name        = "task-organizer-api"
@@ -16,4 +16,9 @@ output "dynamodb_table_name" {
 output "lambda_function_name" {
   description = "Lambda function name"
   value       = aws_lambda_function.task_organizer.function_name
+}
+
+output "link_queue_url" {
+  description = "Link job queue URL, LINK_QUEUE_URL for the triggers"
+  value       = aws_sqs_queue.link_jobs.url
 }
\ No newline at end of file
@@ -2,4 +2,40 @@ variable "aws_region" {
   description = "AWS region"
   type        = string
   default     = "us-east-1"
+}
+
+variable "link_candidates_k" {
+  description = "Number of most similar existing tasks sent to Bedrock for link discovery"
+  type        = number
+  default     = 20
+}
+
+variable "link_scoring" {
+  description = "Scoring used to rank link candidates (bm25 or tfidf)"
+  type        = string
+  default     = "bm25"
+}
+
+variable "link_mode" {
+  description = "How related tasks are found: bedrock (prompt over ranked candidates) or embedding (cosine similarity)"
+  type        = string
+  default     = "bedrock"
+}
+
+variable "embedder" {
+  description = "Embedder used in embedding link mode: hashing (local) or bedrock (Titan embeddings)"
+  type        = string
+  default     = "hashing"
+}
+
+variable "organization_cache_salt" {
+  description = "Change this to invalidate every cached task organization"
+  type        = string
+  default     = ""
+}
+
+variable "local_confidence_threshold" {
+  description = "Confidence above which the local classifier skips Bedrock (set above 1 to always use Bedrock)"
+  type        = number
+  default     = 0.75
 }
\ No newline at end of file
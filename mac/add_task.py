@@ -1,65 +1,129 @@
 #!/Users/prantil/task-organizer/venv/bin/python3
 """
 Mac script for adding tasks via Alfred
-Sends task to AWS Lambda for organization
+Records the task in the local spool, then hands it to the task agent when
+it is running or sends it to AWS Lambda for organization directly
 """
 
-import requests
+import json
+import socket
 import sys
 import os
 from pathlib import Path
 
+from task_spool import DEFAULT_SPOOL_PATH, REJECTED, SENT, TaskSpool, flush_spool
+
+DEFAULT_AGENT_SOCKET = Path(__file__).parent.parent / '.task_agent.sock'
+AGENT_TIMEOUT_SECONDS = 15
+
 def load_env():
-    """Load environment variables from .env file"""
+    """Load environment variables from .env file
+    
+    Variables already set in the environment win, so the benchmark can
+    point the script at a local stub.
+    """
     env_path = Path(__file__).parent.parent / '.env'
     if env_path.exists():
         with open(env_path) as f:
             for line in f:
                 if line.strip() and not line.startswith('#'):
                     key, value = line.strip().split('=', 1)
-                    os.environ[key] = value
+                    os.environ.setdefault(key, value)
+
+def agent_socket_path():
+    return Path(os.getenv('TASK_AGENT_SOCKET', str(DEFAULT_AGENT_SOCKET)))
+
+def spool_path():
+    return Path(os.getenv('TASK_SPOOL_PATH', str(DEFAULT_SPOOL_PATH)))
 
-def send_task_to_aws(task_input):
-    """Send task to AWS Lambda for organization"""
-    load_env()
+def format_result(organized):
+    """Alfred-friendly summary of an organized task"""
+    return (f"✅ Task organized: {organized.get('category', 'Unknown')}\n"
+            f"   Priority: {organized.get('priority', 'medium')}")
+
+def report(spool, key):
+    """Print what happened to a spooled task"""
+    state, result, error = spool.status(key)
+    if state == SENT:
+        print(format_result(result))
+    elif state == REJECTED:
+        print(f"❌ Error: {error}")
+    else:
+        print(f"📥 Saved offline, will retry: {error}")
+
+def send_via_agent(key, wait=True):
+    """Ask the local agent to deliver a spooled task; returns False if no agent is listening"""
+    path = agent_socket_path()
+    if not path.exists():
+        return False
     
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(AGENT_TIMEOUT_SECONDS)
+        client.connect(str(path))
+    except OSError:
+        return False
+    
+    with client:
+        client.sendall((json.dumps({'key': key, 'wait': wait}) + '\n').encode('utf-8'))
+        try:
+            reply = json.loads(client.makefile('rb').readline() or b'{}')
+        except OSError:
+            reply = {}
+    
+    if reply.get('queued'):
+        print("📨 Task sent")
+    elif reply.get('ok'):
+        print(format_result(reply['result']))
+    elif reply.get('rejected'):
+        print(f"❌ Error: {reply.get('error')}")
+    else:
+        # The task is in the spool either way, so the agent will retry it
+        print(f"📥 Saved offline, will retry: {reply.get('error', 'no reply from task agent')}")
+    return True
+
+def flush_directly(spool, key, api_endpoint):
+    """Send due spooled tasks to the API from this process"""
+    import requests
+    
+    # The requests module has the same post() as a Session
+    flush_spool(spool, requests, api_endpoint)
+    report(spool, key)
+
+def submit_task(task_input, wait=True):
+    """Spool a task, then hand it to the agent or send it directly"""
     api_endpoint = os.getenv('TASK_API_ENDPOINT')
-    if not api_endpoint:
+    if not api_endpoint and not agent_socket_path().exists():
         print("❌ TASK_API_ENDPOINT not set in .env file")
         return
     
-    payload = {
-        'task': task_input,
-        'source': 'mac'
-    }
-    
+    # The task is durable before anything touches the network
+    spool = TaskSpool(spool_path())
     try:
-        response = requests.post(
-            api_endpoint,
-            json=payload,
-            timeout=10,
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✅ Task organized: {result.get('organized_task', {}).get('category', 'Unknown')}")
-            print(f"   Priority: {result.get('organized_task', {}).get('priority', 'medium')}")
+        key = spool.append(task_input, 'mac')
+        if send_via_agent(key, wait):
+            return
+        if api_endpoint:
+            flush_directly(spool, key, api_endpoint)
         else:
-            print(f"❌ Error: {response.status_code} - {response.text}")
-            
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Failed to send task: {str(e)}")
+            print("📥 Saved offline; task agent is not running")
     except Exception as e:
         print(f"❌ Unexpected error: {str(e)}")
+    finally:
+        spool.close()
 
 def main():
-    if len(sys.argv) > 1:
-        task = " ".join(sys.argv[1:])
-        send_task_to_aws(task)
+    args = sys.argv[1:]
+    wait = '--no-wait' not in args
+    args = [arg for arg in args if arg != '--no-wait']
+    
+    if args:
+        task = " ".join(args)
+        load_env()
+        submit_task(task, wait)
     else:
-        print("Usage: add_task.py <task description>")
+        print("Usage: add_task.py [--no-wait] <task description>")
         print("Example: add_task.py 'Buy groceries for dinner party'")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,91 @@
+#!/Users/prantil/task-organizer/venv/bin/python3
+"""
+Benchmark add_task.py startup with and without the task agent
+Runs the script repeatedly against a local stub API and reports wall
+time per invocation for the direct path, the agent and fire-and-forget
+
+Usage: bench_add_task.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from task_agent import TaskAgent
+from task_spool import TaskSpool, task_id_for
+
+SCRIPT_PATH = Path(__file__).parent / 'add_task.py'
+
+class StubApi(BaseHTTPRequestHandler):
+    """Answers every batch POST like the task API would"""
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        reply = json.dumps({
+            'ids': [task_id_for(entry['idempotency_key']) for entry in body['tasks']],
+            'message': f"{len(body['tasks'])} tasks organized and stored",
+            'organized_tasks': [
+                {'task': entry['task'], 'category': 'Work', 'priority': 'medium'}
+                for entry in body['tasks']
+            ]
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+    
+    def log_message(self, *args):
+        pass
+
+def time_runs(runs, env, extra_args=()):
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(SCRIPT_PATH), *extra_args, f'Benchmark task {i}'],
+            env=env, check=True, capture_output=True
+        )
+        timings.append(time.perf_counter() - start)
+    return {
+        'runs': runs,
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'p95_ms': round(sorted(timings)[int(0.95 * (runs - 1))] * 1000, 1)
+    }
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/task"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = Path(tmp) / 'agent.sock'
+        spool_file = Path(tmp) / 'spool.sqlite'
+        env = dict(os.environ, TASK_API_ENDPOINT=endpoint, TASK_AGENT_SOCKET=str(socket_path),
+                   TASK_SPOOL_PATH=str(spool_file))
+        
+        results = {'direct': time_runs(runs, env)}
+        
+        agent = TaskAgent(endpoint, socket_path, spool=TaskSpool(spool_file),
+                          notifier=lambda title, message: None)
+        agent.start()
+        try:
+            results['agent'] = time_runs(runs, env)
+            results['agent_no_wait'] = time_runs(runs, env, ['--no-wait'])
+        finally:
+            agent.stop()
+    
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
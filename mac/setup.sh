@@ -9,10 +9,12 @@ echo "🍎 Setting up Mac integration..."
 # Make scripts executable
 chmod +x add_task.py
 chmod +x sync_obsidian.py
+chmod +x sync_daemon.py
 
 # Install Python dependencies
 echo "📦 Installing Python dependencies..."
 pip3 install requests boto3
+pip3 install watchdog || echo "watchdog not installed; the sync daemon will poll the vault"
 
 # Create Obsidian vault structure if it doesn't exist
 VAULT_PATH=$(grep OBSIDIAN_VAULT_PATH ../.env | cut -d'=' -f2)
@@ -36,5 +38,6 @@ echo "Next steps:"
 echo "1. Test task addition: ./add_task.py 'Test task from Mac'"
 echo "2. Test sync: ./sync_obsidian.py"
 echo "3. Setup Alfred workflow (see alfred_workflow.md)"
+echo "4. Optional: run ./sync_daemon.py instead of the cron job for faster syncs"
 echo ""
 echo "Alfred keyword will be: task <your task>"
\ No newline at end of file
@@ -0,0 +1,276 @@
+#!/Users/prantil/task-organizer/venv/bin/python3
+"""
+Resident Obsidian sync daemon
+Keeps one warm task store, polls it with an adaptive interval,
+sends checkbox edits back as soon as vault files change, and answers
+status requests on a Unix socket
+
+Usage: sync_daemon.py [run|status|sync|stop]
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from sync_obsidian import (
+    create_task_store, get_vault_path, load_env, sync_changes, sync_completions, sync_to_obsidian
+)
+
+DEFAULT_SOCKET_PATH = Path(__file__).parent.parent / '.sync_daemon.sock'
+
+# Poll quickly after activity and back off while idle
+MIN_INTERVAL_SECONDS = 15
+MAX_INTERVAL_SECONDS = 300
+BACKOFF_FACTOR = 2
+
+# Let a burst of file events from one edit settle before syncing
+DEBOUNCE_SECONDS = 1.0
+
+LATENCY_SAMPLES = 500
+
+class AdaptivePoller:
+    """Poll interval that drops to the minimum after activity and grows while idle"""
+    
+    def __init__(self, min_interval=MIN_INTERVAL_SECONDS, max_interval=MAX_INTERVAL_SECONDS,
+                 factor=BACKOFF_FACTOR):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.interval = min_interval
+    
+    def next_interval(self, activity):
+        if activity:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.factor)
+        return self.interval
+
+class LatencyStats:
+    """Recent durations of one kind of sync pass"""
+    
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+    
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+    
+    def summary(self):
+        if not self.samples:
+            return {'count': self.count}
+        ordered = sorted(self.samples)
+        
+        def percentile(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+        
+        return {
+            'count': self.count,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(ordered[-1] * 1000, 1)
+        }
+
+class SyncDaemon:
+    """Runs forward and reverse sync passes in one long-lived process"""
+    
+    def __init__(self, mode='index', socket_path=DEFAULT_SOCKET_PATH, store=None,
+                 poller=None, clock=time.monotonic):
+        self.mode = mode
+        self.socket_path = Path(socket_path)
+        self.store = store
+        self.poller = poller or AdaptivePoller()
+        self.clock = clock
+        self.latency = {'forward': LatencyStats(), 'reverse': LatencyStats()}
+        self.started_at = time.time()
+        self.cycles = 0
+        self.synced = 0
+        self.completions = 0
+        self.last_activity_at = None
+        self.watching = False
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self._changed_paths = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._observer = None
+    
+    def session(self):
+        """Task store reused by every pass, keeping its connections warm"""
+        if self.store is None:
+            self.store = create_task_store()
+        return self.store
+    
+    def note_changed(self, relative_path):
+        """Queue a vault note for the reverse pass and wake the loop"""
+        with self._lock:
+            self._changed_paths.add(str(relative_path))
+        self.wake.set()
+    
+    def take_changed_paths(self):
+        with self._lock:
+            paths, self._changed_paths = self._changed_paths, set()
+        return paths
+    
+    def run_once(self, full_check=False):
+        """Run one reverse and one forward pass, returning how much changed"""
+        store = self.session()
+        
+        # With file events only the touched notes are checked; without them,
+        # or when asked for a full check, every note in the manifest is stat'ed
+        paths = self.take_changed_paths()
+        if full_check or not self.watching:
+            paths = None
+        pushed = 0
+        if paths is None or paths:
+            start = self.clock()
+            pushed = sync_completions(store, paths)
+            self.latency['reverse'].add(self.clock() - start)
+        
+        start = self.clock()
+        if self.mode == 'changes':
+            synced = sync_changes(store, push=False)
+        else:
+            synced = sync_to_obsidian(store, push=False)
+        self.latency['forward'].add(self.clock() - start)
+        
+        self.cycles += 1
+        self.synced += synced
+        self.completions += pushed
+        if synced or pushed:
+            self.last_activity_at = time.time()
+        return synced + pushed
+    
+    def status(self):
+        return {
+            'mode': self.mode,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'cycles': self.cycles,
+            'synced': self.synced,
+            'completions': self.completions,
+            'interval_seconds': self.poller.interval,
+            'watching_vault': self.watching,
+            'pending_paths': len(self._changed_paths),
+            'last_activity_at': self.last_activity_at,
+            'latency': {name: stats.summary() for name, stats in self.latency.items()}
+        }
+    
+    def handle_command(self, command):
+        if command == 'status':
+            return self.status()
+        if command == 'sync':
+            self.wake.set()
+            return {'ok': True}
+        if command == 'stop':
+            self.stop()
+            return {'ok': True}
+        return {'error': f'unknown command: {command}'}
+    
+    def start_control_server(self):
+        """Answer one-line commands on the control socket in a background thread"""
+        daemon = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                command = self.rfile.readline().decode('utf-8').strip()
+                reply = daemon.handle_command(command)
+                self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+        
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+    
+    def start_watcher(self, vault_path):
+        """Watch the vault with watchdog if it is installed, else rely on polling"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            print("👀 watchdog not installed; checking notes on each poll instead")
+            return
+        
+        daemon = self
+        
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+                    if path and path.endswith('.md') and not Path(path).name.startswith('.'):
+                        try:
+                            daemon.note_changed(Path(path).relative_to(vault_path))
+                        except ValueError:
+                            pass
+        
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(vault_path / 'Tasks'), recursive=True)
+        self._observer.start()
+        self.watching = True
+    
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+    
+    def serve_forever(self, vault_path):
+        self.start_control_server()
+        self.start_watcher(vault_path)
+        print(f"🔄 Sync daemon running ({self.mode} mode), control socket {self.socket_path}")
+        
+        try:
+            # Edits made while the daemon was down are found by one full check
+            full_check = True
+            while not self.stopping.is_set():
+                activity = self.run_once(full_check)
+                full_check = False
+                
+                if self.wake.wait(self.poller.next_interval(activity)) and not self.stopping.is_set():
+                    time.sleep(DEBOUNCE_SECONDS)
+                self.wake.clear()
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+def send_command(command, socket_path=DEFAULT_SOCKET_PATH, timeout=5.0):
+    """Send a control command to a running daemon and return its reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path))
+        client.sendall((command + '\n').encode('utf-8'))
+        reply = client.makefile('rb').readline()
+    return json.loads(reply)
+
+def main():
+    load_env()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'run'
+    socket_path = Path(os.getenv('SYNC_DAEMON_SOCKET', str(DEFAULT_SOCKET_PATH)))
+    
+    if command != 'run':
+        try:
+            print(json.dumps(send_command(command, socket_path), indent=2))
+        except OSError:
+            print(f"❌ Sync daemon is not running (no socket at {socket_path})")
+        return
+    
+    vault_path = get_vault_path()
+    if vault_path is None:
+        return
+    
+    daemon = SyncDaemon(mode=os.getenv('SYNC_MODE', 'index'), socket_path=socket_path)
+    try:
+        daemon.serve_forever(vault_path)
+    except KeyboardInterrupt:
+        print("👋 Sync daemon stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Checkpoint journal for the Obsidian sync
+Task IDs are appended once their note is written and dropped once the
+synced flag is stored, so a restarted sync neither rewrites notes nor
+loses flags that were never flushed
+"""
+
+import os
+from pathlib import Path
+
+class SyncJournal:
+    """Append-only file of task IDs whose notes are written but not yet marked synced"""
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+    
+    def pending(self):
+        """IDs left over from a previous run that stopped before flushing"""
+        if not self.path.exists():
+            return set()
+        with open(self.path, encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+    
+    def record(self, task_id):
+        """Note that a task's file has been written"""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(task_id + '\n')
+    
+    def checkpoint(self):
+        """Make recorded IDs durable before their flags are flushed"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def forget(self, task_ids):
+        """Drop IDs whose synced flags are stored"""
+        self.checkpoint()
+        remaining = self.pending() - set(task_ids)
+        self.close()
+        
+        if not remaining:
+            self.path.unlink(missing_ok=True)
+            return
+        
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(task_id + '\n' for task_id in sorted(remaining))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
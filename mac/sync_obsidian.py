@@ -1,14 +1,34 @@
 #!//Users/prantil/task-organizer/venv/bin/python3
 """
-Sync tasks from DynamoDB to Obsidian vault
+Sync tasks from the task store to Obsidian vault
 Run this script periodically to keep Obsidian updated
 """
 
-import boto3
 import os
-from datetime import datetime
+import sys
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+# Add parent directory to path for shared imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from shared.changelog import DEFAULT_USER_ID, EVENT_CREATED, EVENT_DELETED, Changelog, advance_watermark
+from shared.task_store import DynamoDBTaskStore, create_task_store
+from sync_journal import SyncJournal
+from vault_manifest import VaultManifest
+from vault_writer import VaultWriter, content_hash, parse_completed, render_note
+
+# Notes are written and their synced flags flushed in batches of this size
+SYNC_BATCH_SIZE = 250
+SYNC_FLUSH_WORKERS = 4
+VAULT_WRITE_WORKERS = 8
+DEFAULT_JOURNAL_PATH = Path(__file__).parent.parent / '.sync_journal'
+DEFAULT_MANIFEST_PATH = Path(__file__).parent.parent / '.vault_manifest.sqlite'
+
+# Change-feed mode keeps the last applied changelog sequence number here
+DEFAULT_WATERMARK_PATH = Path(__file__).parent.parent / '.sync_watermark'
+CHANGE_GAP_SECONDS = 300
+
 def load_env():
     """Load environment variables from .env file"""
     env_path = Path(__file__).parent.parent / '.env'
@@ -19,147 +39,383 @@ def load_env():
                     key, value = line.strip().split('=', 1)
                     os.environ[key] = value
 
-def sync_to_obsidian():
-    """Sync unsynced tasks from DynamoDB to Obsidian"""
-    load_env()
+def links_final(task):
+    """Whether the link worker has finished with a task
     
+    Tasks with pending links are held back for LINK_WAIT_SECONDS so
+    their notes are written once with the final links.
+    """
+    if task.get('link_status') != 'pending':
+        return True
+    
+    # Timestamps carry their UTC offset; older ones without it were written
+    # by the Lambda, which runs in UTC. Give up waiting once the task is old enough
+    link_wait = timedelta(seconds=int(os.getenv('LINK_WAIT_SECONDS', '600')))
+    added = datetime.fromisoformat(task['timestamp'])
+    if added.tzinfo is None:
+        added = added.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - added > link_wait
+
+def get_vault_path():
+    """Configured vault path, or None after reporting why it can't be used"""
     vault_path = os.getenv('OBSIDIAN_VAULT_PATH')
     if not vault_path:
         print("❌ OBSIDIAN_VAULT_PATH not set in .env file")
-        return
+        return None
     
     vault_path = Path(vault_path)
     if not vault_path.exists():
         print(f"❌ Obsidian vault not found at: {vault_path}")
-        return
+        return None
+    return vault_path
+
+def sync_to_obsidian(store=None, push=True):
+    """Sync unsynced tasks from the task store to Obsidian, returning how many were synced
+    
+    A resident caller can pass its own task store, and skip the reverse
+    pass when it runs that separately.
+    """
+    load_env()
+    
+    vault_path = get_vault_path()
+    if vault_path is None:
+        return 0
     
     try:
-        # Connect to DynamoDB
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table('tasks')
+        # Connect to the task store
+        store = store or create_task_store()
+        manifest = open_manifest()
+        legacy = legacy_notes(vault_path, manifest)
+        
+        # Checkboxes ticked in Obsidian go back first
+        if push:
+            push_completions(vault_path, store, manifest)
         
-        # Get unsynced tasks
-        response = table.scan(
-            FilterExpression='synced_to_obsidian = :val',
-            ExpressionAttributeValues={':val': False}
-        )
+        # Get unsynced tasks from the sparse index
+        unsynced_tasks = store.unsynced_tasks()
         
+        # Notes written by an interrupted run only need their flags flushed
+        journal = SyncJournal(os.getenv('SYNC_JOURNAL_PATH', str(DEFAULT_JOURNAL_PATH)))
+        written = journal.pending()
+        resumed = [item for item in unsynced_tasks if item['id'] in written]
+        stale = written - {item['id'] for item in resumed}
+        
+        ready_tasks = [item for item in unsynced_tasks if item['id'] not in written and links_final(item)]
+        tasks_deferred = len(unsynced_tasks) - len(resumed) - len(ready_tasks)
         tasks_synced = 0
         
-        for item in response['Items']:
-            write_task_to_obsidian(item, vault_path)
-            
-            # Mark as synced
-            table.update_item(
-                Key={'id': item['id']},
-                UpdateExpression='SET synced_to_obsidian = :val',
-                ExpressionAttributeValues={':val': True}
-            )
+        # Resolve links for the whole run with batched reads
+        resolver = LinkResolver(store)
+        resolver.remember(unsynced_tasks)
+        resolver.prefetch([item['id'] for item in ready_tasks])
+        
+        try:
+            if resumed or stale:
+                flush_synced(store, journal, resumed, stale)
+                tasks_synced += len(resumed)
+                print(f"♻️  Resumed {len(resumed)} tasks from the sync journal")
             
-            tasks_synced += 1
+            writer = VaultWriter(VAULT_WRITE_WORKERS)
+            for start in range(0, len(ready_tasks), SYNC_BATCH_SIZE):
+                batch = ready_tasks[start:start + SYNC_BATCH_SIZE]
+                write_task_notes(vault_path, manifest, writer, batch, resolver, legacy)
+                for item in batch:
+                    journal.record(item['id'])
+                
+                flush_synced(store, journal, batch)
+                tasks_synced += len(batch)
+        finally:
+            journal.close()
+            manifest.close()
+        
+        if ready_tasks:
+            print(f"📝 Wrote {writer.written} notes, {writer.unchanged} unchanged")
         
         if tasks_synced > 0:
             print(f"✅ Synced {tasks_synced} tasks to Obsidian")
         else:
             print("📝 No new tasks to sync")
+        if tasks_deferred > 0:
+            print(f"⏳ {tasks_deferred} tasks waiting for links")
+        return tasks_synced
             
     except Exception as e:
         print(f"❌ Sync failed: {str(e)}")
+        return 0
 
-def get_task_links(task_id):
-    """Get all links for a task"""
-    dynamodb = boto3.resource('dynamodb')
-    links_table = dynamodb.Table('task-links')
-    tasks_table = dynamodb.Table('tasks')
+def sync_changes(store=None, push=True):
+    """Apply changelog events recorded since the last run to the vault
     
-    links = []
+    Unlike the unsynced-index sync this also picks up edits, completions
+    and deletions, and reads only the changes after the stored watermark.
+    The changelog is written from the DynamoDB stream, so this needs the
+    DynamoDB task store. Returns the number of events applied.
+    """
+    load_env()
     
-    # Get outgoing links
-    response = links_table.query(
-        KeyConditionExpression='source_task_id = :task_id',
-        ExpressionAttributeValues={':task_id': task_id}
-    )
+    vault_path = get_vault_path()
+    if vault_path is None:
+        return 0
+    
+    watermark_path = Path(os.getenv('SYNC_WATERMARK_PATH', str(DEFAULT_WATERMARK_PATH)))
+    user_id = os.getenv('CHANGELOG_USER_ID', DEFAULT_USER_ID)
+    
+    try:
+        store = store or create_task_store()
+        if not isinstance(store, DynamoDBTaskStore):
+            print("❌ Change sync needs the DynamoDB task store")
+            return 0
+        manifest = open_manifest()
+        
+        # Push local checkbox edits before applying remote changes over them
+        if push:
+            push_completions(vault_path, store, manifest)
+        
+        changelog = Changelog(store.dynamodb.Table(os.getenv('CHANGELOG_TABLE', 'task-changelog')))
+        
+        watermark = read_watermark(watermark_path)
+        events = changelog.pull(user_id, watermark)
+        
+        # Only the latest state of each task matters
+        latest = {}
+        for event in events:
+            latest[event['task_id']] = event
+        live = [event['task'] for event in latest.values() if event['event'] != EVENT_DELETED]
+        created = {event['task_id'] for event in events if event['event'] == EVENT_CREATED}
+        
+        resolver = LinkResolver(store)
+        resolver.remember(live)
+        resolver.prefetch([task['id'] for task in live])
+        
+        try:
+            legacy = legacy_notes(vault_path, manifest)
+            write_task_notes(vault_path, manifest, VaultWriter(VAULT_WRITE_WORKERS), live, resolver, legacy)
+            for event in latest.values():
+                if event['event'] == EVENT_DELETED:
+                    remove_task_note(vault_path, manifest, event['task_id'], legacy)
+        finally:
+            manifest.close()
+        
+        # New tasks are covered here, so keep the index-based sync from rewriting them
+        store.mark_synced_ids([task['id'] for task in live if task['id'] in created])
+        
+        write_watermark(watermark_path, advance_watermark(watermark, events, CHANGE_GAP_SECONDS))
+        
+        if latest:
+            print(f"✅ Applied {len(events)} changes to {len(latest)} tasks in Obsidian")
+        else:
+            print("📝 No new changes to sync")
+        return len(events)
+            
+    except Exception as e:
+        print(f"❌ Change sync failed: {str(e)}")
+        return 0
+
+def read_watermark(path):
+    """Last applied changelog sequence number, 0 if none"""
+    if not path.exists():
+        return 0
+    return int(path.read_text().strip() or 0)
+
+def write_watermark(path, seq):
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(f"{seq}\n")
+    os.replace(tmp_path, path)
+
+def open_manifest():
+    return VaultManifest(os.getenv('VAULT_MANIFEST_PATH', str(DEFAULT_MANIFEST_PATH)))
+
+def legacy_notes(vault_path, manifest):
+    """Notes written before the manifest existed, keyed by the task ID prefix in their name
     
-    for link in response['Items']:
-        target_task = tasks_table.get_item(Key={'id': link['target_task_id']})
-        if 'Item' in target_task:
-            links.append({
-                'id': link['target_task_id'],
-                'task': target_task['Item']['task'],
-                'direction': 'outgoing'
-            })
-    
-    # Get incoming links
-    response = links_table.scan(
-        FilterExpression='target_task_id = :task_id',
-        ExpressionAttributeValues={':task_id': task_id}
+    Built in one pass over the category folders, and only while the
+    manifest is empty or VAULT_MIGRATE_NOTES is set; once notes are in the
+    manifest they are found there.
+    """
+    notes = {}
+    if not (manifest.is_empty() or os.getenv('VAULT_MIGRATE_NOTES')):
+        return notes
+    for path in (vault_path / 'Tasks').glob('*/*.md'):
+        notes.setdefault(path.stem.rpartition('-')[2], []).append(path)
+    return notes
+
+def write_task_notes(vault_path, manifest, writer, tasks, resolver, legacy):
+    """Render and write notes for tasks, updating them in place via the manifest
+    
+    legacy holds the pass's legacy_notes() for tasks not yet in the manifest.
+    """
+    entries = manifest.entries([task['id'] for task in tasks])
+    writer.known.update(
+        (vault_path / entry['path'], (entry['hash'], entry['mtime_ns']))
+        for entry in entries.values()
     )
+    notes = [render_note(task, vault_path, resolver.links_for(task['id']), manifest) for task in tasks]
+    writer.write_notes(notes)
+    
+    rows = []
+    for task, (path, _) in zip(tasks, notes):
+        # A changed priority or category renames the note; drop the old file
+        entry = entries.get(task['id'])
+        if entry is not None:
+            old_paths = [vault_path / entry['path']]
+        else:
+            old_paths = legacy.get(task['id'][:8], [])
+        for old_path in old_paths:
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+        
+        digest, mtime_ns, size = writer.state[path]
+        rows.append((task['id'], str(path.relative_to(vault_path)), digest, mtime_ns, size, bool(task.get('completed'))))
+    manifest.record_many(rows)
+
+def push_completions(vault_path, store, manifest, paths=None):
+    """Send checkbox changes made in Obsidian back to the task store
+    
+    Only notes whose mtime or size differ from the manifest are read, and
+    only tasks whose checkbox differs from the state last written are sent.
+    """
+    completions = {}
+    rows = []
     
-    for link in response['Items']:
-        source_task = tasks_table.get_item(Key={'id': link['source_task_id']})
-        if 'Item' in source_task:
-            links.append({
-                'id': link['source_task_id'],
-                'task': source_task['Item']['task'],
-                'direction': 'incoming'
-            })
+    for entry in manifest.changed_notes(vault_path, paths):
+        path = vault_path / entry['path']
+        try:
+            # Stat before reading, so an edit made meanwhile is seen next run
+            stat = path.stat()
+            data = path.read_bytes()
+        except FileNotFoundError:
+            continue
+        
+        completed = parse_completed(data)
+        if completed is None:
+            completed = entry['completed']
+        elif completed != entry['completed']:
+            completions[entry['task_id']] = completed
+        rows.append((entry['task_id'], entry['path'], content_hash(data), stat.st_mtime_ns, stat.st_size, completed))
     
-    return links
+    if completions:
+        store.set_completed(completions)
+        print(f"☑️  Sent {len(completions)} completion changes from Obsidian")
+    manifest.record_many(rows)
+    return len(completions)
 
-def write_task_to_obsidian(task, vault_path):
-    """Write a single task to Obsidian vault with links"""
-    category_path = vault_path / 'Tasks' / task['category']
-    category_path.mkdir(parents=True, exist_ok=True)
+def sync_completions(store=None, paths=None):
+    """Only push checkbox changes from the vault to the task store, returning how many
+    
+    paths limits the pass to notes known to have changed, e.g. from file
+    system events; otherwise every note in the manifest is checked.
+    """
+    load_env()
+    
+    vault_path = get_vault_path()
+    if vault_path is None:
+        return 0
+    
+    try:
+        store = store or create_task_store()
+        manifest = open_manifest()
+        try:
+            return push_completions(vault_path, store, manifest, paths)
+        finally:
+            manifest.close()
+    except Exception as e:
+        print(f"❌ Completion sync failed: {str(e)}")
+        return 0
+
+def remove_task_note(vault_path, manifest, task_id, legacy):
+    """Delete a task's note and forget it"""
+    entry = manifest.get(task_id)
+    old_paths = [vault_path / entry['path']] if entry is not None else legacy.get(task_id[:8], [])
+    for old_path in old_paths:
+        old_path.unlink(missing_ok=True)
+    manifest.remove(task_id)
+
+def flush_synced(store, journal, items, extra_ids=()):
+    """Store synced flags for journaled tasks, then drop them from the journal"""
+    journal.checkpoint()
+    if items:
+        store.mark_synced(items, max_workers=SYNC_FLUSH_WORKERS)
+    journal.forget([item['id'] for item in items] + list(extra_ids))
+
+class LinkResolver:
+    """Resolves related-task links for a whole sync run
+    
+    Link endpoints for every task are collected first, then the titles of
+    all distinct linked tasks are fetched with batched reads and kept in a
+    per-run cache, so each note needs no further task store round trips.
+    The fields that name a note are kept too, for exact wikilinks.
+    """
     
-    date_str = datetime.now().strftime('%Y-%m-%d')
-    task_id_short = task['id'][:8]
-    safe_task = "".join(c for c in task['task'][:30] if c.isalnum() or c in (' ', '-', '_')).strip()
-    filename = f"{task['priority']}-{date_str}-{safe_task}-{task_id_short}.md"
+    FIELDS = ('id', 'task', 'category', 'priority', 'timestamp')
     
-    file_path = category_path / filename
+    def __init__(self, store):
+        self.store = store
+        self.tasks = {}
+        self.edges = {}
+    
+    def remember(self, tasks):
+        """Cache tasks that are already loaded"""
+        for task in tasks:
+            self.tasks[task['id']] = {field: task[field] for field in self.FIELDS if field in task}
+    
+    def prefetch(self, task_ids):
+        """Load the links of every task, then resolve all linked titles at once"""
+        for task_id in task_ids:
+            edges = [
+                (link['target_task_id'], 'outgoing')
+                for link in self.store.outgoing_links(task_id)
+            ]
+            edges.extend(
+                (link['source_task_id'], 'incoming')
+                for link in self.store.incoming_links(task_id)
+            )
+            self.edges[task_id] = edges
+        
+        missing = {other_id for edges in self.edges.values() for other_id, _ in edges} - set(self.tasks)
+        if missing:
+            self.tasks.update(self.store.get_tasks(missing, attributes=self.FIELDS))
     
+    def links_for(self, task_id):
+        """Links of a prefetched task whose endpoints still exist"""
+        if task_id not in self.edges:
+            self.prefetch([task_id])
+        
+        return [
+            dict(self.tasks[other_id], direction=direction)
+            for other_id, direction in self.edges[task_id]
+            if other_id in self.tasks
+        ]
+
+def get_task_links(task_id):
+    """Get all links for a task"""
+    return LinkResolver(create_task_store()).links_for(task_id)
+
+def write_task_to_obsidian(task, vault_path, links=None):
+    """Write a single task to Obsidian vault with links"""
     # Get task links
-    links = get_task_links(task['id'])
-    
-    # Create links section
-    links_section = ""
-    if links:
-        links_section = "\n## Related Tasks\n"
-        for link in links:
-            link_id_short = link['id'][:8]
-            safe_link_task = "".join(c for c in link['task'][:30] if c.isalnum() or c in (' ', '-', '_')).strip()
-            link_filename = f"*-*-{safe_link_task}-{link_id_short}"
-            links_section += f"- [[{link_filename}|{link['task']}]]\n"
-    
-    tags_str = " ".join([f"#{tag}" for tag in task.get('tags', [])])
-    
-    content = f"""# {task['task']}
-
-**Priority:** {task['priority']}
-**Category:** {task['category']}
-**Source:** {task['source']}
-**Estimated Time:** {task.get('estimated_time', 30)} minutes
-**Added:** {task['timestamp']}
-
-{tags_str}
-
-## Notes
-- [ ] {task['task']}
-{links_section}
-## Details
-<!-- Add additional notes, links, or details here -->
-
----
-*Auto-generated from task organizer - ID: {task['id']}*
-"""
+    if links is None:
+        links = get_task_links(task['id'])
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    VaultWriter().write_notes([render_note(task, vault_path, links)])
     
     print(f"📝 Added: {task['task'][:50]}...")
 
+def backfill():
+    """Add unsynced tasks created before the sparse index to it"""
+    load_env()
+    updated = create_task_store().backfill_sync_index()
+    print(f"✅ Added {updated} unsynced tasks to the sync index")
+
 def main():
-    sync_to_obsidian()
+    if '--backfill' in sys.argv[1:]:
+        backfill()
+    elif '--changes' in sys.argv[1:]:
+        sync_changes()
+    elif '--completions' in sys.argv[1:]:
+        if sync_completions() == 0:
+            print("📝 No completion changes in Obsidian")
+    else:
+        sync_to_obsidian()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
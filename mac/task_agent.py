@@ -0,0 +1,177 @@
+#!/Users/prantil/task-organizer/venv/bin/python3
+"""
+Local task agent for add_task.py
+Keeps a pooled keep-alive HTTPS session to the task API and delivers
+spooled tasks on request over a Unix socket, so each Alfred invocation
+skips the requests import and the TLS handshake
+"""
+
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from add_task import agent_socket_path, load_env, spool_path
+from task_spool import REJECTED, SENT, TaskSpool, flush_spool
+
+POOL_SIZE = 4
+
+# Pending tasks are retried this often while the agent runs
+RETRY_INTERVAL_SECONDS = 30
+BURST_WINDOW_SECONDS = 0.2
+
+def notify(title, message):
+    """Show a macOS notification, or print where osascript isn't available"""
+    script = f"display notification {json.dumps(message)} with title {json.dumps(title)}"
+    try:
+        subprocess.run(['osascript', '-e', script], check=False, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        print(f"{title}: {message}")
+
+class TaskAgent:
+    """Delivers spooled tasks from local clients over one warm HTTP session
+    
+    Clients write tasks to the spool and send their keys here. Deliveries
+    share a lock, so a burst of tasks goes out as a few batch requests, and
+    a background loop retries whatever is still pending.
+    """
+    
+    def __init__(self, api_endpoint, socket_path, spool=None, session=None, notifier=notify):
+        self.api_endpoint = api_endpoint
+        self.socket_path = Path(socket_path)
+        self.spool = spool or TaskSpool(spool_path())
+        self.session = session or self._create_session()
+        self.notifier = notifier
+        self.pool = ThreadPoolExecutor(max_workers=POOL_SIZE)
+        self.stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._server = None
+    
+    @staticmethod
+    def _create_session():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def flush(self):
+        """Send every due task, one flush at a time"""
+        with self._flush_lock:
+            return flush_spool(self.spool, self.session, self.api_endpoint)
+    
+    def deliver(self, key):
+        """Flush the spool and return the client's reply for one key"""
+        try:
+            self.flush()
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+        
+        status = self.spool.status(key)
+        if status is None:
+            return {'ok': False, 'error': 'unknown task'}
+        state, result, error = status
+        if state == SENT:
+            return {'ok': True, 'result': result}
+        return {'ok': False, 'error': error, 'rejected': state == REJECTED}
+    
+    def deliver_later(self, key):
+        """Deliver a task in the background and report the outcome as a notification"""
+        def send():
+            # A short pause lets a burst of submissions share one batch
+            time.sleep(BURST_WINDOW_SECONDS)
+            reply = self.deliver(key)
+            if reply['ok']:
+                organized = reply['result']
+                self.notifier(
+                    "Task organized",
+                    f"{organized.get('category', 'Unknown')}, {organized.get('priority', 'medium')} priority: {organized.get('task', '')[:50]}"
+                )
+            elif reply.get('rejected'):
+                self.notifier("Task failed", reply['error'])
+            else:
+                self.notifier("Task saved offline", f"Will retry: {reply['error']}")
+        
+        self.pool.submit(send)
+        return {'ok': True, 'queued': True}
+    
+    def handle(self, request):
+        if request.get('command') == 'ping':
+            return {'ok': True}
+        if not request.get('key'):
+            return {'ok': False, 'error': 'no task key given'}
+        if request.get('wait', True):
+            return self.deliver(request['key'])
+        return self.deliver_later(request['key'])
+    
+    def retry_loop(self):
+        """Keep retrying pending tasks while the agent runs"""
+        while not self.stopping.wait(RETRY_INTERVAL_SECONDS):
+            if self.spool.pending_count():
+                try:
+                    sent, failed = self.flush()
+                    if sent:
+                        print(f"📤 Sent {sent} spooled tasks")
+                except Exception as e:
+                    print(f"❌ Spool flush failed: {str(e)}")
+    
+    def start(self):
+        """Listen on the socket in a background thread"""
+        agent = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline())
+                except ValueError:
+                    request = {}
+                reply = agent.handle(request)
+                self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+        
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        threading.Thread(target=self.retry_loop, daemon=True).start()
+    
+    def stop(self):
+        self.stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.pool.shutdown(wait=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        with self._flush_lock:
+            self.spool.close()
+
+def main():
+    load_env()
+    
+    api_endpoint = os.getenv('TASK_API_ENDPOINT')
+    if not api_endpoint:
+        print("❌ TASK_API_ENDPOINT not set in .env file")
+        sys.exit(1)
+    
+    agent = TaskAgent(api_endpoint, agent_socket_path())
+    agent.start()
+    print(f"🚀 Task agent listening on {agent.socket_path}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("👋 Task agent stopped")
+    finally:
+        agent.stop()
+
+if __name__ == "__main__":
+    main()
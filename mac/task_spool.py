@@ -0,0 +1,200 @@
+"""
+Durable spool for tasks captured by add_task.py
+Every task is written to a local SQLite WAL file before anything touches
+the network, then flushed to the API in batches with idempotency keys
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Add parent directory to path for shared imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from shared.task_utils import task_id_for
+
+DEFAULT_SPOOL_PATH = Path(__file__).parent.parent / '.task_spool.sqlite'
+
+# The task API accepts at most this many tasks per batch request
+FLUSH_BATCH_SIZE = 50
+
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 900
+
+# Sent tasks are kept a while so waiting clients can read their result
+SENT_RETENTION_SECONDS = 24 * 3600
+
+PENDING = 'pending'
+SENT = 'sent'
+REJECTED = 'rejected'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    key TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+)
+"""
+
+class FlushError(Exception):
+    """A batch could not be delivered; rejected is True when retrying won't help"""
+    
+    def __init__(self, message, rejected=False):
+        super().__init__(message)
+        self.rejected = rejected
+
+class TaskSpool:
+    """Append-only local queue of submitted tasks"""
+    
+    def __init__(self, path=DEFAULT_SPOOL_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=FULL')
+        self.db.execute(SCHEMA)
+        self.db.execute('CREATE INDEX IF NOT EXISTS spool_due ON spool (state, next_attempt_at)')
+        self.db.commit()
+        self._lock = threading.Lock()
+    
+    def append(self, task, source='mac'):
+        """Durably record a task and return its idempotency key"""
+        key = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute(
+                'INSERT INTO spool (key, task, source, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)',
+                (key, task, source, now, now)
+            )
+        return key
+    
+    def due(self, limit=FLUSH_BATCH_SIZE, now=None):
+        """Oldest pending tasks whose retry time has come"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT key, task, source, attempts FROM spool '
+                'WHERE state = ? AND next_attempt_at <= ? ORDER BY created_at LIMIT ?',
+                (PENDING, now, limit)
+            ).fetchall()
+        return [{'key': row[0], 'task': row[1], 'source': row[2], 'attempts': row[3]} for row in rows]
+    
+    def mark_sent(self, results):
+        """Record the API's organization for each sent key"""
+        with self._lock, self.db:
+            self.db.executemany(
+                'UPDATE spool SET state = ?, result = ?, error = NULL WHERE key = ?',
+                [(SENT, json.dumps(result), key) for key, result in results.items()]
+            )
+    
+    def mark_failed(self, keys, error, rejected=False, now=None):
+        """Schedule a retry with exponential backoff, or give up on rejected tasks"""
+        now = time.time() if now is None else now
+        with self._lock, self.db:
+            for key in keys:
+                attempts = self.db.execute('SELECT attempts FROM spool WHERE key = ?', (key,)).fetchone()[0] + 1
+                delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+                self.db.execute(
+                    'UPDATE spool SET state = ?, attempts = ?, next_attempt_at = ?, error = ? WHERE key = ?',
+                    (REJECTED if rejected else PENDING, attempts, now + delay, error, key)
+                )
+    
+    def status(self, key):
+        """(state, result, error) for a key, or None if unknown"""
+        with self._lock:
+            row = self.db.execute('SELECT state, result, error FROM spool WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]) if row[1] else None, row[2]
+    
+    def pending_count(self):
+        with self._lock:
+            return self.db.execute('SELECT COUNT(*) FROM spool WHERE state = ?', (PENDING,)).fetchone()[0]
+    
+    def prune(self, now=None):
+        """Forget sent tasks older than the retention period"""
+        now = time.time() if now is None else now
+        with self._lock, self.db:
+            self.db.execute(
+                'DELETE FROM spool WHERE state = ? AND created_at < ?',
+                (SENT, now - SENT_RETENTION_SECONDS)
+            )
+    
+    def close(self):
+        self.db.close()
+
+def post_batch(session, api_endpoint, rows, timeout=10):
+    """Send spooled tasks in one batch request, returning {key: organized_task}
+    
+    The API skips blank tasks, so results are matched to keys by the task
+    ID each idempotency key maps to; keys it did not store are left out.
+    """
+    try:
+        response = session.post(
+            api_endpoint,
+            json={
+                'tasks': [
+                    {'task': row['task'], 'source': row['source'], 'idempotency_key': row['key']}
+                    for row in rows
+                ]
+            },
+            timeout=timeout,
+            headers={'Content-Type': 'application/json'}
+        )
+    except Exception as e:
+        raise FlushError(str(e)) from e
+    
+    if response.status_code != 200:
+        # Client errors mean the request itself is bad; throttling and 5xx are retried
+        rejected = 400 <= response.status_code < 500 and response.status_code != 429
+        raise FlushError(f"{response.status_code} - {response.text}", rejected=rejected)
+    
+    body = response.json()
+    organized_by_id = dict(zip(body['ids'], body['organized_tasks']))
+    results = {}
+    for row in rows:
+        organized = organized_by_id.get(task_id_for(row['key']))
+        if organized is not None:
+            results[row['key']] = organized
+    return results
+
+def flush_spool(spool, session, api_endpoint, batch_size=FLUSH_BATCH_SIZE, timeout=10):
+    """Send every due task in batches, returning (sent, failed) counts
+    
+    Stops at the first failed batch, since the rest would most likely
+    fail the same way; their retry times are left unchanged.
+    """
+    sent = failed = 0
+    spool.prune()
+    
+    while True:
+        rows = spool.due(batch_size)
+        if not rows:
+            return sent, failed
+        
+        try:
+            results = post_batch(session, api_endpoint, rows, timeout)
+        except FlushError as e:
+            spool.mark_failed([row['key'] for row in rows], str(e), rejected=e.rejected)
+            failed += len(rows)
+            if not e.rejected:
+                return sent, failed
+            continue
+        
+        spool.mark_sent(results)
+        sent += len(results)
+        
+        dropped = [row['key'] for row in rows if row['key'] not in results]
+        if dropped:
+            spool.mark_failed(dropped, "Not stored by the API", rejected=True)
+            failed += len(dropped)
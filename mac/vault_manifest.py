@@ -0,0 +1,127 @@
+"""
+Local manifest of the notes written to the Obsidian vault
+Maps each task ID to its note path, content hash, mtime, size and
+checkbox state in SQLite, so the sync finds existing notes and edited
+notes without walking or reading the vault
+"""
+
+import sqlite3
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    task_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL DEFAULT -1,
+    completed INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Columns added after the first manifest version
+ADDED_COLUMNS = {
+    'size': 'INTEGER NOT NULL DEFAULT -1',
+    'completed': 'INTEGER NOT NULL DEFAULT 0',
+}
+
+COLUMNS = 'task_id, path, hash, mtime_ns, size, completed'
+
+# SQLite limits the number of bound parameters per statement
+QUERY_CHUNK = 500
+
+class VaultManifest:
+    """SQLite table of task_id -> (path relative to the vault, hash, mtime_ns, size, completed)"""
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(SCHEMA)
+        self.db.execute('CREATE INDEX IF NOT EXISTS notes_path ON notes (path)')
+        existing = {row[1] for row in self.db.execute('PRAGMA table_info(notes)')}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in existing:
+                self.db.execute(f'ALTER TABLE notes ADD COLUMN {column} {definition}')
+        self.db.commit()
+    
+    def get(self, task_id):
+        """Manifest entry for a task as a dict, or None"""
+        row = self.db.execute(
+            f'SELECT {COLUMNS} FROM notes WHERE task_id = ?', (task_id,)
+        ).fetchone()
+        return None if row is None else self._entry(row)
+    
+    def entries(self, task_ids):
+        """Manifest entries for several tasks, keyed by task ID"""
+        task_ids = list(dict.fromkeys(task_ids))
+        found = {}
+        for start in range(0, len(task_ids), QUERY_CHUNK):
+            chunk = task_ids[start:start + QUERY_CHUNK]
+            rows = self.db.execute(
+                f"SELECT {COLUMNS} FROM notes WHERE task_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for row in rows:
+                found[row[0]] = self._entry(row)
+        return found
+    
+    def is_empty(self):
+        return self.db.execute('SELECT 1 FROM notes LIMIT 1').fetchone() is None
+    
+    def path_for(self, task_id):
+        """Vault-relative note path for a task, or None if it has no note"""
+        entry = self.get(task_id)
+        return None if entry is None else entry['path']
+    
+    def record_many(self, rows):
+        """Insert or replace (task_id, path, hash, mtime_ns, size, completed) rows in one transaction"""
+        with self.db:
+            self.db.executemany(
+                f'INSERT OR REPLACE INTO notes ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+    
+    def _rows(self, paths=None):
+        if paths is None:
+            yield from self.db.execute(f'SELECT {COLUMNS} FROM notes')
+            return
+        paths = list(dict.fromkeys(str(path) for path in paths))
+        for start in range(0, len(paths), QUERY_CHUNK):
+            chunk = paths[start:start + QUERY_CHUNK]
+            yield from self.db.execute(
+                f"SELECT {COLUMNS} FROM notes WHERE path IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+    
+    def changed_notes(self, vault_path, paths=None):
+        """Entries whose note's mtime or size differs from the manifest
+        
+        Only a stat per note is needed; notes that no longer exist are skipped.
+        paths (relative to the vault) restricts the check to those notes.
+        """
+        changed = []
+        for row in list(self._rows(paths)):
+            entry = self._entry(row)
+            try:
+                stat = (vault_path / entry['path']).stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime_ns != entry['mtime_ns'] or stat.st_size != entry['size']:
+                changed.append(entry)
+        return changed
+    
+    def remove(self, task_id):
+        with self.db:
+            self.db.execute('DELETE FROM notes WHERE task_id = ?', (task_id,))
+    
+    def close(self):
+        self.db.close()
+    
+    @staticmethod
+    def _entry(row):
+        return {
+            'task_id': row[0], 'path': row[1], 'hash': row[2], 'mtime_ns': row[3],
+            'size': row[4], 'completed': bool(row[5])
+        }
@@ -0,0 +1,157 @@
+"""
+Parallel, atomic note writer for the Obsidian vault
+Notes are rendered up front and written by a thread pool through a temp
+file, fsync and rename, so Obsidian never sees a half-written note
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_WORKERS = 8
+
+# The task's own checkbox is the first one in its note
+CHECKBOX = re.compile(rb'^[ \t]*- \[([ xX])\] ', re.MULTILINE)
+
+def safe_title(text):
+    """Task text trimmed to characters that are safe in a filename"""
+    return "".join(c for c in text[:30] if c.isalnum() or c in (' ', '-', '_')).strip()
+
+def note_path(task):
+    """Vault-relative path of a task's note
+    
+    The name depends only on the task, so every sync finds the same file.
+    """
+    date_str = str(task['timestamp'])[:10]
+    filename = f"{task['priority']}-{date_str}-{safe_title(task['task'])}-{task['id'][:8]}.md"
+    return Path('Tasks') / task['category'] / filename
+
+def link_target(link, manifest=None):
+    """Wikilink target for a related task, exact whenever its note is known"""
+    path = manifest.path_for(link['id']) if manifest is not None else None
+    if path is None and all(field in link for field in ('category', 'priority', 'timestamp')):
+        path = str(note_path(link))
+    if path is None:
+        return f"*-*-{safe_title(link['task'])}-{link['id'][:8]}"
+    return str(path)[:-len('.md')] if str(path).endswith('.md') else str(path)
+
+def render_note(task, vault_path, links, manifest=None):
+    """Return the (path, content) of a task's note"""
+    file_path = vault_path / note_path(task)
+    
+    # Create links section
+    links_section = ""
+    if links:
+        links_section = "\n## Related Tasks\n"
+        for link in links:
+            links_section += f"- [[{link_target(link, manifest)}|{link['task']}]]\n"
+    
+    tags_str = " ".join([f"#{tag}" for tag in task.get('tags', [])])
+    
+    content = f"""# {task['task']}
+
+**Priority:** {task['priority']}
+**Category:** {task['category']}
+**Source:** {task['source']}
+**Estimated Time:** {task.get('estimated_time', 30)} minutes
+**Added:** {task['timestamp']}
+
+{tags_str}
+
+## Notes
+- [{'x' if task.get('completed') else ' '}] {task['task']}
+{links_section}
+## Details
+<!-- Add additional notes, links, or details here -->
+
+---
+*Auto-generated from task organizer - ID: {task['id']}*
+"""
+    return file_path, content
+
+def parse_completed(data):
+    """Checkbox state of the task in a note's bytes, or None without a checkbox"""
+    match = CHECKBOX.search(data)
+    return None if match is None else match.group(1) in b'xX'
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def atomic_write(path, data):
+    """Write bytes via a hidden temp file in the same directory, then rename over path"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+class VaultWriter:
+    """Writes batches of rendered notes, skipping notes whose content is unchanged
+    
+    known maps paths to the (hash, mtime_ns) recorded when they were last
+    written; a note that matches both is skipped without reading it.
+    state maps each handled path to its (hash, mtime_ns, size).
+    """
+    
+    def __init__(self, max_workers=DEFAULT_WORKERS, known=None):
+        self.max_workers = max_workers
+        self.known = dict(known or {})
+        self.state = {}
+        self.written = 0
+        self.unchanged = 0
+        self._dirs = set()
+        self._lock = threading.Lock()
+    
+    def _unchanged(self, path, data, digest):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        
+        recorded = self.state.get(path) or self.known.get(path)
+        if recorded is not None and recorded[0] == digest and recorded[1] == stat.st_mtime_ns:
+            return True
+        if stat.st_size != len(data):
+            return False
+        return content_hash(path.read_bytes()) == digest
+    
+    def _write_one(self, note):
+        path, content = note
+        data = content.encode('utf-8')
+        digest = content_hash(data)
+        
+        changed = not self._unchanged(path, data, digest)
+        if changed:
+            atomic_write(path, data)
+        stat = path.stat()
+        
+        with self._lock:
+            self.state[path] = (digest, stat.st_mtime_ns, stat.st_size)
+            if changed:
+                self.written += 1
+            else:
+                self.unchanged += 1
+        return changed
+    
+    def write_notes(self, notes):
+        """Write (path, content) pairs, returning whether each file changed"""
+        # Each category directory is created once per writer
+        for directory in {path.parent for path, _ in notes} - self._dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(directory)
+        
+        if len(notes) <= 1:
+            return [self._write_one(note) for note in notes]
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(self._write_one, notes))
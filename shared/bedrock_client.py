@@ -0,0 +1,248 @@
+"""
+Deadline-aware Bedrock client
+Wraps bedrock-runtime with a per-request time budget, jittered retries
+limited by a retry quota, a concurrency limit and a circuit breaker,
+so callers can fall back quickly while Bedrock is unhealthy
+"""
+
+import math
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from shared import metrics
+
+RETRYABLE_ERROR_CODES = frozenset([
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceUnavailableException',
+    'InternalServerException',
+    'ModelNotReadyException',
+    'ModelTimeoutException',
+])
+
+# Read timeouts are cut to the time a request has left, rounded down to
+# this step, so a handful of clients with fixed timeouts cover every budget
+TIMEOUT_STEP_SECONDS = 0.5
+
+
+class BedrockUnavailable(Exception):
+    """Bedrock can't answer within the time budget, or the circuit is open"""
+
+
+def error_code(error: Exception) -> Optional[str]:
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code')
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an error is transient (throttling, 5xx, timeouts)"""
+    if error_code(error) in RETRYABLE_ERROR_CODES:
+        return True
+    try:
+        from botocore.exceptions import ConnectionError as BotoConnectionError
+        from botocore.exceptions import ReadTimeoutError
+    except ImportError:
+        return False
+    return isinstance(error, (BotoConnectionError, ReadTimeoutError))
+
+
+class Deadline:
+    """Point in time by which a request must be finished"""
+
+    def __init__(self, seconds: float, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def from_context(cls, context, budget: float, reserve: float = 1.0, clock=time.monotonic) -> 'Deadline':
+        """Budget capped by the Lambda's remaining time, less a reserve for the response"""
+        seconds = budget
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            seconds = min(budget, context.get_remaining_time_in_millis() / 1000 - reserve)
+        return cls(max(0.0, seconds), clock)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one probe through after a cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def release_probe(self):
+        """Hand back a probe that never reached Bedrock, so the next call can probe"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+
+class ResilientBedrockClient:
+    """bedrock-runtime wrapper with deadlines, retries and a circuit breaker
+
+    invoke_model has the same shape as the boto3 call plus an optional
+    deadline, and raises BedrockUnavailable instead of waiting when the
+    request can't succeed in time. Each attempt uses a client whose read
+    timeout fits in the time the deadline has left; client_factory builds
+    one for a given timeout, and a fixed client is used as is.
+    """
+
+    def __init__(self, client=None, region: Optional[str] = None, max_attempts: int = 3,
+                 base_delay: float = 0.1, max_delay: float = 2.0, max_concurrency: int = 4,
+                 default_budget: float = 8.0, min_attempt_time: float = 0.5,
+                 retry_quota: int = 20, breaker: Optional[CircuitBreaker] = None,
+                 clock=time.monotonic, sleep=time.sleep,
+                 client_factory: Optional[Callable[[float], object]] = None):
+        if client is not None:
+            client_factory = lambda timeout: client
+        elif client_factory is None:
+            client_factory = lambda timeout: self._create_client(region, timeout)
+        self._client_factory = client_factory
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.default_budget = default_budget
+        self.min_attempt_time = min_attempt_time
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.clock = clock
+        self.sleep = sleep
+
+        # Retries spend from a shared quota that successes refill, so a
+        # struggling Bedrock sees fewer retries instead of a retry storm
+        self.retry_quota_max = retry_quota
+        self.retry_quota = retry_quota
+        self._quota_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @staticmethod
+    def _create_client(region, timeout):
+        import boto3
+        from botocore.config import Config
+
+        # Retries are handled here, within the caller's time budget
+        config = Config(
+            connect_timeout=min(2, timeout),
+            read_timeout=timeout,
+            retries={'total_max_attempts': 1}
+        )
+        return boto3.client('bedrock-runtime', region_name=region, config=config)
+
+    def _client_for(self, remaining: float):
+        """Client whose timeouts end by the time the deadline expires"""
+        timeout = max(TIMEOUT_STEP_SECONDS, math.floor(remaining / TIMEOUT_STEP_SECONDS) * TIMEOUT_STEP_SECONDS)
+        with self._clients_lock:
+            if timeout not in self._clients:
+                self._clients[timeout] = self._client_factory(timeout)
+            return self._clients[timeout]
+
+    def _spend_retry(self) -> bool:
+        with self._quota_lock:
+            if self.retry_quota <= 0:
+                return False
+            self.retry_quota -= 1
+            return True
+
+    def _refill_retry(self):
+        with self._quota_lock:
+            self.retry_quota = min(self.retry_quota_max, self.retry_quota + 1)
+
+    def _backoff(self, attempt: int, throttled: bool) -> float:
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        if throttled:
+            cap = min(self.max_delay, cap * 2)
+        return random.uniform(0, cap)
+
+    def invoke_model(self, modelId: str, body: str, deadline: Optional[Deadline] = None, **kwargs):
+        with metrics.span('BedrockInvoke'):
+            return self._invoke_model(modelId, body, deadline, **kwargs)
+
+    def _invoke_model(self, modelId: str, body: str, deadline: Optional[Deadline] = None, **kwargs):
+        if deadline is None:
+            deadline = Deadline(self.default_budget, self.clock)
+
+        if deadline.remaining() < self.min_attempt_time:
+            raise BedrockUnavailable("Bedrock time budget exhausted")
+
+        if not self.breaker.allow():
+            raise BedrockUnavailable("Bedrock circuit is open")
+
+        # Every exit that never heard from Bedrock hands back a half-open
+        # probe, otherwise the breaker would stay half-open for good
+        settled = False
+        if not self._slots.acquire(timeout=deadline.remaining()):
+            self.breaker.release_probe()
+            raise BedrockUnavailable("Timed out waiting for a Bedrock slot")
+
+        try:
+            attempt = 0
+            while True:
+                if deadline.remaining() < self.min_attempt_time:
+                    raise BedrockUnavailable("Bedrock time budget exhausted")
+
+                try:
+                    client = self._client_for(deadline.remaining())
+                    response = client.invoke_model(modelId=modelId, body=body, **kwargs)
+                except Exception as e:
+                    settled = True
+                    if not is_retryable(e):
+                        # Bedrock answered, so it is healthy even if the request was bad
+                        self.breaker.record_success()
+                        raise
+                    self.breaker.record_failure()
+                    metrics.count('BedrockRetryableErrors')
+                    attempt += 1
+                    if attempt >= self.max_attempts or not self.breaker.allow() or not self._spend_retry():
+                        raise BedrockUnavailable(f"Bedrock unavailable: {str(e)}") from e
+
+                    delay = self._backoff(attempt, error_code(e) == 'ThrottlingException')
+                    if delay + self.min_attempt_time > deadline.remaining():
+                        raise BedrockUnavailable(f"Bedrock unavailable: {str(e)}") from e
+                    self.sleep(delay)
+                    continue
+
+                settled = True
+                self.breaker.record_success()
+                self._refill_retry()
+                return response
+        finally:
+            self._slots.release()
+            if not settled:
+                self.breaker.release_probe()
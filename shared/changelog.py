@@ -0,0 +1,126 @@
+"""
+Per-user task changelog
+A DynamoDB Streams consumer turns writes to the tasks table into compact
+change events numbered by an atomic per-user counter, so the Mac sync can
+pull just the changes after the last sequence number it applied
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional
+
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+
+from shared.task_utils import query_all
+
+DEFAULT_TABLE_NAME = 'task-changelog'
+DEFAULT_USER_ID = 'default'
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+# The per-user counter lives at seq 0, below every real event
+COUNTER_SEQ = 0
+
+EVENT_CREATED = 'created'
+EVENT_UPDATED = 'updated'
+EVENT_COMPLETED = 'completed'
+EVENT_DELETED = 'deleted'
+
+# Attributes that appear in a note; writes that only touch other
+# attributes (such as the sync flags) produce no event
+TRACKED_FIELDS = (
+    'task', 'category', 'priority', 'estimated_time', 'tags', 'source',
+    'timestamp', 'completed', 'completed_at', 'link_status'
+)
+
+
+def image_to_dict(image: Dict) -> Dict:
+    """Convert a typed stream image into plain Python values"""
+    deserializer = TypeDeserializer()
+    return {key: deserializer.deserialize(value) for key, value in (image or {}).items()}
+
+
+def change_event(record: Dict) -> Optional[Dict]:
+    """Compact change event for one stream record, or None if nothing visible changed"""
+    data = record['dynamodb']
+    old = image_to_dict(data.get('OldImage'))
+    new = image_to_dict(data.get('NewImage'))
+    task_id = image_to_dict(data.get('Keys'))['id']
+
+    if record['eventName'] == 'REMOVE':
+        return {'user_id': old.get('user_id', DEFAULT_USER_ID), 'task_id': task_id, 'event': EVENT_DELETED}
+
+    if record['eventName'] == 'INSERT':
+        kind = EVENT_CREATED
+    elif all(old.get(field) == new.get(field) for field in TRACKED_FIELDS):
+        return None
+    elif new.get('completed') and not old.get('completed'):
+        kind = EVENT_COMPLETED
+    else:
+        kind = EVENT_UPDATED
+
+    task = {field: new[field] for field in TRACKED_FIELDS if field in new}
+    task['id'] = task_id
+    return {'user_id': new.get('user_id', DEFAULT_USER_ID), 'task_id': task_id, 'event': kind, 'task': task}
+
+
+def advance_watermark(watermark: int, events: List[Dict], gap_timeout: float = 300.0,
+                      now: Optional[float] = None) -> int:
+    """Highest sequence number up to which every event has been seen
+
+    Concurrent writers reserve sequence numbers before writing, so a
+    later number can become visible before an earlier one. The watermark
+    stops at a gap until the events after it are older than gap_timeout,
+    after which the missing number is assumed to be lost.
+    """
+    now = time.time() if now is None else now
+    for event in sorted(events, key=lambda e: e['seq']):
+        seq = int(event['seq'])
+        if seq <= watermark:
+            continue
+        if seq != watermark + 1 and now - float(event['recorded_at']) < gap_timeout:
+            break
+        watermark = seq
+    return watermark
+
+
+class Changelog:
+    """Change events stored under (user_id, seq) in a DynamoDB table"""
+
+    def __init__(self, table, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+
+    def reserve(self, user_id: str, count: int) -> int:
+        """Atomically reserve count sequence numbers, returning the first"""
+        response = self.table.update_item(
+            Key={'user_id': user_id, 'seq': COUNTER_SEQ},
+            UpdateExpression='ADD next_seq :count',
+            ExpressionAttributeValues={':count': count},
+            ReturnValues='UPDATED_NEW'
+        )
+        return int(response['Attributes']['next_seq']) - count + 1
+
+    def append(self, events: Iterable[Dict]) -> int:
+        """Number and store events, one counter update per user"""
+        by_user = {}
+        for event in events:
+            by_user.setdefault(event['user_id'], []).append(event)
+
+        now = time.time()
+        stored = 0
+        with self.table.batch_writer() as batch:
+            for user_id, user_events in by_user.items():
+                first = self.reserve(user_id, len(user_events))
+                for offset, event in enumerate(user_events):
+                    item = dict(event, seq=first + offset, recorded_at=int(now),
+                                expires_at=int(now) + self.ttl_seconds)
+                    batch.put_item(Item=item)
+                    stored += 1
+        return stored
+
+    def pull(self, user_id: str, after_seq: int) -> List[Dict]:
+        """Events after a sequence number, oldest first"""
+        return query_all(
+            self.table,
+            KeyConditionExpression=Key('user_id').eq(user_id) & Key('seq').gt(after_seq)
+        )
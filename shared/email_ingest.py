@@ -0,0 +1,203 @@
+"""
+Streaming task extraction from raw emails
+Raw messages stored by the SES S3 action (or in a local directory) are
+read in chunks and fed to an incremental BytesFeedParser. The bodies of
+attachments and other non-text parts are dropped before they reach the
+parser, so only text parts are ever held in memory.
+"""
+
+import email.policy
+import html
+import re
+from email.parser import BytesFeedParser, BytesHeaderParser
+from pathlib import Path
+from typing import BinaryIO, List
+
+CHUNK_SIZE = 64 * 1024
+MAX_TASKS_PER_EMAIL = 50
+
+# "- task", "* task", "1. task", "- [ ] task", "[ ] task", "☐ task"
+TASK_LINE = re.compile(
+    r"^\s*(?:(?P<bullet>[-*+•]|\d{1,3}[.)])\s+)?"
+    r"(?:(?P<box>\[(?P<mark>[ xX]?)\]|[☐☑☒])\s*)?"
+    r"(?P<text>\S.*?)\s*$"
+)
+CHECKED_BOXES = ('☑', '☒')
+
+# Everything after a signature separator or a forwarded/replied message is ignored
+STOP_LINE = re.compile(r"^(--|-{3,} ?Original Message ?-{3,}|On .+ wrote:)$")
+
+_HTML_BREAK = re.compile(r"<\s*(br|/p|/div|/li|/h\d|/tr)\b[^>]*>", re.IGNORECASE)
+_HTML_ITEM = re.compile(r"<\s*li\b[^>]*>", re.IGNORECASE)
+_HTML_DROP = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+class TextPartFeed:
+    """BytesFeedParser front end that drops the bodies of non-text MIME parts
+
+    Lines are tracked against the boundaries of the enclosing multiparts;
+    part headers always reach the parser, so the message structure is
+    kept, but attachment bodies are only counted in skipped_bytes.
+    """
+
+    def __init__(self, max_line: int = CHUNK_SIZE):
+        self.parser = BytesFeedParser(policy=email.policy.default)
+        self.max_line = max_line
+        self.boundaries: List[bytes] = []
+        self.in_headers = True
+        self.header_lines: List[bytes] = []
+        self.skipping = False
+        self.skipped_bytes = 0
+        self._partial = b''
+
+    def feed(self, chunk: bytes):
+        lines = (self._partial + chunk).splitlines(keepends=True)
+        self._partial = b''
+        # Keep an unfinished line, or a CR whose LF may be in the next chunk
+        if lines and (not lines[-1].endswith((b'\n', b'\r')) or lines[-1].endswith(b'\r')):
+            self._partial = lines.pop()
+            if len(self._partial) > self.max_line:
+                lines.append(self._partial)
+                self._partial = b''
+        for line in lines:
+            self._feed_line(line)
+
+    def close(self):
+        """Finish parsing and return the message with text parts only"""
+        if self._partial:
+            self._feed_line(self._partial)
+            self._partial = b''
+        return self.parser.close()
+
+    def _feed_line(self, line: bytes):
+        if self.in_headers:
+            self.parser.feed(line)
+            self.header_lines.append(line)
+            if not line.strip():
+                self._start_body(b''.join(self.header_lines))
+            return
+
+        stripped = line.rstrip()
+        if stripped.startswith(b'--') and self.boundaries:
+            marker = stripped[2:]
+            for depth in range(len(self.boundaries) - 1, -1, -1):
+                boundary = self.boundaries[depth]
+                if marker == boundary:
+                    del self.boundaries[depth + 1:]
+                    self.in_headers = True
+                    self.header_lines = []
+                    self.parser.feed(line)
+                    return
+                if marker == boundary + b'--':
+                    del self.boundaries[depth:]
+                    self.skipping = False
+                    self.parser.feed(line)
+                    return
+
+        if self.skipping:
+            self.skipped_bytes += len(line)
+        else:
+            self.parser.feed(line)
+
+    def _start_body(self, headers: bytes):
+        self.in_headers = False
+        part = BytesHeaderParser(policy=email.policy.default).parsebytes(headers)
+        if part.get_content_maintype() == 'multipart':
+            boundary = part.get_boundary()
+            if boundary:
+                self.boundaries.append(boundary.encode('utf-8', 'surrogateescape'))
+            self.skipping = False
+        else:
+            self.skipping = (part.get_content_maintype() != 'text'
+                             or part.get_content_disposition() == 'attachment')
+
+
+def open_raw_email(store_uri: str, message_id: str, s3_client=None) -> BinaryIO:
+    """Open a raw message stored as s3://bucket/prefix<message_id> or in a local directory"""
+    if store_uri.startswith('s3://'):
+        bucket, _, prefix = store_uri[len('s3://'):].partition('/')
+        if s3_client is None:
+            import boto3
+            s3_client = boto3.client('s3')
+        return s3_client.get_object(Bucket=bucket, Key=prefix + message_id)['Body']
+    return open(Path(store_uri) / message_id, 'rb')
+
+
+def parse_raw_email(stream: BinaryIO, chunk_size: int = CHUNK_SIZE):
+    """Parse a raw message from a binary stream, keeping only text part bodies"""
+    feed = TextPartFeed(max_line=chunk_size)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        feed.feed(chunk)
+    return feed.close()
+
+
+def part_text(part) -> str:
+    try:
+        return part.get_content()
+    except (LookupError, UnicodeError):
+        # Unknown or wrong charset
+        return (part.get_payload(decode=True) or b'').decode('utf-8', 'replace')
+
+
+def html_to_text(markup: str) -> str:
+    """Rough plain text of an HTML body, with list items as bullets"""
+    markup = _HTML_DROP.sub('', markup)
+    markup = _HTML_ITEM.sub('\n- ', markup)
+    markup = _HTML_BREAK.sub('\n', markup)
+    return html.unescape(_HTML_TAG.sub('', markup))
+
+
+def message_text(message) -> str:
+    """Body text of a message: its text/plain parts, else its text/html parts"""
+    plain = []
+    markup = []
+    for part in message.walk():
+        if part.is_multipart() or part.get_content_disposition() == 'attachment':
+            continue
+        if part.get_content_type() == 'text/plain':
+            plain.append(part_text(part))
+        elif part.get_content_type() == 'text/html':
+            markup.append(part_text(part))
+    if plain:
+        return '\n'.join(plain)
+    return '\n'.join(html_to_text(text) for text in markup)
+
+
+def extract_tasks(text: str, limit: int = MAX_TASKS_PER_EMAIL) -> List[str]:
+    """One task per bullet or unchecked checkbox line, up to limit
+
+    Quoted lines are skipped, and reading stops at a signature separator
+    or the start of a quoted reply.
+    """
+    tasks = []
+    for line in text.splitlines():
+        if STOP_LINE.match(line.strip()):
+            break
+        if line.lstrip().startswith('>'):
+            continue
+
+        match = TASK_LINE.match(line)
+        if not match or not (match.group('bullet') or match.group('box')):
+            continue
+        if (match.group('mark') or '').strip() or match.group('box') in CHECKED_BOXES:
+            continue
+
+        tasks.append(match.group('text'))
+        if len(tasks) >= limit:
+            break
+    return tasks
+
+
+def read_email_tasks(store_uri: str, message_id: str, s3_client=None,
+                     chunk_size: int = CHUNK_SIZE) -> List[str]:
+    """Tasks listed in the body of a stored raw message"""
+    stream = open_raw_email(store_uri, message_id, s3_client)
+    try:
+        message = parse_raw_email(stream, chunk_size)
+    finally:
+        stream.close()
+    return extract_tasks(message_text(message))
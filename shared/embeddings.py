@@ -0,0 +1,177 @@
+"""
+Embedding-based similarity for task linking
+Tasks are embedded once when stored and the vector is written with the
+task item, so concurrent writers never share a file. Searches load the
+vectors into a compact float32 matrix for a vectorized cosine top-K search
+"""
+
+import base64
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from shared.link_index import task_terms
+
+DEFAULT_DIMENSION = 256
+TITAN_EMBED_MODEL_ID = 'amazon.titan-embed-text-v2:0'
+
+# Task item attribute holding the task's vector
+EMBEDDING_ATTRIBUTE = 'embedding'
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def embedding_text(task: Dict) -> str:
+    """Text that represents a task for embedding"""
+    tags = " ".join(str(tag) for tag in task.get('tags', []) or [])
+    return f"{task.get('task', '')} {task.get('category', '')} {tags}".strip()
+
+
+class HashingEmbedder:
+    """Deterministic local embedder using signed feature hashing
+
+    Needs no network access, which makes it suitable for tests and
+    as a cheap default.
+    """
+
+    def __init__(self, dimension: int = DEFAULT_DIMENSION):
+        self.dimension = dimension
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'little')
+        sign = 1.0 if value & 1 else -1.0
+        return (value >> 1) % self.dimension, sign
+
+    def embed(self, task: Dict) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        terms = task_terms(task)
+        features = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+        for feature in features:
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+        return _normalize(vector)
+
+
+class BedrockEmbedder:
+    """Embedder backed by a Bedrock Titan text embedding model"""
+
+    def __init__(self, bedrock_client, dimension: int = DEFAULT_DIMENSION,
+                 model_id: str = TITAN_EMBED_MODEL_ID):
+        self.bedrock = bedrock_client
+        self.dimension = dimension
+        self.model_id = model_id
+
+    def embed(self, task: Dict) -> np.ndarray:
+        response = self.bedrock.invoke_model(
+            modelId=self.model_id,
+            body=json.dumps({
+                'inputText': embedding_text(task),
+                'dimensions': self.dimension,
+                'normalize': True
+            })
+        )
+        result = json.loads(response['body'].read())
+        return _normalize(np.asarray(result['embedding'], dtype=np.float32))
+
+
+def create_embedder(name: str, bedrock_client=None, dimension: int = DEFAULT_DIMENSION):
+    """Build an embedder by name ('hashing' or 'bedrock')"""
+    if name == 'hashing':
+        return HashingEmbedder(dimension)
+    if name == 'bedrock':
+        return BedrockEmbedder(bedrock_client, dimension)
+    raise ValueError(f"Unknown embedder: {name}")
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """Item attribute for a vector, as base64 float16 to keep task items small"""
+    return base64.b64encode(np.asarray(vector, dtype='<f2').tobytes()).decode('ascii')
+
+
+def decode_vector(value: str) -> np.ndarray:
+    """Unit float32 vector from an encoded item attribute"""
+    return _normalize(np.frombuffer(base64.b64decode(value), dtype='<f2').astype(np.float32))
+
+
+class EmbeddingStore:
+    """Task IDs plus a row-aligned float32 matrix of unit vectors"""
+
+    def __init__(self, dimension: int = DEFAULT_DIMENSION):
+        self.dimension = dimension
+        self.ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self.ids)]
+
+    def get(self, task_id: str) -> Optional[np.ndarray]:
+        """Return the stored vector for a task, if any"""
+        position = self._positions.get(task_id)
+        return None if position is None else self._matrix[position]
+
+    def add(self, task_id: str, vector: np.ndarray):
+        """Insert or replace the vector for a task"""
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dimension,):
+            raise ValueError(f"Expected vector of dimension {self.dimension}, got {vector.shape}")
+
+        if task_id in self._positions:
+            self._matrix[self._positions[task_id]] = vector
+            return
+
+        row = len(self.ids)
+        if row == self._matrix.shape[0]:
+            # Grow geometrically so appends stay amortized O(1)
+            grown = np.zeros((max(16, row * 2), self.dimension), dtype=np.float32)
+            grown[:row] = self._matrix[:row]
+            self._matrix = grown
+
+        self._matrix[row] = vector
+        self.ids.append(task_id)
+        self._positions[task_id] = row
+
+    def search(self, vector: np.ndarray, top_k: int, exclude: Optional[Iterable[str]] = None,
+               min_score: float = -1.0) -> List[Tuple[str, float]]:
+        """Return up to top_k (task_id, cosine similarity) pairs, best first"""
+        if not self.ids or top_k <= 0:
+            return []
+
+        scores = self.vectors @ np.asarray(vector, dtype=np.float32)
+        for task_id in exclude or ():
+            position = self._positions.get(task_id)
+            if position is not None:
+                scores[position] = -np.inf
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (self.ids[i], float(scores[i]))
+            for i in top
+            if scores[i] >= min_score and np.isfinite(scores[i])
+        ]
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict], dimension: int = DEFAULT_DIMENSION) -> 'EmbeddingStore':
+        """Build the matrix from the task items that carry a vector of this dimension"""
+        store = cls(dimension)
+        for item in items:
+            if item.get(EMBEDDING_ATTRIBUTE):
+                vector = decode_vector(item[EMBEDDING_ATTRIBUTE])
+                if vector.shape == (dimension,):
+                    store.add(item['id'], vector)
+        return store
@@ -0,0 +1,61 @@
+"""
+Job queues
+Work that runs off the request path is sent as JSON jobs to an SQS queue
+that a worker Lambda drains in batches
+"""
+
+import json
+from collections import deque
+from typing import Dict, List
+
+SQS_MAX_BATCH = 10
+
+
+class SqsJobQueue:
+    """Job queue backed by an SQS queue"""
+
+    def __init__(self, queue_url: str, sqs_client=None):
+        if sqs_client is None:
+            import boto3
+            sqs_client = boto3.client('sqs')
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+
+    def enqueue(self, job: Dict):
+        self.sqs.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(job))
+
+    def enqueue_many(self, jobs: List[Dict]):
+        for start in range(0, len(jobs), SQS_MAX_BATCH):
+            chunk = jobs[start:start + SQS_MAX_BATCH]
+            response = self.sqs.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {'Id': str(i), 'MessageBody': json.dumps(job)}
+                    for i, job in enumerate(chunk)
+                ]
+            )
+            if response.get('Failed'):
+                raise RuntimeError(f"Failed to enqueue {len(response['Failed'])} jobs")
+
+
+class InProcessJobQueue:
+    """Job queue held in memory, used for tests and local runs"""
+
+    def __init__(self):
+        self.jobs = deque()
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def enqueue(self, job: Dict):
+        self.jobs.append(job)
+
+    def enqueue_many(self, jobs: List[Dict]):
+        self.jobs.extend(jobs)
+
+    def receive(self, max_jobs: int = SQS_MAX_BATCH) -> List[Dict]:
+        """Remove and return up to max_jobs queued jobs"""
+        batch = []
+        while self.jobs and len(batch) < max_jobs:
+            batch.append(self.jobs.popleft())
+        return batch
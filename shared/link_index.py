@@ -0,0 +1,137 @@
+"""
+Candidate selection for task linking
+Ranks existing tasks against a new task so only the closest
+matches are sent to Bedrock for link discovery
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'i',
+    'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'the', 'this', 'to',
+    'up', 'with'
+])
+
+SCORING_METHODS = ('bm25', 'tfidf')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into index terms"""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def task_terms(task: Dict) -> List[str]:
+    """Collect index terms from a task's text, category and tags"""
+    terms = tokenize(task.get('task', ''))
+    terms.extend(tokenize(task.get('category', '')))
+    for tag in task.get('tags', []) or []:
+        terms.extend(tokenize(str(tag)))
+    return terms
+
+
+class TaskIndex:
+    """In-memory inverted index over tasks with BM25 or TF-IDF scoring"""
+
+    def __init__(self, scoring: str = 'bm25', k1: float = 1.5, b: float = 0.75):
+        if scoring not in SCORING_METHODS:
+            raise ValueError(f"Unknown scoring method: {scoring}")
+
+        self.scoring = scoring
+        self.k1 = k1
+        self.b = b
+
+        self.task_ids: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._total_length = 0
+        self._doc_norms: Optional[List[float]] = None
+
+    def __len__(self):
+        return len(self.task_ids)
+
+    def add(self, task_id: str, task: Dict):
+        """Add a task to the index"""
+        doc = len(self.task_ids)
+        counts = Counter(task_terms(task))
+
+        self.task_ids.append(task_id)
+        self.doc_lengths.append(sum(counts.values()))
+        self._total_length += self.doc_lengths[-1]
+        for term, tf in counts.items():
+            self.postings[term][doc] = tf
+
+        self._doc_norms = None
+
+    def add_all(self, tasks: Iterable[Dict]):
+        """Add tasks keyed by their 'id' field"""
+        for task in tasks:
+            self.add(task['id'], task)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.task_ids)
+        if self.scoring == 'bm25':
+            return math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return math.log((1 + n) / (1 + df)) + 1
+
+    def _tfidf_norms(self) -> List[float]:
+        if self._doc_norms is None:
+            squares = [0.0] * len(self.task_ids)
+            for term, docs in self.postings.items():
+                idf = self._idf(term)
+                for doc, tf in docs.items():
+                    squares[doc] += ((1 + math.log(tf)) * idf) ** 2
+            self._doc_norms = [math.sqrt(s) or 1.0 for s in squares]
+        return self._doc_norms
+
+    def search(self, task: Dict, top_k: int, exclude: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to top_k (task_id, score) pairs most similar to task
+
+        Only tasks sharing at least one term with the query are returned.
+        """
+        if not self.task_ids or top_k <= 0:
+            return []
+
+        excluded = set(exclude or ())
+        query = Counter(task_terms(task))
+        scores: Dict[int, float] = defaultdict(float)
+
+        if self.scoring == 'bm25':
+            avg_length = self._total_length / len(self.task_ids) or 1.0
+            for term in query:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = self._idf(term)
+                for doc, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc] / avg_length)
+                    scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        else:
+            norms = self._tfidf_norms()
+            for term, qtf in query.items():
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = self._idf(term)
+                query_weight = (1 + math.log(qtf)) * idf
+                for doc, tf in docs.items():
+                    scores[doc] += query_weight * (1 + math.log(tf)) * idf / norms[doc]
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for doc, score in ranked:
+            task_id = self.task_ids[doc]
+            if task_id in excluded:
+                continue
+            results.append((task_id, score))
+            if len(results) >= top_k:
+                break
+        return results
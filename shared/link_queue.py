@@ -0,0 +1,34 @@
+"""
+Link job queues
+Link discovery runs off the request path: the API handler enqueues a
+job per stored task and a worker drains the queue in batches
+"""
+
+from typing import Dict
+
+from shared.job_queue import SQS_MAX_BATCH, InProcessJobQueue, SqsJobQueue
+
+# Values of the link_status attribute on task items
+LINK_PENDING = 'pending'
+LINK_DONE = 'linked'
+LINK_FAILED = 'failed'
+
+
+def make_link_job(task_id: str, organized_task: Dict) -> Dict:
+    """Build the job payload for one stored task"""
+    return {
+        'task_id': task_id,
+        'task': {
+            'task': organized_task['task'],
+            'category': organized_task['category'],
+            'tags': list(organized_task.get('tags', []))
+        }
+    }
+
+
+class SqsLinkQueue(SqsJobQueue):
+    """Link queue backed by an SQS queue consumed by the link worker Lambda"""
+
+
+class InProcessLinkQueue(InProcessJobQueue):
+    """Link queue held in memory, used for tests and local runs"""
@@ -0,0 +1,138 @@
+"""
+Local keyword classifier for tasks
+All keywords are matched in a single pass of one compiled regex, and the
+weighted matches give a category, priority, tags and a confidence score.
+Obvious tasks ("buy milk", "gym at 6") can skip Bedrock entirely.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# (keywords, category, weight, tag); higher weights are stronger signals
+CATEGORY_RULES: List[Tuple[Tuple[str, ...], str, float, str]] = [
+    (('buy', 'buying', 'shop', 'shopping', 'purchase', 'pick up'), 'Shopping', 2.0, 'shopping'),
+    (('grocery', 'groceries', 'supermarket', 'costco'), 'Shopping', 3.0, 'groceries'),
+    (('milk', 'eggs', 'bread', 'butter', 'cheese', 'coffee', 'vegetables', 'fruit'), 'Shopping', 2.0, 'groceries'),
+    (('work', 'meeting', 'meetings', 'standup', 'deadline', 'client', 'report', 'presentation',
+      'slides', 'boss', 'manager', 'invoice'), 'Work', 3.0, 'work'),
+    (('project', 'prototype', 'roadmap', 'milestone', 'release', 'deploy'), 'Projects', 2.0, 'project'),
+    (('doctor', 'dentist', 'appointment', 'prescription', 'pharmacy', 'checkup', 'health'), 'Health', 3.0, 'health'),
+    (('gym', 'exercise', 'workout', 'running', 'yoga', 'swim', 'stretch'), 'Health', 3.0, 'fitness'),
+    (('learn', 'learning', 'study', 'studying', 'course', 'tutorial', 'lecture', 'reading',
+      'practice'), 'Learning', 3.0, 'learning'),
+    # Words with common other senses ("run payroll", "book flights",
+    # "store tires", "read the contract") only lean towards a category
+    (('order', 'store'), 'Shopping', 1.0, 'shopping'),
+    (('review',), 'Work', 1.0, 'work'),
+    (('run', 'walk'), 'Health', 1.0, 'fitness'),
+    (('read', 'book'), 'Learning', 1.0, 'learning'),
+    (('call', 'text', 'birthday', 'mom', 'dad', 'family', 'friend', 'laundry', 'clean', 'bills',
+      'rent'), 'Personal', 2.0, 'personal'),
+]
+
+PRIORITY_RULES: Dict[str, Tuple[str, ...]] = {
+    'high': ('urgent', 'asap', 'immediately', 'critical', 'today', 'tonight', 'deadline', 'overdue'),
+    'low': ('later', 'someday', 'maybe', 'eventually', 'sometime', 'whenever'),
+}
+
+DEFAULT_MINUTES = {
+    'Shopping': 30,
+    'Work': 60,
+    'Projects': 120,
+    'Health': 45,
+    'Learning': 60,
+    'Personal': 30,
+}
+
+QUICK_TASK_WORDS = ('call', 'text', 'email', 'reply', 'pay')
+QUICK_TASK_MINUTES = 10
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.75
+
+# A category needs this many distinct agreeing keywords to be confident;
+# a lone keyword, however strong, is capped below the default threshold
+MIN_AGREEING_SIGNALS = 2
+SINGLE_SIGNAL_CONFIDENCE = 0.5
+
+
+def _build_signals():
+    signals = defaultdict(list)
+    for keywords, category, weight, tag in CATEGORY_RULES:
+        for keyword in keywords:
+            signals[keyword].append(('category', category, weight, tag))
+    for priority, keywords in PRIORITY_RULES.items():
+        for keyword in keywords:
+            signals[keyword].append(('priority', priority, 0.0, None))
+    for keyword in QUICK_TASK_WORDS:
+        signals[keyword].append(('quick', None, 0.0, None))
+    return dict(signals)
+
+
+_SIGNALS = _build_signals()
+
+# Longest keywords first so phrases like "pick up" win over shorter matches
+_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(k) for k in sorted(_SIGNALS, key=len, reverse=True)) + r")\b"
+)
+
+
+def classify_task(task_text: str) -> Dict:
+    """Classify a task locally, returning the organized fields plus 'confidence'
+
+    Confidence is the winning category's weight against the runner-up
+    plus a prior, so several agreeing keywords score high while a lone,
+    conflicting or absent keyword scores low.
+    """
+    scores = defaultdict(float)
+    matched = defaultdict(set)
+    tags = defaultdict(list)
+    priorities = set()
+    quick = False
+
+    for match in _PATTERN.finditer(task_text.lower()):
+        for kind, value, weight, tag in _SIGNALS[match.group(1)]:
+            if kind == 'category':
+                scores[value] += weight
+                matched[value].add(match.group(1))
+                if tag not in tags[value]:
+                    tags[value].append(tag)
+            elif kind == 'priority':
+                priorities.add(value)
+            else:
+                quick = True
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if ranked:
+        category, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = best / (best + runner_up + 1.0)
+        if len(matched[category]) < MIN_AGREEING_SIGNALS:
+            confidence = min(confidence, SINGLE_SIGNAL_CONFIDENCE)
+    else:
+        category, confidence = 'Personal', 0.0
+
+    if 'high' in priorities:
+        priority = 'high'
+    elif 'low' in priorities:
+        priority = 'low'
+    else:
+        priority = 'medium'
+
+    return {
+        'task': task_text,
+        'category': category,
+        'priority': priority,
+        'estimated_time': QUICK_TASK_MINUTES if quick else DEFAULT_MINUTES[category],
+        'tags': tags[category],
+        'confidence': round(confidence, 3)
+    }
+
+
+def confident_organization(task_text: str, threshold: float = DEFAULT_CONFIDENCE_THRESHOLD):
+    """Local organization when it clears the confidence threshold, else None"""
+    result = classify_task(task_text)
+    if result['confidence'] < threshold:
+        return None
+    result['organized_by'] = 'local'
+    return result
@@ -0,0 +1,89 @@
+"""
+Outbound WhatsApp confirmations
+Task confirmations are sent through the Twilio Messages API after the
+webhook has answered, one message per sender for all of their tasks in
+a worker batch
+"""
+
+import os
+from typing import Dict, List, Optional
+
+TWILIO_MESSAGES_URL = 'https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json'
+HTTP_TIMEOUT_SECONDS = 10
+
+
+class MessagingError(Exception):
+    """The messaging API did not accept a message"""
+
+
+class TwilioMessenger:
+    """Sends WhatsApp messages with the Twilio REST API"""
+
+    def __init__(self, account_sid: str, auth_token: str, session=None,
+                 timeout: float = HTTP_TIMEOUT_SECONDS):
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.url = TWILIO_MESSAGES_URL.format(account_sid=account_sid)
+        self.auth = (account_sid, auth_token)
+        self.session = session
+        self.timeout = timeout
+
+    def send(self, sender: str, recipient: str, body: str):
+        response = self.session.post(
+            self.url,
+            data={'From': sender, 'To': recipient, 'Body': body},
+            auth=self.auth,
+            timeout=self.timeout
+        )
+        if response.status_code >= 300:
+            raise MessagingError(f"Twilio returned {response.status_code}: {response.text}")
+
+
+class LocalMessenger:
+    """Records messages instead of sending them, used for tests and local runs"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, sender: str, recipient: str, body: str):
+        self.sent.append((sender, recipient, body))
+        print(f"Message to {recipient}: {body}")
+
+
+def create_messenger():
+    """Twilio messenger when TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN are set, else a local one"""
+    account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
+    auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
+    if account_sid and auth_token:
+        return TwilioMessenger(account_sid, auth_token)
+    return LocalMessenger()
+
+
+def format_confirmation(organized_tasks: List[Optional[Dict]]) -> str:
+    """Confirmation text for one sender's tasks; None marks a task that failed"""
+    if len(organized_tasks) == 1:
+        organized = organized_tasks[0]
+        if organized is None:
+            return "❌ Failed to organize task"
+        return (
+            f"✅ Task organized!\n"
+            f"Category: {organized.get('category', 'Unknown')}\n"
+            f"Priority: {organized.get('priority', 'medium')}\n"
+            f"Est. time: {organized.get('estimated_time', 30)} min"
+        )
+
+    organized_count = sum(1 for organized in organized_tasks if organized is not None)
+    if organized_count == len(organized_tasks):
+        lines = [f"✅ {organized_count} tasks organized!"]
+    else:
+        lines = [f"✅ {organized_count} of {len(organized_tasks)} tasks organized!"]
+    for organized in organized_tasks:
+        if organized is None:
+            lines.append("• ❌ Failed to organize task")
+        else:
+            lines.append(
+                f"• {organized.get('task', '')}: {organized.get('category', 'Unknown')}, "
+                f"{organized.get('priority', 'medium')}, {organized.get('estimated_time', 30)} min"
+            )
+    return "\n".join(lines)
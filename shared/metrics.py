@@ -0,0 +1,135 @@
+"""
+Per-invocation metrics in CloudWatch Embedded Metric Format
+Stages are timed with spans and events are counted while an invocation
+runs, then printed as a single EMF record that CloudWatch turns into
+metrics without any API calls. Whether an invocation logs full prompts
+is sampled once, when it starts.
+"""
+
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TaskOrganizer')
+
+# Share of invocations that log whole prompts and model replies
+DEBUG_SAMPLE_RATE = float(os.environ.get('DEBUG_SAMPLE_RATE', '0'))
+
+ORGANIZED_BY_COUNTERS = {
+    'bedrock': 'BedrockOrganizations',
+    'cache': 'CacheOrganizations',
+    'local': 'LocalOrganizations',
+    'fallback': 'FallbackOrganizations',
+}
+
+
+class Metrics:
+    """Timings and counters of one invocation"""
+
+    def __init__(self, function: Optional[str] = None, debug_rate: float = 0.0, clock=time.perf_counter):
+        self.dimensions = {'Function': function or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')}
+        self.debug = random.random() < debug_rate
+        self.clock = clock
+        self.timings: Dict[str, list] = {}
+        self.counters: Dict[str, float] = {}
+        self._started = clock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a stage; repeated spans of one stage add up"""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed_ms = (self.clock() - start) * 1000
+            with self._lock:
+                timing = self.timings.setdefault(name, [0.0, 0])
+                timing[0] += elapsed_ms
+                timing[1] += 1
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self) -> Dict:
+        """The invocation's EMF record"""
+        values = {'DurationMs': round((self.clock() - self._started) * 1000, 1)}
+        units = {'DurationMs': 'Milliseconds'}
+        with self._lock:
+            for name, (total_ms, calls) in self.timings.items():
+                values[f'{name}Ms'] = round(total_ms, 1)
+                units[f'{name}Ms'] = 'Milliseconds'
+                values[f'{name}Calls'] = calls
+                units[f'{name}Calls'] = 'Count'
+            for name, value in self.counters.items():
+                values[name] = value
+                units[name] = 'Count'
+
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [list(self.dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, unit in units.items()]
+                }]
+            },
+            **self.dimensions,
+            **values
+        }
+
+    def emit(self):
+        print(json.dumps(self.record()))
+
+
+# Lambda runs one invocation per container at a time; spans outside an
+# instrumented handler go to a record that is never emitted
+_current = Metrics()
+
+
+def start_invocation(function: Optional[str] = None) -> Metrics:
+    global _current
+    _current = Metrics(function, DEBUG_SAMPLE_RATE)
+    return _current
+
+
+def current() -> Metrics:
+    return _current
+
+
+def span(name: str):
+    return _current.span(name)
+
+
+def count(name: str, value: float = 1):
+    _current.count(name, value)
+
+
+def debug_enabled() -> bool:
+    """Whether this invocation was sampled for full prompt logging"""
+    return _current.debug
+
+
+def count_organizations(organized_tasks: Iterable[Dict]):
+    """Count organized tasks by what organized them"""
+    for organized in organized_tasks:
+        if organized is not None:
+            count(ORGANIZED_BY_COUNTERS.get(organized.get('organized_by', 'bedrock'), 'BedrockOrganizations'))
+
+
+def instrument(handler):
+    """Emit one metrics record for every invocation of a Lambda handler"""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        invocation = start_invocation(getattr(context, 'function_name', None))
+        try:
+            return handler(event, context)
+        finally:
+            invocation.emit()
+    return wrapper
@@ -0,0 +1,174 @@
+"""
+Cache for Bedrock task organization results
+Recurring tasks like "buy groceries" are organized once and then served
+from an in-memory LRU tier or a shared DynamoDB tier
+"""
+
+import copy
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+DEFAULT_TABLE_NAME = 'task-organization-cache'
+DEFAULT_LOCAL_SIZE = 512
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_task_text(text: str) -> str:
+    """Normalize task text so near-identical tasks share a cache entry"""
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def cache_version(prompt_template: str, model_id: str, salt: str = '') -> str:
+    """Version tag that changes whenever the prompt or model changes"""
+    digest = hashlib.sha256(f"{model_id}\n{prompt_template}\n{salt}".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+class LRUCache:
+    """Bounded least-recently-used mapping"""
+
+    def __init__(self, maxsize: int = DEFAULT_LOCAL_SIZE):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+
+class DynamoDBCacheTier:
+    """Shared cache tier stored in a DynamoDB table with a TTL attribute"""
+
+    def __init__(self, table, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict]:
+        response = self.table.get_item(Key={'cache_key': key})
+        item = response.get('Item')
+        # DynamoDB deletes expired items lazily, so check the TTL here too
+        if not item or int(item['expires_at']) <= time.time():
+            return None
+        return json.loads(item['organized'])
+
+    def put(self, key: str, organized: Dict):
+        self.table.put_item(Item={
+            'cache_key': key,
+            'organized': json.dumps(organized),
+            'expires_at': int(time.time()) + self.ttl_seconds
+        })
+
+
+class OrganizationCache:
+    """Two-tier cache of organized tasks keyed on normalized task text"""
+
+    def __init__(self, version: str, local_size: int = DEFAULT_LOCAL_SIZE, shared_tier=None):
+        self.version = version
+        self.local = LRUCache(local_size)
+        self.shared = shared_tier
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _key(self, task_text: str) -> str:
+        return f"{self.version}:{normalize_task_text(task_text)}"
+
+    def get(self, task_text: str) -> Optional[Dict]:
+        """Return a cached organization for the task text, or None"""
+        key = self._key(task_text)
+
+        organized = self.local.get(key)
+        if organized is None and self.shared is not None:
+            try:
+                organized = self.shared.get(key)
+            except Exception as e:
+                print(f"Organization cache read error: {str(e)}")
+                organized = None
+            if organized is not None:
+                self.shared_hits += 1
+                self.local.put(key, organized)
+
+        if organized is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        result = copy.deepcopy(organized)
+        result['task'] = task_text
+        result['organized_by'] = 'cache'
+        return result
+
+    def put(self, task_text: str, organized: Dict):
+        """Cache an organization produced by Bedrock"""
+        key = self._key(task_text)
+        organized = {field: value for field, value in organized.items() if field != 'organized_by'}
+        self.local.put(key, copy.deepcopy(organized))
+        if self.shared is not None:
+            try:
+                self.shared.put(key, organized)
+            except Exception as e:
+                print(f"Organization cache write error: {str(e)}")
+
+    def invalidate(self, version: Optional[str] = None):
+        """Drop cached results, e.g. after the prompt or model ID changes
+
+        Shared entries are namespaced by version, so switching version
+        hides old entries until their TTL removes them.
+        """
+        self.local.clear()
+        if version is not None:
+            self.version = version
+
+    def stats(self) -> Dict:
+        return {
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'evictions': self.local.evictions,
+            'size': len(self.local)
+        }
+
+
+def create_organization_cache(prompt_template: str, model_id: str, dynamodb=None,
+                              table_name: Optional[str] = DEFAULT_TABLE_NAME,
+                              local_size: int = DEFAULT_LOCAL_SIZE,
+                              ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                              salt: str = '') -> OrganizationCache:
+    """Build a cache whose version tracks the prompt and model ID
+
+    The shared DynamoDB tier is skipped when no table name is given.
+    """
+    shared_tier = None
+    if table_name:
+        if dynamodb is None:
+            import boto3
+            dynamodb = boto3.resource('dynamodb')
+        shared_tier = DynamoDBCacheTier(dynamodb.Table(table_name), ttl_seconds)
+
+    return OrganizationCache(
+        cache_version(prompt_template, model_id, salt),
+        local_size=local_size,
+        shared_tier=shared_tier
+    )
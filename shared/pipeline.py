@@ -0,0 +1,218 @@
+"""
+Task ingestion pipeline for trigger Lambdas
+Validates, organizes, stores and enqueues link discovery for a task in
+the trigger's own Lambda, instead of posting it to the task API and
+paying for a second invocation and HTTPS round trip per message
+"""
+
+import os
+import time
+from typing import Dict, List, Optional
+
+from shared import metrics
+from shared.link_queue import LINK_FAILED, LINK_PENDING, SqsLinkQueue, make_link_job
+from shared.task_utils import TaskOrganizer, organized_from_item, task_id_for, validate_task_input
+
+INGEST_DIRECT = 'direct'
+INGEST_HTTP = 'http'
+
+HTTP_TIMEOUT_SECONDS = 10
+
+# Fields read back for tasks that were ingested before
+STORED_FIELDS = ('id', 'task', 'category', 'priority', 'estimated_time', 'tags')
+
+
+class IngestError(Exception):
+    """A task could not be organized and stored"""
+
+
+class InvalidTask(IngestError):
+    """Task text that fails validation"""
+
+
+class TaskPipeline:
+    """validate → organize → store → link-enqueue, run in process
+    
+    Without a link queue the task is stored without a link_status and no
+    links are looked for, so create_ingestor never builds one without it.
+    """
+    
+    def __init__(self, organizer: Optional[TaskOrganizer] = None, link_queue=None,
+                 region: str = 'us-east-1'):
+        self.organizer = organizer or TaskOrganizer(region=region)
+        self.link_queue = link_queue
+    
+    def ingest(self, task_text: str, source: str, deadline=None, idempotency_key: Optional[str] = None) -> Dict:
+        """Ingest one task, returning its ID, organization and elapsed time
+        
+        A task whose idempotency key was ingested before is answered from
+        the stored task without organizing it again.
+        """
+        start = time.perf_counter()
+        if not isinstance(task_text, str) or not validate_task_input(task_text):
+            raise InvalidTask(f"Invalid task: {task_text!r}")
+        
+        task_id = task_id_for(idempotency_key)
+        if idempotency_key:
+            existing = self.organizer.store.get_tasks([task_id], attributes=STORED_FIELDS).get(task_id)
+            if existing is not None:
+                return {
+                    'id': task_id,
+                    'organized_task': organized_from_item(existing),
+                    'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+                    'duplicate': True
+                }
+        
+        organized = self.organizer.organize_task(task_text.strip(), deadline)
+        metrics.count_organizations([organized])
+        link_status = LINK_PENDING if self.link_queue is not None else None
+        self.organizer.store_task(organized, source, link_status=link_status, task_id=task_id)
+        
+        if self.link_queue is not None:
+            try:
+                self.link_queue.enqueue(make_link_job(task_id, organized))
+            except Exception as e:
+                print(f"Link enqueue error: {str(e)}")
+                self._set_link_failed(task_id)
+        
+        return {
+            'id': task_id,
+            'organized_task': organized,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+    
+    def ingest_many(self, task_texts: List[str], source: str, deadline=None,
+                    idempotency_keys: Optional[List[Optional[str]]] = None) -> Dict:
+        """Ingest several tasks with one batched organize and store
+        
+        Invalid texts are dropped; the IDs and organizations of the rest
+        are returned in order.
+        """
+        start = time.perf_counter()
+        keys = idempotency_keys or [None] * len(task_texts)
+        entries = [
+            (text.strip(), key) for text, key in zip(task_texts, keys)
+            if isinstance(text, str) and validate_task_input(text)
+        ]
+        if not entries:
+            raise InvalidTask("No valid tasks")
+        
+        task_ids = [task_id_for(key) for _, key in entries]
+        existing = self.organizer.store.get_tasks(
+            [task_id for task_id, (_, key) in zip(task_ids, entries) if key], attributes=STORED_FIELDS
+        )
+        new = [i for i, task_id in enumerate(task_ids) if task_id not in existing]
+        
+        organized_tasks = [
+            organized_from_item(existing[task_id]) if task_id in existing else None for task_id in task_ids
+        ]
+        if new:
+            organized_new = self.organizer.organize_tasks([entries[i][0] for i in new], deadline)
+            metrics.count_organizations(organized_new)
+            link_status = LINK_PENDING if self.link_queue is not None else None
+            self.organizer.store_tasks(
+                organized_new, [source] * len(new), link_status=link_status, task_ids=[task_ids[i] for i in new]
+            )
+            for i, organized in zip(new, organized_new):
+                organized_tasks[i] = organized
+            
+            if self.link_queue is not None:
+                try:
+                    self.link_queue.enqueue_many([
+                        make_link_job(task_ids[i], organized) for i, organized in zip(new, organized_new)
+                    ])
+                except Exception as e:
+                    print(f"Link enqueue error: {str(e)}")
+                    for i in new:
+                        self._set_link_failed(task_ids[i])
+        
+        return {
+            'ids': task_ids,
+            'organized_tasks': organized_tasks,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+    
+    def _set_link_failed(self, task_id: str):
+        self.organizer.store.set_link_status(task_id, LINK_FAILED)
+
+
+class HttpIngestor:
+    """Same interface as TaskPipeline, posting the task to the task API"""
+    
+    def __init__(self, endpoint: str, session=None, timeout: float = HTTP_TIMEOUT_SECONDS):
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.endpoint = endpoint
+        self.session = session
+        self.timeout = timeout
+    
+    def ingest(self, task_text: str, source: str, deadline=None, idempotency_key: Optional[str] = None) -> Dict:
+        start = time.perf_counter()
+        payload = {'task': task_text, 'source': source}
+        if idempotency_key:
+            payload['idempotency_key'] = idempotency_key
+        response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise IngestError(f"Task API returned {response.status_code}: {response.text}")
+        
+        result = response.json()
+        return {
+            'id': result.get('id'),
+            'organized_task': result.get('organized_task', {}),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+    
+    def ingest_many(self, task_texts: List[str], source: str, deadline=None,
+                    idempotency_keys: Optional[List[Optional[str]]] = None) -> Dict:
+        start = time.perf_counter()
+        keys = idempotency_keys or [None] * len(task_texts)
+        tasks = []
+        for text, key in zip(task_texts, keys):
+            entry = {'task': text, 'source': source}
+            if key:
+                entry['idempotency_key'] = key
+            tasks.append(entry)
+        response = self.session.post(self.endpoint, json={'tasks': tasks}, timeout=self.timeout)
+        if response.status_code != 200:
+            raise IngestError(f"Task API returned {response.status_code}: {response.text}")
+        
+        result = response.json()
+        return {
+            'ids': result.get('ids', []),
+            'organized_tasks': result.get('organized_tasks', []),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+
+
+def default_ingest_mode() -> str:
+    """'http' for deployments with a task API endpoint but no link queue, else 'direct'"""
+    if os.environ.get('TASK_API_ENDPOINT') and not os.environ.get('LINK_QUEUE_URL'):
+        return INGEST_HTTP
+    return INGEST_DIRECT
+
+
+def create_ingestor(mode: Optional[str] = None):
+    """Ingestor for TASK_INGEST_MODE: 'direct' or 'http'
+    
+    The HTTP path posts to TASK_API_ENDPOINT; the direct path enqueues
+    link jobs on LINK_QUEUE_URL and refuses to start without it, since
+    link discovery only runs in the link worker. Without TASK_INGEST_MODE,
+    triggers that only have TASK_API_ENDPOINT keep posting to the API.
+    """
+    mode = mode or os.environ.get('TASK_INGEST_MODE') or default_ingest_mode()
+    if mode == INGEST_HTTP:
+        return HttpIngestor(os.environ['TASK_API_ENDPOINT'])
+    if mode != INGEST_DIRECT:
+        raise ValueError(f"Unknown ingest mode: {mode}")
+    
+    queue_url = os.environ.get('LINK_QUEUE_URL')
+    if not queue_url:
+        raise ValueError(
+            "Direct ingestion needs LINK_QUEUE_URL to find task links; "
+            "set it or use TASK_INGEST_MODE=http"
+        )
+    return TaskPipeline(
+        link_queue=SqsLinkQueue(queue_url),
+        region=os.environ.get('AWS_REGION', 'us-east-1')
+    )
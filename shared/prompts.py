@@ -0,0 +1,261 @@
+"""
+Compact prompts for Bedrock calls
+Task text is normalized and truncated, link candidates are referred to by
+short per-request numbers instead of their UUIDs, and candidate lists are
+cut to an input token budget. Built prompts carry their token estimate,
+and model usage is counted in the invocation's metrics.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List
+
+from shared import metrics
+
+# Longest task text sent to the model; the organize prompt holds a single
+# task, link prompts hold one line per candidate
+ORGANIZE_MAX_CHARS = int(os.environ.get('ORGANIZE_MAX_CHARS', '500'))
+LINK_TASK_MAX_CHARS = int(os.environ.get('LINK_TASK_MAX_CHARS', '120'))
+LINK_PROMPT_TOKEN_BUDGET = int(os.environ.get('LINK_PROMPT_TOKEN_BUDGET', '1200'))
+BATCH_LINK_PROMPT_TOKEN_BUDGET = int(os.environ.get('BATCH_LINK_PROMPT_TOKEN_BUDGET', '3000'))
+
+# Output tokens one batch call may ask for; the model has to write them
+# before the request deadline, so larger batches are split into more calls
+BATCH_REPLY_TOKEN_BUDGET = int(os.environ.get('BATCH_REPLY_TOKEN_BUDGET', '800'))
+
+# The task text is not echoed back; callers put the original in themselves
+ORGANIZE_PROMPT = """Analyze this task and return ONLY a JSON object with these fields:
+- "category": best category (Work, Personal, Projects, Health, Shopping, Learning)
+- "priority": high, medium, or low
+- "estimated_time": estimated minutes as integer
+- "tags": array of relevant tags
+
+Task: {task}
+
+Return only valid JSON, no other text."""
+
+BATCH_ORGANIZE_PROMPT = """Analyze each numbered task and return ONLY a JSON array with one object per task, in the same order, each with these fields:
+- "index": the task number
+- "category": best category (Work, Personal, Projects, Health, Shopping, Learning)
+- "priority": high, medium, or low
+- "estimated_time": estimated minutes as integer
+- "tags": array of relevant tags
+
+Tasks:
+{tasks}
+
+Return only valid JSON, no other text."""
+
+# Reply tokens per task in a batch answer, which carries no task text
+BATCH_OUTPUT_TOKENS_PER_TASK = 50
+BATCH_REPLY_BASE_TOKENS = 100
+
+LINK_PROMPT = """Analyze if this new task has relationships with existing tasks.
+
+New task: {task} ({category})
+
+Existing tasks:
+{candidates}
+
+Related means similar topics or projects, dependencies, sequential tasks in the same category, related shopping items or connected work projects.
+Return ONLY a JSON array of the numbers of related tasks, e.g. [1, 3], or [] if none."""
+
+BATCH_LINK_PROMPT = """Analyze which existing tasks each new task has relationships with.
+
+New tasks:
+{tasks}
+
+Existing tasks:
+{candidates}
+
+Related means similar topics or projects, dependencies, sequential tasks in the same category, related shopping items or connected work projects.
+Return ONLY a JSON object mapping every new task label to an array of at most {max_links} numbers of related existing tasks, e.g. {{"N1": [1, 3], "N2": []}}."""
+
+# Links a batch reply may list per new task, which bounds its length
+BATCH_LINKS_PER_TASK = 5
+BATCH_LINK_TOKENS_PER_TASK = 6 + 4 * BATCH_LINKS_PER_TASK
+
+ELLIPSIS = '…'
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+def compact_text(text: str, max_chars: int) -> str:
+    """Collapse whitespace and cut text at a word boundary to max_chars"""
+    text = re.sub(r'\s+', ' ', str(text)).strip()
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    if ' ' in cut[max_chars // 2:]:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip() + ELLIPSIS
+
+
+class Prompt:
+    """A prompt and the aliases it gave its candidates"""
+
+    def __init__(self, text: str, aliases: Dict[str, str] = None, dropped: int = 0):
+        self.text = text
+        self.aliases = aliases or {}
+        self.dropped = dropped
+        self.input_tokens = estimate_tokens(text)
+
+    def resolve(self, reply: Iterable) -> List[str]:
+        """Map the aliases in a model reply back to task IDs
+
+        Unknown aliases are ignored and each ID is returned once.
+        """
+        ids = []
+        for alias in reply:
+            task_id = self.aliases.get(str(alias).strip())
+            if task_id is not None and task_id not in ids:
+                ids.append(task_id)
+        return ids
+
+
+class BatchLinkPrompt(Prompt):
+    """A link prompt for several new tasks, which it refers to by label"""
+
+    def __init__(self, text: str, aliases: Dict[str, str], labels: Dict[str, str], dropped: int = 0):
+        super().__init__(text, aliases, dropped)
+        self.labels = labels
+
+    def resolve_batch(self, reply: Dict) -> Dict[str, List[str]]:
+        """Map a model reply to the linked task IDs of each new task
+
+        New tasks the reply leaves out get no links; a task is never
+        linked to itself.
+        """
+        if not isinstance(reply, dict):
+            raise ValueError(f"Expected a JSON object, got {type(reply).__name__}")
+
+        links = {task_id: [] for task_id in self.labels.values()}
+        for label, numbers in reply.items():
+            task_id = self.labels.get(str(label).strip())
+            if task_id is not None and isinstance(numbers, list):
+                links[task_id] = [linked for linked in self.resolve(numbers) if linked != task_id]
+        return links
+
+
+def build_organize_prompt(task: str, max_chars: int = ORGANIZE_MAX_CHARS) -> Prompt:
+    return Prompt(ORGANIZE_PROMPT.format(task=compact_text(task, max_chars)))
+
+
+def batch_task_line(index: int, text: str) -> str:
+    return f"{index}. {compact_text(text, ORGANIZE_MAX_CHARS)}"
+
+
+def build_batch_organize_prompt(texts: List[str]) -> Prompt:
+    lines = [batch_task_line(i, text) for i, text in enumerate(texts, start=1)]
+    return Prompt(BATCH_ORGANIZE_PROMPT.format(tasks='\n'.join(lines)))
+
+
+def batch_reply_tokens(count: int) -> int:
+    """max_tokens for a batch answer covering count tasks"""
+    return min(4096, BATCH_REPLY_BASE_TOKENS + BATCH_OUTPUT_TOKENS_PER_TASK * count)
+
+
+def max_batch_tasks(budget: int = BATCH_REPLY_TOKEN_BUDGET) -> int:
+    """Most tasks one batch organize call can answer within the reply budget"""
+    return max(1, (budget - BATCH_REPLY_BASE_TOKENS) // BATCH_OUTPUT_TOKENS_PER_TASK)
+
+
+def build_link_prompt(new_task: Dict, candidates: List[Dict],
+                      budget: int = LINK_PROMPT_TOKEN_BUDGET,
+                      max_chars: int = LINK_TASK_MAX_CHARS) -> Prompt:
+    """Link prompt listing candidates, best first, as numbered lines
+
+    Candidates that would take the prompt over the token budget are
+    dropped; at least one is always kept.
+    """
+    fields = {
+        'task': compact_text(new_task['task'], ORGANIZE_MAX_CHARS),
+        'category': new_task.get('category', '')
+    }
+    used = estimate_tokens(LINK_PROMPT.format(candidates='', **fields))
+    lines = []
+    aliases = {}
+
+    for task in candidates:
+        alias = str(len(lines) + 1)
+        line = f"[{alias}] {compact_text(task['task'], max_chars)} ({task.get('category', '')})"
+        cost = estimate_tokens(line) + 1
+        if lines and used + cost > budget:
+            break
+        lines.append(line)
+        aliases[alias] = task['id']
+        used += cost
+
+    text = LINK_PROMPT.format(candidates='\n'.join(lines), **fields)
+    return Prompt(text, aliases, dropped=len(candidates) - len(lines))
+
+
+def link_reply_tokens(prompt: Prompt) -> int:
+    """max_tokens for a link reply, a short array of numbers"""
+    return 16 + 4 * len(prompt.aliases)
+
+
+def build_batch_link_prompt(new_tasks: List[Dict], candidate_lists: List[List[Dict]],
+                            budget: int = BATCH_LINK_PROMPT_TOKEN_BUDGET,
+                            max_chars: int = LINK_TASK_MAX_CHARS) -> BatchLinkPrompt:
+    """Link prompt for several new tasks over one shared candidate list
+
+    candidate_lists holds each new task's candidates, best first. They are
+    merged rank by rank, so every task keeps its closest candidates when
+    the token budget cuts the list.
+    """
+    labels = {}
+    task_lines = []
+    for i, task in enumerate(new_tasks, start=1):
+        label = f"N{i}"
+        labels[label] = task['id']
+        task_lines.append(f"{label}. {compact_text(task['task'], max_chars)} ({task.get('category', '')})")
+
+    fields = {'tasks': '\n'.join(task_lines), 'max_links': BATCH_LINKS_PER_TASK}
+    used = estimate_tokens(BATCH_LINK_PROMPT.format(candidates='', **fields))
+    lines = []
+    aliases = {}
+    seen = set()
+    offered = 0
+
+    depth = max((len(candidates) for candidates in candidate_lists), default=0)
+    ranked = [candidates[rank] for rank in range(depth) for candidates in candidate_lists if rank < len(candidates)]
+    for task in ranked:
+        if task['id'] in seen:
+            continue
+        seen.add(task['id'])
+        offered += 1
+        alias = str(len(lines) + 1)
+        line = f"[{alias}] {compact_text(task['task'], max_chars)} ({task.get('category', '')})"
+        cost = estimate_tokens(line) + 1
+        if lines and used + cost > budget:
+            continue
+        lines.append(line)
+        aliases[alias] = task['id']
+        used += cost
+
+    text = BATCH_LINK_PROMPT.format(candidates='\n'.join(lines), **fields)
+    return BatchLinkPrompt(text, aliases, labels, dropped=offered - len(lines))
+
+
+def batch_link_reply_tokens(prompt: BatchLinkPrompt) -> int:
+    """max_tokens for a batch link reply, a short array per new task"""
+    return 16 + BATCH_LINK_TOKENS_PER_TASK * len(prompt.labels)
+
+
+def max_batch_link_tasks(budget: int = BATCH_REPLY_TOKEN_BUDGET) -> int:
+    """Most new tasks one batch link call can answer within the reply budget"""
+    return max(1, (budget - 16) // BATCH_LINK_TOKENS_PER_TASK)
+
+
+def record_usage(stage: str, prompt: Prompt, result: Dict):
+    """Count estimated and reported tokens of one call under a stage name"""
+    metrics.count(f'{stage}PromptTokens', prompt.input_tokens)
+    usage = result.get('usage') or {}
+    if 'input_tokens' in usage:
+        metrics.count(f'{stage}InputTokens', usage['input_tokens'])
+    if 'output_tokens' in usage:
+        metrics.count(f'{stage}OutputTokens', usage['output_tokens'])
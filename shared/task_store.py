@@ -0,0 +1,284 @@
+"""
+Task storage backends
+Tasks and their links are kept either in the DynamoDB tasks and
+task-links tables, or in a local SQLite file for bulk processing,
+benchmarks and offline runs. Both stores hold the same task items and
+answer the same calls, so organizing, linking and the Obsidian sync run
+unchanged against either.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from shared.task_utils import (
+    SYNC_PENDING, backfill_sync_index, batch_get_tasks, batch_mark_tasks_synced, batch_set_completed,
+    query_incoming_links, query_outgoing_links, query_unsynced_tasks
+)
+
+STORE_DYNAMODB = 'dynamodb'
+SQLITE_PREFIX = 'sqlite:'
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    category TEXT,
+    timestamp TEXT,
+    sync_pending TEXT,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS task_links (
+    source_task_id TEXT NOT NULL,
+    target_task_id TEXT NOT NULL,
+    link_type TEXT,
+    created_at TEXT,
+    PRIMARY KEY (source_task_id, target_task_id)
+);
+-- Partial index playing the part of the sparse unsynced-index
+CREATE INDEX IF NOT EXISTS tasks_unsynced ON tasks (sync_pending, timestamp) WHERE sync_pending IS NOT NULL;
+CREATE INDEX IF NOT EXISTS tasks_category ON tasks (category);
+-- Reverse lookups; outgoing links use the primary key
+CREATE INDEX IF NOT EXISTS task_links_target ON task_links (target_task_id, source_task_id);
+"""
+
+# SQLite limits the number of bound parameters per statement
+QUERY_CHUNK = 500
+
+
+class DynamoDBTaskStore:
+    """Tasks in the DynamoDB tasks table, links in task-links"""
+
+    def __init__(self, dynamodb=None, region: Optional[str] = None):
+        if dynamodb is None:
+            import boto3
+            dynamodb = boto3.resource('dynamodb', region_name=region)
+        self.dynamodb = dynamodb
+        self.table = dynamodb.Table('tasks')
+        self.links_table = dynamodb.Table('task-links')
+
+    def put_task(self, item: Dict):
+        self.table.put_item(Item=item)
+
+    def put_tasks(self, items: List[Dict]):
+        with self.table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+    def get_tasks(self, task_ids: Iterable[str], attributes: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+        """Tasks by ID, limited to attributes when given; missing IDs are left out"""
+        return batch_get_tasks(self.dynamodb, task_ids, attributes=attributes)
+
+    def scan_tasks(self, attributes: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Every task, limited to attributes when given"""
+        scan_kwargs = {}
+        if attributes:
+            names = {f'#a{i}': name for i, name in enumerate(attributes)}
+            scan_kwargs = {'ProjectionExpression': ', '.join(names), 'ExpressionAttributeNames': names}
+        items = []
+
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                return items
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def set_link_status(self, task_id: str, status: str):
+        self.table.update_item(
+            Key={'id': task_id},
+            UpdateExpression='SET link_status = :status, links_updated_at = :now',
+            ExpressionAttributeValues={':status': status, ':now': datetime.now().isoformat()}
+        )
+
+    def unsynced_tasks(self) -> List[Dict]:
+        """Tasks not yet synced to Obsidian, oldest first"""
+        return query_unsynced_tasks(self.table)
+
+    def mark_synced(self, items: List[Dict], max_workers: int = 4):
+        """Mark task items read from the unsynced index as synced"""
+        batch_mark_tasks_synced(self.table, [item['id'] for item in items], max_workers=max_workers)
+
+    def mark_synced_ids(self, task_ids: Iterable[str]):
+        """Mark tasks as synced by ID"""
+        batch_mark_tasks_synced(self.table, list(task_ids))
+
+    def set_completed(self, completions: Dict[str, bool], completed_at: Optional[str] = None) -> int:
+        """Store completion states of existing tasks, returning how many were updated"""
+        return batch_set_completed(self.table, completions, completed_at)
+
+    def backfill_sync_index(self) -> int:
+        return backfill_sync_index(self.table)
+
+    def put_links(self, links: List[Dict]):
+        with self.links_table.batch_writer() as batch:
+            for link in links:
+                batch.put_item(Item=link)
+
+    def outgoing_links(self, task_id: str) -> List[Dict]:
+        return query_outgoing_links(self.links_table, task_id)
+
+    def incoming_links(self, task_id: str) -> List[Dict]:
+        return query_incoming_links(self.links_table, task_id)
+
+
+def _json_default(value):
+    # DynamoDB hands numbers back as Decimal and string sets as sets
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Can't store {type(value).__name__} in a task item")
+
+
+def _project(item: Dict, attributes: Optional[Sequence[str]]) -> Dict:
+    if not attributes:
+        return item
+    return {name: item[name] for name in attributes if name in item}
+
+
+class SqliteTaskStore:
+    """Tasks and links in a local SQLite file
+
+    Each task is kept whole as JSON next to the columns that are looked
+    up or filtered on. WAL mode lets the sync read while tasks are being
+    written, and one connection is shared between threads under a lock.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SQLITE_SCHEMA)
+        self.db.commit()
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def put_task(self, item: Dict):
+        self.put_tasks([item])
+
+    def put_tasks(self, items: List[Dict]):
+        with self._lock, self.db:
+            self._write(items)
+
+    def get_tasks(self, task_ids: Iterable[str], attributes: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+        """Tasks by ID, limited to attributes when given; missing IDs are left out"""
+        with self._lock:
+            items = self._read(task_ids)
+        return {task_id: _project(item, attributes) for task_id, item in items.items()}
+
+    def scan_tasks(self, attributes: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Every task, limited to attributes when given"""
+        with self._lock:
+            rows = self.db.execute('SELECT item FROM tasks').fetchall()
+        return [_project(json.loads(item), attributes) for item, in rows]
+
+    def set_link_status(self, task_id: str, status: str):
+        self._update([task_id], {'link_status': status, 'links_updated_at': datetime.now().isoformat()})
+
+    def unsynced_tasks(self) -> List[Dict]:
+        """Tasks not yet synced to Obsidian, oldest first"""
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT item FROM tasks WHERE sync_pending = ? ORDER BY timestamp', (SYNC_PENDING,)
+            ).fetchall()
+        return [json.loads(item) for item, in rows]
+
+    def mark_synced(self, items: List[Dict], max_workers: int = 4):
+        """Mark full task items as synced"""
+        self.mark_synced_ids([item['id'] for item in items])
+
+    def mark_synced_ids(self, task_ids: Iterable[str]):
+        self._update(task_ids, {'synced_to_obsidian': True}, remove=('sync_pending',))
+
+    def set_completed(self, completions: Dict[str, bool], completed_at: Optional[str] = None) -> int:
+        """Store completion states of existing tasks, returning how many were updated"""
+        completed_at = completed_at or datetime.now().isoformat()
+        with self._lock, self.db:
+            items = self._read(completions)
+            for task_id, item in items.items():
+                item['completed'] = completions[task_id]
+                if completions[task_id]:
+                    item['completed_at'] = completed_at
+                else:
+                    item.pop('completed_at', None)
+            self._write(items.values())
+        return len(items)
+
+    def backfill_sync_index(self) -> int:
+        """Tasks in this store always carry sync_pending, so there is nothing to add"""
+        return 0
+
+    def put_links(self, links: List[Dict]):
+        with self._lock, self.db:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO task_links (source_task_id, target_task_id, link_type, created_at) '
+                'VALUES (?, ?, ?, ?)',
+                [(link['source_task_id'], link['target_task_id'], link.get('link_type'), link.get('created_at'))
+                 for link in links]
+            )
+
+    def outgoing_links(self, task_id: str) -> List[Dict]:
+        return self._links('source_task_id', task_id)
+
+    def incoming_links(self, task_id: str) -> List[Dict]:
+        return self._links('target_task_id', task_id)
+
+    def _links(self, column: str, task_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self.db.execute(
+                f'SELECT source_task_id, target_task_id, link_type, created_at FROM task_links WHERE {column} = ?',
+                (task_id,)
+            ).fetchall()
+        return [
+            {'source_task_id': source, 'target_task_id': target, 'link_type': link_type, 'created_at': created_at}
+            for source, target, link_type, created_at in rows
+        ]
+
+    def _read(self, task_ids: Iterable[str]) -> Dict[str, Dict]:
+        task_ids = list(dict.fromkeys(task_ids))
+        found = {}
+        for start in range(0, len(task_ids), QUERY_CHUNK):
+            chunk = task_ids[start:start + QUERY_CHUNK]
+            rows = self.db.execute(
+                f"SELECT id, item FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            for task_id, item in rows:
+                found[task_id] = json.loads(item)
+        return found
+
+    def _write(self, items: Iterable[Dict]):
+        self.db.executemany(
+            'INSERT OR REPLACE INTO tasks (id, category, timestamp, sync_pending, item) VALUES (?, ?, ?, ?, ?)',
+            [(item['id'], item.get('category'), item.get('timestamp'), item.get('sync_pending'),
+              json.dumps(item, default=_json_default)) for item in items]
+        )
+
+    def _update(self, task_ids: Iterable[str], values: Dict, remove: Sequence[str] = ()):
+        """Set and remove attributes of existing tasks"""
+        with self._lock, self.db:
+            items = self._read(task_ids)
+            for item in items.values():
+                item.update(values)
+                for name in remove:
+                    item.pop(name, None)
+            self._write(items.values())
+
+
+def create_task_store(uri: Optional[str] = None, dynamodb=None, region: Optional[str] = None):
+    """Task store for TASK_STORE: 'dynamodb' (default) or 'sqlite:PATH'"""
+    uri = uri or os.environ.get('TASK_STORE', STORE_DYNAMODB)
+    if uri == STORE_DYNAMODB:
+        return DynamoDBTaskStore(dynamodb, region=region)
+    if uri.startswith(SQLITE_PREFIX):
+        return SqliteTaskStore(os.path.expanduser(uri[len(SQLITE_PREFIX):]))
+    raise ValueError(f"Unknown task store: {uri}")
@@ -3,126 +3,525 @@ Shared utilities for task organization system
 """
 
 import json
-import boto3
-from datetime import datetime
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
+from shared import metrics
+from shared.bedrock_client import Deadline, ResilientBedrockClient
+from shared.local_classifier import DEFAULT_CONFIDENCE_THRESHOLD, classify_task, confident_organization
+from shared.organization_cache import OrganizationCache, create_organization_cache
+from shared.prompts import (
+    BATCH_ORGANIZE_PROMPT, ORGANIZE_PROMPT, batch_reply_tokens, batch_task_line, build_batch_organize_prompt,
+    build_organize_prompt, estimate_tokens, max_batch_tasks, record_usage
+)
+
+MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+DEFAULT_BATCH_TOKEN_BUDGET = 2000
+DEFAULT_BATCH_MAX_TASKS = 50
+# Batch chunks are sent to Bedrock at the same time, this many at once
+DEFAULT_BATCH_WORKERS = 4
+
+# Sparse index holding only tasks that still need syncing to Obsidian;
+# tasks leave it when sync_pending is removed
+SYNC_INDEX_NAME = 'unsynced-index'
+SYNC_PENDING = 'pending'
+
+# Index on task-links for finding the links that point at a task
+LINKS_TARGET_INDEX = 'target-index'
+
+# Task IDs derived from client idempotency keys, so a retried submission
+# maps to the task stored the first time
+IDEMPOTENCY_NAMESPACE = uuid.UUID('5d7c3f0e-8f4b-4a51-9a57-2f1e6c0b7d42')
+
+BATCH_GET_LIMIT = 100
+TRANSACT_WRITE_LIMIT = 100
+
 class TaskOrganizer:
     """Shared task organization utilities"""
     
-    def __init__(self, region='us-east-1'):
-        self.bedrock = boto3.client('bedrock-runtime', region_name=region)
-        self.dynamodb = boto3.resource('dynamodb', region_name=region)
-        self.table = self.dynamodb.Table('tasks')
+    def __init__(self, region='us-east-1', cache: Optional[OrganizationCache] = None,
+                 bedrock: Optional[ResilientBedrockClient] = None,
+                 local_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD, store=None,
+                 embedder=None, vector_sink=None):
+        from shared.task_store import DynamoDBTaskStore, create_task_store
+        
+        self.bedrock = bedrock or ResilientBedrockClient(region=region)
+        # Vectors are stored with new tasks when links are found by embedding;
+        # vector_sink receives them once the tasks are written
+        self.embedder = embedder if embedder is not None else embedder_from_env(self.bedrock)
+        self.vector_sink = vector_sink
+        self.store = store or create_task_store(region=region)
+        if cache is None:
+            # The shared cache tier lives next to the tasks in DynamoDB
+            shared = isinstance(self.store, DynamoDBTaskStore)
+            cache = create_organization_cache(
+                ORGANIZE_PROMPT,
+                MODEL_ID,
+                dynamodb=self.store.dynamodb if shared else None,
+                table_name=os.getenv('ORGANIZATION_CACHE_TABLE', 'task-organization-cache') if shared else ''
+            )
+        self.cache = cache
+        self.local_threshold = local_threshold
     
-    def organize_task(self, task_text: str) -> Dict:
-        """Organize task using Bedrock AI"""
-        prompt = f"""Analyze this task and return ONLY a JSON object with these fields:
-- "task": the original task text
-- "category": best category (Work, Personal, Projects, Health, Shopping, Learning)
-- "priority": high, medium, or low
-- "estimated_time": estimated minutes as integer
-- "tags": array of relevant tags
-
-Task: {task_text}
-
-Return only valid JSON, no other text."""
+    def organize_task(self, task_text: str, deadline: Optional[Deadline] = None) -> Dict:
+        """Organize task using Bedrock AI, reusing cached results
+        
+        Tasks the local classifier is confident about skip Bedrock.
+        """
+        local = confident_organization(task_text, self.local_threshold)
+        if local is not None:
+            return local
+        
+        cached = self.cache.get(task_text)
+        if cached is not None:
+            return cached
+        
+        prompt = build_organize_prompt(task_text)
         
         try:
             response = self.bedrock.invoke_model(
-                modelId='anthropic.claude-3-haiku-20240307-v1:0',
+                modelId=MODEL_ID,
                 body=json.dumps({
                     'anthropic_version': 'bedrock-2023-05-31',
-                    'messages': [{'role': 'user', 'content': prompt}],
+                    'messages': [{'role': 'user', 'content': prompt.text}],
                     'max_tokens': 300
-                })
+                }),
+                deadline=deadline
             )
             
             result = json.loads(response['body'].read())
+            record_usage('Organize', prompt, result)
             organized_task = json.loads(result['content'][0]['text'])
             
-            # Ensure required fields
-            organized_task.setdefault('task', task_text)
+            # The prompt may hold a shortened copy, so keep the original text
+            organized_task['task'] = task_text
             organized_task.setdefault('category', 'Personal')
             organized_task.setdefault('priority', 'medium')
             organized_task.setdefault('estimated_time', 30)
             organized_task.setdefault('tags', [])
             
+            self.cache.put(task_text, organized_task)
             return organized_task
             
         except Exception as e:
             print(f"Bedrock error: {str(e)}")
             return self._fallback_organization(task_text)
     
+    def organize_tasks(self, task_texts: List[str], deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Organize several tasks with as few Bedrock calls as the prompt budget allows"""
+        return organize_batch(
+            task_texts, self.bedrock, self.cache, self.local_threshold,
+            lambda text: self.organize_task(text, deadline), deadline
+        )
+    
     def _fallback_organization(self, task_text: str) -> Dict:
         """Fallback organization when Bedrock fails"""
-        # Simple keyword-based categorization
-        task_lower = task_text.lower()
-        
-        if any(word in task_lower for word in ['buy', 'shop', 'grocery', 'store']):
-            category = 'Shopping'
-        elif any(word in task_lower for word in ['work', 'meeting', 'project', 'deadline']):
-            category = 'Work'
-        elif any(word in task_lower for word in ['doctor', 'health', 'exercise', 'gym']):
-            category = 'Health'
-        elif any(word in task_lower for word in ['learn', 'study', 'read', 'course']):
-            category = 'Learning'
-        else:
-            category = 'Personal'
-        
-        # Simple priority detection
-        if any(word in task_lower for word in ['urgent', 'asap', 'immediately', 'critical']):
-            priority = 'high'
-        elif any(word in task_lower for word in ['later', 'someday', 'maybe']):
-            priority = 'low'
-        else:
-            priority = 'medium'
-        
-        return {
-            'task': task_text,
-            'category': category,
-            'priority': priority,
-            'estimated_time': 30,
-            'tags': []
-        }
-    
-    def store_task(self, organized_task: Dict, source: str) -> str:
-        """Store task in DynamoDB"""
-        import uuid
-        
-        task_id = str(uuid.uuid4())
-        
-        item = {
-            'id': task_id,
-            'task': organized_task['task'],
-            'category': organized_task['category'],
-            'priority': organized_task['priority'],
-            'estimated_time': organized_task['estimated_time'],
-            'tags': organized_task['tags'],
-            'source': source,
-            'timestamp': datetime.now().isoformat(),
-            'synced_to_obsidian': False,
-            'completed': False
-        }
-        
-        self.table.put_item(Item=item)
+        return fallback_organization(task_text)
+    
+    def store_task(self, organized_task: Dict, source: str, link_status: Optional[str] = None,
+                   task_id: Optional[str] = None) -> str:
+        """Store task in the task store, with its vector in embedding mode"""
+        task_id = task_id or str(uuid.uuid4())
+        item = build_task_item(task_id, organized_task, source, link_status)
+        vectors = embed_items([item], [organized_task], self.embedder)
+        with metrics.span('TaskPut'):
+            self.store.put_task(item)
+        self._remember(vectors)
         return task_id
     
+    def store_tasks(self, organized_tasks: List[Dict], sources: List[str], link_status: Optional[str] = None,
+                    task_ids: Optional[List[str]] = None) -> List[str]:
+        """Store several tasks with batched writes, returning their IDs"""
+        task_ids = task_ids or [str(uuid.uuid4()) for _ in organized_tasks]
+        items = [
+            build_task_item(task_id, organized_task, source, link_status)
+            for task_id, organized_task, source in zip(task_ids, organized_tasks, sources)
+        ]
+        vectors = embed_items(items, organized_tasks, self.embedder)
+        with metrics.span('TaskPut'):
+            self.store.put_tasks(items)
+        self._remember(vectors)
+        return task_ids
+    
+    def _remember(self, vectors: Dict):
+        if vectors and self.vector_sink is not None:
+            self.vector_sink(vectors)
+    
     def get_unsynced_tasks(self) -> List[Dict]:
         """Get tasks that haven't been synced to Obsidian"""
-        response = self.table.scan(
-            FilterExpression='synced_to_obsidian = :val',
-            ExpressionAttributeValues={':val': False}
-        )
-        return response['Items']
+        return self.store.unsynced_tasks()
     
     def mark_task_synced(self, task_id: str):
         """Mark task as synced to Obsidian"""
-        self.table.update_item(
-            Key={'id': task_id},
-            UpdateExpression='SET synced_to_obsidian = :val',
-            ExpressionAttributeValues={':val': True}
+        self.store.mark_synced_ids([task_id])
+
+def embedder_from_env(bedrock=None):
+    """Embedder for LINK_MODE=embedding, set up from EMBEDDER and EMBEDDING_DIMENSION, else None"""
+    if os.getenv('LINK_MODE', 'bedrock') != 'embedding':
+        return None
+    
+    from shared.embeddings import create_embedder
+    
+    name = os.getenv('EMBEDDER', 'hashing')
+    return create_embedder(name, bedrock if name == 'bedrock' else None, int(os.getenv('EMBEDDING_DIMENSION', '256')))
+
+def embed_items(items: List[Dict], organized_tasks: List[Dict], embedder) -> Dict:
+    """Put each task's vector on its item, so it is written with the task
+    
+    Returns the vectors by task ID; without an embedder nothing is
+    embedded, and tasks that could not be embedded are stored without one.
+    """
+    vectors = {}
+    if embedder is None:
+        return vectors
+    
+    from shared.embeddings import EMBEDDING_ATTRIBUTE, encode_vector
+    
+    for item, organized_task in zip(items, organized_tasks):
+        try:
+            vectors[item['id']] = embedder.embed(organized_task)
+        except Exception as e:
+            print(f"Embedding error: {str(e)}")
+            continue
+        item[EMBEDDING_ATTRIBUTE] = encode_vector(vectors[item['id']])
+    return vectors
+
+def task_id_for(idempotency_key: Optional[str] = None) -> str:
+    """Task ID for a submission: derived from its idempotency key, else random"""
+    if idempotency_key:
+        return str(uuid.uuid5(IDEMPOTENCY_NAMESPACE, str(idempotency_key)))
+    return str(uuid.uuid4())
+
+def organized_from_item(item: Dict) -> Dict:
+    """The organized task fields of a stored task item"""
+    return {
+        'task': item['task'],
+        'category': item['category'],
+        'priority': item['priority'],
+        'estimated_time': int(item['estimated_time']),
+        'tags': list(item.get('tags', []))
+    }
+
+def build_task_item(task_id: str, organized_task: Dict, source: str, link_status: Optional[str] = None) -> Dict:
+    """Build the DynamoDB item for an organized task"""
+    item = {
+        'id': task_id,
+        'task': organized_task['task'],
+        'category': organized_task['category'],
+        'priority': organized_task['priority'],
+        'estimated_time': organized_task['estimated_time'],
+        'tags': organized_task['tags'],
+        'source': source,
+        'organized_by': organized_task.get('organized_by', 'bedrock'),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'synced_to_obsidian': False,
+        'sync_pending': SYNC_PENDING,
+        'completed': False
+    }
+    if link_status:
+        item['link_status'] = link_status
+    return item
+
+def query_all(table, **query_kwargs) -> List[Dict]:
+    """Run a DynamoDB query and follow its pagination"""
+    items = []
+    
+    while True:
+        response = table.query(**query_kwargs)
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return items
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def query_unsynced_tasks(table) -> List[Dict]:
+    """Read every task in the sparse unsynced index, oldest first"""
+    return query_all(
+        table,
+        IndexName=SYNC_INDEX_NAME,
+        KeyConditionExpression='sync_pending = :pending',
+        ExpressionAttributeValues={':pending': SYNC_PENDING}
+    )
+
+def mark_task_synced(table, task_id: str):
+    """Mark a task as synced, which also drops it from the unsynced index"""
+    table.update_item(
+        Key={'id': task_id},
+        UpdateExpression='SET synced_to_obsidian = :val REMOVE sync_pending',
+        ExpressionAttributeValues={':val': True}
+    )
+
+def synced_update(table_name: str, task_id: str) -> Dict:
+    """Update action that marks a task synced, skipping deleted tasks"""
+    return {
+        'TableName': table_name,
+        'Key': {'id': task_id},
+        'ConditionExpression': 'attribute_exists(id)',
+        'UpdateExpression': 'SET synced_to_obsidian = :val REMOVE sync_pending',
+        'ExpressionAttributeValues': {':val': True}
+    }
+
+def batch_mark_tasks_synced(table, task_ids: List[str], max_workers: int = 4) -> int:
+    """Mark tasks as synced with TransactWriteItems, 100 tasks per request
+    
+    Only the sync attributes are touched, so link status or completions
+    written after the task was read from the index are kept. Chunks are
+    sent by a bounded thread pool; returns the number of requests.
+    """
+    client = table.meta.client
+    updates = [synced_update(table.name, task_id) for task_id in task_ids]
+    chunks = [updates[start:start + TRANSACT_WRITE_LIMIT] for start in range(0, len(updates), TRANSACT_WRITE_LIMIT)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # list() re-raises the first failure
+        list(pool.map(lambda chunk: transact_updates(client, chunk), chunks))
+    
+    return len(chunks)
+
+def transact_updates(client, updates: List[Dict]) -> int:
+    """Apply up to 100 conditional updates in one transaction
+    
+    A cancelled transaction, e.g. because one of its tasks was deleted,
+    is retried one update at a time so the other tasks still get stored.
+    Returns the number of tasks updated.
+    """
+    from botocore.exceptions import ClientError
+    
+    try:
+        client.transact_write_items(TransactItems=[{'Update': update} for update in updates])
+        return len(updates)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+    
+    stored = 0
+    for update in updates:
+        try:
+            client.update_item(**update)
+            stored += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    return stored
+
+def completion_update(table_name: str, task_id: str, completed: bool, completed_at: str) -> Dict:
+    """Update action that sets a task's completion state, skipping deleted tasks"""
+    update = {
+        'TableName': table_name,
+        'Key': {'id': task_id},
+        'ConditionExpression': 'attribute_exists(id)',
+        'ExpressionAttributeValues': {':completed': completed}
+    }
+    if completed:
+        update['UpdateExpression'] = 'SET completed = :completed, completed_at = :completed_at'
+        update['ExpressionAttributeValues'][':completed_at'] = completed_at
+    else:
+        update['UpdateExpression'] = 'SET completed = :completed REMOVE completed_at'
+    return update
+
+def batch_set_completed(table, completions: Dict[str, bool], completed_at: Optional[str] = None) -> int:
+    """Store completion states with TransactWriteItems, 100 tasks per request
+    
+    Deleted tasks are skipped. Returns the number of tasks updated.
+    """
+    client = table.meta.client
+    completed_at = completed_at or datetime.now().isoformat()
+    updates = [
+        completion_update(table.name, task_id, completed, completed_at)
+        for task_id, completed in completions.items()
+    ]
+    return sum(
+        transact_updates(client, updates[start:start + TRANSACT_WRITE_LIMIT])
+        for start in range(0, len(updates), TRANSACT_WRITE_LIMIT)
+    )
+
+def query_outgoing_links(links_table, task_id: str) -> List[Dict]:
+    """Links whose source is the task"""
+    return query_all(
+        links_table,
+        KeyConditionExpression='source_task_id = :task_id',
+        ExpressionAttributeValues={':task_id': task_id}
+    )
+
+def query_incoming_links(links_table, task_id: str) -> List[Dict]:
+    """Links whose target is the task, read from the reverse index"""
+    return query_all(
+        links_table,
+        IndexName=LINKS_TARGET_INDEX,
+        KeyConditionExpression='target_task_id = :task_id',
+        ExpressionAttributeValues={':task_id': task_id}
+    )
+
+def batch_get_tasks(dynamodb, task_ids, attributes=('id', 'task'), max_retries: int = 5,
+                    sleep=time.sleep) -> Dict[str, Dict]:
+    """Fetch tasks by ID with chunked BatchGetItem calls, keyed by ID
+    
+    IDs are deduplicated and unprocessed keys are retried with backoff;
+    IDs that don't exist are simply missing from the result. Without
+    attributes whole items are read.
+    """
+    names = {f'#a{i}': name for i, name in enumerate(attributes or ())}
+    unique_ids = list(dict.fromkeys(task_ids))
+    found = {}
+    
+    for start in range(0, len(unique_ids), BATCH_GET_LIMIT):
+        request = {'tasks': {
+            'Keys': [{'id': task_id} for task_id in unique_ids[start:start + BATCH_GET_LIMIT]]
+        }}
+        if names:
+            request['tasks']['ProjectionExpression'] = ', '.join(names)
+            request['tasks']['ExpressionAttributeNames'] = names
+        attempt = 0
+        
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get('tasks', []):
+                found[item['id']] = item
+            
+            request = response.get('UnprocessedKeys') or {}
+            if request:
+                attempt += 1
+                if attempt > max_retries:
+                    raise RuntimeError(f"BatchGetItem left {len(request['tasks']['Keys'])} keys unprocessed")
+                sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+    
+    return found
+
+def backfill_sync_index(table) -> int:
+    """One-off scan that adds unsynced tasks from before the index existed"""
+    scan_kwargs = {
+        'FilterExpression': 'synced_to_obsidian = :val AND attribute_not_exists(sync_pending)',
+        'ExpressionAttributeValues': {':val': False},
+        'ProjectionExpression': 'id'
+    }
+    updated = 0
+    
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response['Items']:
+            table.update_item(
+                Key={'id': item['id']},
+                UpdateExpression='SET sync_pending = :pending',
+                ExpressionAttributeValues={':pending': SYNC_PENDING}
+            )
+            updated += 1
+        if 'LastEvaluatedKey' not in response:
+            return updated
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def fallback_organization(task_text: str) -> Dict:
+    """Fallback organization when Bedrock fails"""
+    organized = classify_task(task_text)
+    organized.pop('confidence')
+    organized['organized_by'] = 'fallback'
+    return organized
+
+def chunk_by_token_budget(texts: List[str], budget: int, max_items: int) -> List[List[str]]:
+    """Split texts into consecutive chunks that fit the prompt token budget
+    
+    Chunks are also kept small enough for their answer to fit the reply
+    token budget.
+    """
+    max_items = min(max_items, max_batch_tasks())
+    chunks = []
+    current = []
+    used = estimate_tokens(BATCH_ORGANIZE_PROMPT)
+    
+    for text in texts:
+        cost = estimate_tokens(batch_task_line(len(current) + 1, text)) + 1
+        if current and (used + cost > budget or len(current) >= max_items):
+            chunks.append(current)
+            current = []
+            used = estimate_tokens(BATCH_ORGANIZE_PROMPT)
+        current.append(text)
+        used += cost
+    
+    if current:
+        chunks.append(current)
+    return chunks
+
+def organize_chunk_with_bedrock(bedrock, texts: List[str], deadline: Optional[Deadline] = None) -> Optional[List]:
+    """Organize several tasks with one Bedrock call, or None on failure"""
+    prompt = build_batch_organize_prompt(texts)
+    
+    try:
+        response = bedrock.invoke_model(
+            modelId=MODEL_ID,
+            body=json.dumps({
+                'anthropic_version': 'bedrock-2023-05-31',
+                'messages': [{'role': 'user', 'content': prompt.text}],
+                'max_tokens': batch_reply_tokens(len(texts))
+            }),
+            deadline=deadline
         )
+        
+        result = json.loads(response['body'].read())
+        record_usage('BatchOrganize', prompt, result)
+        entries = json.loads(result['content'][0]['text'])
+    except Exception as e:
+        print(f"Bedrock batch error: {str(e)}")
+        return None
+    
+    organized = [None] * len(texts)
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get('index', position + 1)
+        if isinstance(index, int) and 1 <= index <= len(texts) and organized[index - 1] is None:
+            organized[index - 1] = entry
+    return organized
+
+def organize_batch(texts: List[str], bedrock, cache: OrganizationCache, local_threshold: float,
+                   organize_one, deadline: Optional[Deadline] = None,
+                   budget: int = DEFAULT_BATCH_TOKEN_BUDGET, max_items: int = DEFAULT_BATCH_MAX_TASKS,
+                   max_workers: int = DEFAULT_BATCH_WORKERS) -> List[Dict]:
+    """Organize many tasks, sending only uncertain cache misses to Bedrock in chunks
+    
+    Chunks are sent concurrently so they all share the deadline rather
+    than queueing behind each other. organize_one handles tasks the model
+    skipped in its batch answer.
+    """
+    results = []
+    for text in texts:
+        local = confident_organization(text, local_threshold)
+        results.append(local if local is not None else cache.get(text))
+    pending = [i for i, result in enumerate(results) if result is None]
+    
+    chunks = chunk_by_token_budget([texts[i] for i in pending], budget, max_items)
+    answers = []
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+            answers = list(pool.map(lambda chunk: organize_chunk_with_bedrock(bedrock, chunk, deadline), chunks))
+    
+    offset = 0
+    for chunk, organized in zip(chunks, answers):
+        for position, text in enumerate(chunk):
+            i = pending[offset]
+            offset += 1
+            if organized is None:
+                results[i] = fallback_organization(text)
+                continue
+            
+            entry = organized[position]
+            if entry is None:
+                # Tasks the model skipped are organized one at a time
+                results[i] = organize_one(text)
+                continue
+            
+            entry.pop('index', None)
+            entry['task'] = text
+            entry.setdefault('category', 'Personal')
+            entry.setdefault('priority', 'medium')
+            entry.setdefault('estimated_time', 30)
+            entry.setdefault('tags', [])
+            cache.put(text, entry)
+            results[i] = entry
+    
+    return results
 
 def validate_task_input(task_text: str) -> bool:
     """Validate task input"""
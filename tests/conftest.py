@@ -0,0 +1,56 @@
+"""
+Shared pytest fixtures
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make shared/, aws/, mac/ and trigger modules importable from tests
+ROOT = Path(__file__).parent.parent
+for path in (ROOT, ROOT / 'aws', ROOT / 'mac', ROOT / 'triggers' / 'whatsapp', ROOT / 'triggers' / 'email'):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+from tests.fakes import create_tables
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    """Local moto-backed DynamoDB with the task tables created"""
+    moto = pytest.importorskip('moto')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    
+    import boto3
+    
+    with moto.mock_aws():
+        resource = boto3.resource('dynamodb')
+        create_tables(resource)
+        yield resource
+
+@pytest.fixture(autouse=True)
+def reset_lambda_state(monkeypatch):
+    """Drop container-level caches so tests don't leak into each other"""
+    lambda_function = sys.modules.get('lambda_function')
+    if lambda_function is not None:
+        monkeypatch.setattr(lambda_function, '_bedrock_client', None)
+        monkeypatch.setattr(lambda_function, '_organization_cache', None)
+        monkeypatch.setattr(lambda_function, '_embedding_state', {})
+        monkeypatch.setattr(lambda_function, '_task_store', None)
+
+@pytest.fixture(autouse=True)
+def sync_journal_path(monkeypatch, tmp_path):
+    """Keep the sync journal, watermark and manifest out of the working tree"""
+    path = tmp_path / 'sync_journal'
+    monkeypatch.setenv('SYNC_JOURNAL_PATH', str(path))
+    monkeypatch.setenv('SYNC_WATERMARK_PATH', str(tmp_path / 'sync_watermark'))
+    monkeypatch.setenv('VAULT_MANIFEST_PATH', str(tmp_path / 'vault_manifest.sqlite'))
+    return path
+
+@pytest.fixture
+def bedrock_only(monkeypatch):
+    """Send every task to Bedrock, bypassing the local classifier"""
+    import lambda_function
+    monkeypatch.setattr(lambda_function, 'LOCAL_CONFIDENCE_THRESHOLD', 1.1)
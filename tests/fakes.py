@@ -0,0 +1,197 @@
+"""
+Test doubles for AWS services used by the task organizer
+"""
+
+import io
+import json
+import re
+import time
+
+from botocore.exceptions import ClientError
+
+from shared.task_utils import estimate_tokens
+
+def bedrock_error(code='ThrottlingException'):
+    """Build the ClientError boto3 raises for a failed Bedrock call"""
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'InvokeModel')
+
+def link_numbers(prompt, text=''):
+    """Numbers a link prompt gave to candidates whose line contains text"""
+    return [int(number) for number, line in re.findall(r"^\[(\d+)\] (.*)$", prompt, re.MULTILINE) if text in line]
+
+class FakeClock:
+    """Manually advanced clock, usable as both clock and sleep"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+class FakeBedrockClient:
+    """Stand-in for the bedrock-runtime client
+
+    responder receives the prompt text and returns the model's text reply.
+    Each call takes `latency` seconds on `sleep` and raises the next
+    exception from `errors`, if any (None entries succeed). Calls slower
+    than `read_timeout` give up after it like botocore does. Token counts
+    are estimated and reported in the reply's usage like Bedrock does.
+    """
+    
+    def __init__(self, responder=None, latency=0.0, errors=None, sleep=time.sleep, read_timeout=None):
+        self.responder = responder or (lambda prompt: '[]')
+        self.latency = latency
+        self.read_timeout = read_timeout
+        self.errors = list(errors or [])
+        self.sleep = sleep
+        self.prompts = []
+        self.output_tokens = 0
+    
+    @property
+    def calls(self):
+        return len(self.prompts)
+    
+    @property
+    def prompt_tokens(self):
+        return sum(estimate_tokens(prompt) for prompt in self.prompts)
+    
+    def invoke_model(self, modelId, body, **kwargs):
+        request = json.loads(body)
+        prompt = request['messages'][0]['content']
+        self.prompts.append(prompt)
+        
+        if self.read_timeout is not None and self.latency > self.read_timeout:
+            from botocore.exceptions import ReadTimeoutError
+            self.sleep(self.read_timeout)
+            raise ReadTimeoutError(endpoint_url='https://bedrock-runtime.fake')
+        if self.latency:
+            self.sleep(self.latency)
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        
+        text = self.responder(prompt)
+        usage = {'input_tokens': estimate_tokens(prompt), 'output_tokens': estimate_tokens(text)}
+        self.output_tokens += usage['output_tokens']
+        payload = json.dumps({'content': [{'type': 'text', 'text': text}], 'usage': usage})
+        return {'body': io.BytesIO(payload.encode('utf-8'))}
+
+def create_tables(dynamodb):
+    """Create the tasks, task-links, organization cache and changelog tables"""
+    dynamodb.create_table(
+        TableName='tasks',
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'sync_pending', 'AttributeType': 'S'},
+            {'AttributeName': 'timestamp', 'AttributeType': 'S'}
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'unsynced-index',
+            'KeySchema': [
+                {'AttributeName': 'sync_pending', 'KeyType': 'HASH'},
+                {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName='task-links',
+        KeySchema=[
+            {'AttributeName': 'source_task_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'target_task_id', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'source_task_id', 'AttributeType': 'S'},
+            {'AttributeName': 'target_task_id', 'AttributeType': 'S'}
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'target-index',
+            'KeySchema': [
+                {'AttributeName': 'target_task_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'source_task_id', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName='task-organization-cache',
+        KeySchema=[{'AttributeName': 'cache_key', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'cache_key', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName='task-changelog',
+        KeySchema=[
+            {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'seq', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'user_id', 'AttributeType': 'S'},
+            {'AttributeName': 'seq', 'AttributeType': 'N'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+class FakeTaskStream:
+    """Stand-in for the tasks table stream
+    
+    Applies writes to the table and records the stream records DynamoDB
+    would emit with NEW_AND_OLD_IMAGES.
+    """
+    
+    def __init__(self, table):
+        from boto3.dynamodb.types import TypeSerializer
+        self.table = table
+        self.serializer = TypeSerializer()
+        self.records = []
+    
+    def _image(self, item):
+        return {key: self.serializer.serialize(value) for key, value in item.items()}
+    
+    def _get(self, task_id):
+        return self.table.get_item(Key={'id': task_id}).get('Item')
+    
+    def _record(self, task_id, old, new):
+        if old is None:
+            name = 'INSERT'
+        elif new is None:
+            name = 'REMOVE'
+        else:
+            name = 'MODIFY'
+        data = {'Keys': self._image({'id': task_id})}
+        if old is not None:
+            data['OldImage'] = self._image(old)
+        if new is not None:
+            data['NewImage'] = self._image(new)
+        self.records.append({'eventName': name, 'dynamodb': data})
+    
+    def capture(self, task_id, old=None):
+        """Record the change from old to the task's current item"""
+        self._record(task_id, old, self._get(task_id))
+    
+    def update(self, task_id, **fields):
+        old = self._get(task_id)
+        self.table.update_item(
+            Key={'id': task_id},
+            UpdateExpression='SET ' + ', '.join(f'#{key} = :{key}' for key in fields),
+            ExpressionAttributeNames={f'#{key}': key for key in fields},
+            ExpressionAttributeValues={f':{key}': value for key, value in fields.items()}
+        )
+        self.capture(task_id, old)
+    
+    def delete(self, task_id):
+        old = self._get(task_id)
+        self.table.delete_item(Key={'id': task_id})
+        self._record(task_id, old, None)
+    
+    def event(self):
+        """Stream event holding the records since the last call"""
+        records, self.records = self.records, []
+        return {'Records': records}
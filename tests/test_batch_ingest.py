@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for batch task ingestion
+"""
+
+import json
+import re
+
+import lambda_function
+from shared.link_queue import InProcessLinkQueue
+from shared.prompts import BATCH_REPLY_TOKEN_BUDGET, batch_reply_tokens, max_batch_link_tasks, max_batch_tasks
+from shared.task_utils import chunk_by_token_budget
+from tests.fakes import FakeBedrockClient
+
+def batch_responder(prompt):
+    """Organize every numbered task in a batch prompt as Shopping
+    
+    Batch link prompts get an answer without links.
+    """
+    if prompt.startswith('Analyze which existing tasks'):
+        return '{}'
+    tasks = re.findall(r"^(\d+)\. (.+)$", prompt, re.MULTILINE)
+    return json.dumps([
+        {'index': int(index), 'task': text, 'category': 'Shopping', 'priority': 'low',
+         'estimated_time': 15, 'tags': ['errand']}
+        for index, text in tasks
+    ])
+
+def test_chunk_by_token_budget_respects_budget_and_order():
+    texts = [f"task number {i} " * 10 for i in range(30)]
+    chunks = chunk_by_token_budget(texts, budget=400, max_items=50)
+    
+    assert len(chunks) > 1
+    assert [text for chunk in chunks for text in chunk] == texts
+    assert max(len(chunk) for chunk in chunks) <= 50
+    
+    assert [len(chunk) for chunk in chunk_by_token_budget(texts, 100000, 8)] == [8, 8, 8, 6]
+
+def test_chunks_are_capped_by_the_reply_budget():
+    texts = [f"Buy item {i}" for i in range(50)]
+    chunks = chunk_by_token_budget(texts, budget=100000, max_items=50)
+    
+    assert len(chunks) > 1
+    assert max(batch_reply_tokens(len(chunk)) for chunk in chunks) <= BATCH_REPLY_TOKEN_BUDGET
+
+def test_batch_request_uses_one_bedrock_call_and_one_enqueue(dynamodb, bedrock_only, monkeypatch):
+    bedrock = FakeBedrockClient(batch_responder)
+    queue = InProcessLinkQueue()
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    monkeypatch.setattr(lambda_function, 'get_link_queue', lambda: queue)
+    
+    tasks = ['Buy milk', {'task': 'Buy eggs', 'source': 'email:me@example.com'}, '  ', 'Buy bread']
+    response = lambda_function.lambda_handler({'body': json.dumps({'tasks': tasks, 'source': 'brain-dump'})}, None)
+    body = json.loads(response['body'])
+    
+    assert response['statusCode'] == 200
+    assert bedrock.calls == 1
+    assert len(body['ids']) == 3
+    assert [task['task'] for task in body['organized_tasks']] == ['Buy milk', 'Buy eggs', 'Buy bread']
+    assert len(queue) == 3
+    
+    items = {item['id']: item for item in dynamodb.Table('tasks').scan()['Items']}
+    assert set(items) == set(body['ids'])
+    assert items[body['ids'][1]]['source'] == 'email:me@example.com'
+    assert items[body['ids'][0]]['source'] == 'brain-dump'
+    assert all(item['link_status'] == 'pending' for item in items.values())
+
+def test_batch_reuses_cache_and_falls_back_when_bedrock_fails(dynamodb, bedrock_only, monkeypatch):
+    bedrock = FakeBedrockClient(batch_responder)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    
+    lambda_function.organize_batch_with_bedrock(['Buy milk', 'Buy eggs'])
+    assert bedrock.calls == 1
+    
+    broken = FakeBedrockClient(lambda prompt: 'not json')
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: broken)
+    organized = lambda_function.organize_batch_with_bedrock(['buy milk', 'Call plumber'])
+    
+    assert broken.calls == 1
+    assert organized[0]['category'] == 'Shopping'
+    assert organized[1]['category'] == 'Personal'
+
+def test_batch_rejects_empty_request(dynamodb):
+    response = lambda_function.lambda_handler({'body': json.dumps({'tasks': ['', ' ']})}, None)
+    assert response['statusCode'] == 400
+
+def test_batch_without_a_queue_links_with_batched_prompts(dynamodb, bedrock_only, monkeypatch):
+    def responder(prompt):
+        if prompt.startswith('Analyze which existing tasks'):
+            # Link every new task to the first candidate offered
+            return json.dumps({label: [1] for label in re.findall(r"^(N\d+)\. ", prompt, re.MULTILINE)})
+        return batch_responder(prompt)
+    
+    bedrock = FakeBedrockClient(responder)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    monkeypatch.setattr(lambda_function, 'get_link_queue', lambda: None)
+    
+    tasks = [f'Buy milk brand {i}' for i in range(40)]
+    response = lambda_function.lambda_handler({'body': json.dumps({'tasks': tasks})}, None)
+    assert response['statusCode'] == 200
+    
+    organize_calls = -(-len(tasks) // max_batch_tasks())
+    link_calls = -(-len(tasks) // max_batch_link_tasks())
+    assert bedrock.calls == organize_calls + link_calls
+    
+    # The shared first candidate is itself one of the new tasks, which is never linked to itself
+    links = dynamodb.Table('task-links').scan()['Items']
+    assert len(links) == len(tasks) - 1
+    assert all(link['source_task_id'] != link['target_task_id'] for link in links)
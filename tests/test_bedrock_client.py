@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for the deadline-aware Bedrock client
+"""
+
+import json
+
+import pytest
+
+import lambda_function
+from shared.bedrock_client import BedrockUnavailable, CircuitBreaker, Deadline, ResilientBedrockClient
+from tests.fakes import FakeBedrockClient, FakeClock, bedrock_error
+
+def make_client(fake, clock, **kwargs):
+    kwargs.setdefault('breaker', CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock))
+    return ResilientBedrockClient(client=fake, clock=clock, sleep=clock.sleep, **kwargs)
+
+def invoke(client, deadline=None):
+    body = json.dumps({'messages': [{'role': 'user', 'content': 'hi'}]})
+    return client.invoke_model(modelId='model', body=body, deadline=deadline)
+
+def test_retries_throttling_then_succeeds():
+    clock = FakeClock()
+    fake = FakeBedrockClient(errors=[bedrock_error(), bedrock_error()], sleep=clock.sleep)
+    client = make_client(fake, clock)
+    
+    invoke(client)
+    
+    assert fake.calls == 3
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_validation_errors_are_not_retried():
+    clock = FakeClock()
+    fake = FakeBedrockClient(errors=[bedrock_error('ValidationException')], sleep=clock.sleep)
+    client = make_client(fake, clock)
+    
+    with pytest.raises(Exception) as error:
+        invoke(client)
+    
+    assert not isinstance(error.value, BedrockUnavailable)
+    assert fake.calls == 1
+
+def test_slow_calls_stop_at_the_deadline():
+    clock = FakeClock()
+    fake = FakeBedrockClient(latency=3.0, errors=[bedrock_error()] * 5, sleep=clock.sleep)
+    client = make_client(fake, clock, max_attempts=5)
+    
+    with pytest.raises(BedrockUnavailable):
+        invoke(client, Deadline(3.4, clock))
+    
+    # Too little time is left after the first attempt to try again
+    assert fake.calls == 1
+
+def test_calls_starting_late_time_out_by_the_deadline():
+    clock = FakeClock()
+    timeouts = []
+    
+    def client_factory(timeout):
+        timeouts.append(timeout)
+        return FakeBedrockClient(latency=3.0, read_timeout=timeout, sleep=clock.sleep)
+    
+    client = ResilientBedrockClient(client_factory=client_factory, clock=clock, sleep=clock.sleep,
+                                    breaker=CircuitBreaker(clock=clock))
+    deadline = Deadline(8, clock)
+    clock.sleep(6.8)
+    
+    with pytest.raises(BedrockUnavailable):
+        invoke(client, deadline)
+    
+    # The read timeout is cut to the 1.2 s left instead of the full budget
+    assert timeouts == [1.0]
+    assert clock() <= deadline.expires_at
+
+def test_circuit_opens_and_recovers_after_reset_timeout():
+    clock = FakeClock()
+    fake = FakeBedrockClient(errors=[bedrock_error('ServiceUnavailableException')] * 3, sleep=clock.sleep)
+    client = make_client(fake, clock, max_attempts=1)
+    
+    for _ in range(3):
+        with pytest.raises(BedrockUnavailable):
+            invoke(client)
+    assert client.breaker.state == CircuitBreaker.OPEN
+    
+    # While open, calls fail fast without touching Bedrock
+    with pytest.raises(BedrockUnavailable):
+        invoke(client)
+    assert fake.calls == 3
+    
+    clock.sleep(31)
+    invoke(client)
+    assert fake.calls == 4
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_probe_that_never_reaches_bedrock_is_handed_back():
+    clock = FakeClock()
+    fake = FakeBedrockClient(errors=[bedrock_error('ServiceUnavailableException')] * 3, sleep=clock.sleep)
+    client = make_client(fake, clock, max_attempts=1, max_concurrency=1, min_attempt_time=0.05)
+    for _ in range(3):
+        with pytest.raises(BedrockUnavailable):
+            invoke(client)
+    clock.sleep(31)
+    
+    # Too little budget, then no free slot: neither may use up the probe
+    with pytest.raises(BedrockUnavailable):
+        invoke(client, Deadline(0.01, clock))
+    client._slots.acquire()
+    with pytest.raises(BedrockUnavailable):
+        invoke(client, Deadline(0.1, clock))
+    client._slots.release()
+    assert client.breaker.state == CircuitBreaker.OPEN
+    
+    invoke(client)
+    assert fake.calls == 4
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_deadline_from_lambda_context():
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return 5000
+    
+    clock = FakeClock()
+    assert Deadline.from_context(Context(), budget=8, reserve=1, clock=clock).remaining() == 4
+    assert Deadline.from_context(None, budget=8, clock=clock).remaining() == 8
+
+def test_open_circuit_falls_back_to_keyword_organization(dynamodb, bedrock_only, monkeypatch):
+    clock = FakeClock()
+    fake = FakeBedrockClient(sleep=clock.sleep)
+    client = make_client(fake, clock)
+    client.breaker.state = CircuitBreaker.OPEN
+    client.breaker.opened_at = clock()
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: client)
+    
+    organized = lambda_function.organize_with_bedrock('Buy milk')
+    
+    assert fake.calls == 0
+    assert organized['category'] == 'Shopping'
+    assert organized['organized_by'] == 'fallback'
+
+def test_inline_link_finding_shares_the_request_deadline(dynamodb, bedrock_only, monkeypatch):
+    lambda_function.store_task({'task': 'Buy wine', 'category': 'Shopping', 'priority': 'low',
+                                'estimated_time': 10, 'tags': []}, 'test', task_id='wine')
+    clock = FakeClock()
+    fake = FakeBedrockClient(lambda prompt: json.dumps({'category': 'Shopping'}), latency=3, sleep=clock.sleep)
+    client = make_client(fake, clock)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: client)
+    monkeypatch.setattr(Deadline, 'from_context', classmethod(lambda cls, context, budget: Deadline(budget, clock)))
+    monkeypatch.setattr(lambda_function, 'BEDROCK_BUDGET_SECONDS', 3.4)
+    
+    response = lambda_function.lambda_handler({'body': json.dumps({'task': 'Buy wine glasses'})}, None)
+    
+    # Organizing used most of the budget, so linking gives up instead of overrunning it
+    assert response['statusCode'] == 200
+    assert fake.calls == 1
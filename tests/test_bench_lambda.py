@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the lambda_handler benchmark harness
+"""
+
+import json
+
+import lambda_function
+from bench_lambda import CapacityMeter, item_size, latency_summary, main
+
+class Response:
+    status_code = 200
+    
+    def __init__(self, body):
+        self.content = json.dumps(body).encode('utf-8')
+
+class Operation:
+    def __init__(self, name):
+        self.name = name
+
+def call(meter, operation, request, response=None):
+    context = {}
+    meter.before_call(Operation(operation), {'body': json.dumps(request).encode('utf-8')}, context)
+    meter.after_call(Response(response or {}), Operation(operation), context)
+
+def test_item_size_follows_dynamodb_rules():
+    assert item_size({'id': {'S': 'abc'}}) == 5
+    assert item_size({'done': {'BOOL': True}, 'n': {'N': '12345'}}) == 5 + 1 + 4
+    assert item_size({'tags': {'L': [{'S': 'ab'}]}}) == 4 + 3 + 2 + 1
+
+def test_meter_counts_index_writes_and_full_item_reads():
+    meter = CapacityMeter()
+    call(meter, 'CreateTable', {
+        'TableName': 'tasks',
+        'KeySchema': [{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        'GlobalSecondaryIndexes': [{'IndexName': 'unsynced-index', 'KeySchema': [
+            {'AttributeName': 'sync_pending', 'KeyType': 'HASH'}, {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+        ]}]
+    })
+    item = {'id': {'S': 'a'}, 'task': {'S': 'x' * 3000}, 'sync_pending': {'S': 'pending'}, 'timestamp': {'S': '1'}}
+    
+    # 3 KB to the table and the same again to the index
+    call(meter, 'PutItem', {'TableName': 'tasks', 'Item': item})
+    assert meter.write_units == 6
+    
+    # Leaving the index still writes to it once
+    call(meter, 'UpdateItem', {'TableName': 'tasks', 'Key': {'id': {'S': 'a'}},
+                               'UpdateExpression': 'SET synced = :val REMOVE sync_pending'})
+    assert meter.write_units == 12
+    call(meter, 'UpdateItem', {'TableName': 'tasks', 'Key': {'id': {'S': 'a'}},
+                               'UpdateExpression': 'SET link_status = :status'})
+    assert meter.write_units == 15
+    
+    # A projected read is billed on the stored item
+    call(meter, 'BatchGetItem', {'RequestItems': {'tasks': {'Keys': [{'id': {'S': 'a'}}]}}},
+         {'Responses': {'tasks': [{'id': {'S': 'a'}}]}})
+    assert meter.read_units == 0.5
+    assert meter.calls['UpdateItem'] == 2
+
+def test_latency_percentiles():
+    summary = latency_summary([ms / 1000 for ms in range(1, 101)])
+    
+    assert (summary['p50_ms'], summary['p95_ms'], summary['p99_ms']) == (50.0, 95.0, 99.0)
+
+def test_benchmark_saves_results_and_compares_to_a_baseline(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(lambda_function, 'TASK_STORE', lambda_function.TASK_STORE)
+    monkeypatch.setattr(lambda_function, 'LOCAL_CONFIDENCE_THRESHOLD', lambda_function.LOCAL_CONFIDENCE_THRESHOLD)
+    args = ['--sizes', '20,200', '--requests', '3', '--bedrock-ms', '0', '--local-threshold', '1.1']
+    
+    main(args + ['--output', str(tmp_path / 'baseline.json')])
+    document = main(args + ['--output', str(tmp_path / 'run.json'), '--baseline', str(tmp_path / 'baseline.json')])
+    
+    assert json.loads((tmp_path / 'run.json').read_text()) == document
+    [small, large] = document['results']
+    assert (small['corpus_size'], small['tasks']) == (20, 3)
+    assert small['bedrock']['calls_per_task'] == 2
+    assert small['bedrock']['prompt_tokens_per_task'] > 0
+    assert small['dynamodb']['write_units_per_task'] > 0
+    assert large['dynamodb']['read_units'] > small['dynamodb']['read_units']
+    assert 'vs baseline: p95' in capsys.readouterr().out
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the stream-driven changelog and change-feed sync
+"""
+
+import lambda_function
+import sync_obsidian
+from shared.changelog import EVENT_COMPLETED, EVENT_CREATED, Changelog, advance_watermark
+from shared.task_utils import query_unsynced_tasks
+from tests.fakes import FakeTaskStream
+
+def organized(text):
+    return {'task': text, 'category': 'Personal', 'priority': 'medium', 'estimated_time': 30, 'tags': []}
+
+def notes(vault):
+    return sorted((vault / 'Tasks').glob('*/*.md'))
+
+def test_stream_records_become_numbered_events(dynamodb):
+    stream = FakeTaskStream(dynamodb.Table('tasks'))
+    task_id = lambda_function.store_task(organized('Renew passport'), 'test')
+    stream.capture(task_id)
+    stream.update(task_id, completed=True)
+    
+    # Sync bookkeeping is invisible in the vault, so it is not a change
+    stream.update(task_id, synced_to_obsidian=True)
+    
+    assert lambda_function.changelog_handler(stream.event(), None) == {'recorded': 2}
+    
+    events = Changelog(dynamodb.Table('task-changelog')).pull('default', 0)
+    assert [(int(e['seq']), e['event']) for e in events] == [(1, EVENT_CREATED), (2, EVENT_COMPLETED)]
+    assert events[0]['task']['task'] == 'Renew passport'
+    assert Changelog(dynamodb.Table('task-changelog')).pull('default', 1) == events[1:]
+
+def test_watermark_waits_at_gaps_until_they_time_out():
+    events = [{'seq': 1, 'recorded_at': 100}, {'seq': 3, 'recorded_at': 100}]
+    
+    assert advance_watermark(0, events, gap_timeout=60, now=110) == 1
+    assert advance_watermark(0, events, gap_timeout=60, now=200) == 3
+
+def test_change_sync_applies_edits_completions_and_deletes(dynamodb, monkeypatch, tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    stream = FakeTaskStream(dynamodb.Table('tasks'))
+    keep = lambda_function.store_task(organized('Renew passport'), 'test')
+    drop = lambda_function.store_task(organized('Book flights'), 'test')
+    stream.capture(keep)
+    stream.capture(drop)
+    lambda_function.changelog_handler(stream.event(), None)
+    
+    sync_obsidian.sync_changes()
+    
+    assert len(notes(vault)) == 2
+    assert query_unsynced_tasks(dynamodb.Table('tasks')) == []
+    
+    stream.update(keep, priority='high', completed=True)
+    stream.delete(drop)
+    lambda_function.changelog_handler(stream.event(), None)
+    
+    sync_obsidian.sync_changes()
+    
+    [note] = notes(vault)
+    assert note.name.startswith('high-')
+    assert '- [x] Renew passport' in note.read_text()
+    
+    # The next run only reads changes after the last applied one
+    assert (tmp_path / 'sync_watermark').read_text().strip() == '4'
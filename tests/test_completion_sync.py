@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for sending Obsidian checkbox changes back to DynamoDB
+"""
+
+import lambda_function
+import sync_obsidian
+from shared.task_utils import batch_set_completed
+from vault_manifest import VaultManifest
+from vault_writer import parse_completed
+
+def organized(text):
+    return {'task': text, 'category': 'Personal', 'priority': 'medium', 'estimated_time': 30, 'tags': []}
+
+def test_parse_completed_reads_the_first_checkbox():
+    assert parse_completed(b"# Task\n\n## Notes\n- [x] Task\n- [ ] Subtask\n") is True
+    assert parse_completed(b"## Notes\n- [ ] Task\n## Related Tasks\n- [[Other|Other]]\n") is False
+    assert parse_completed(b"# No checkbox here\n") is None
+
+def test_batch_set_completed_skips_deleted_tasks(dynamodb):
+    table = dynamodb.Table('tasks')
+    ids = [lambda_function.store_task(organized(f'Task {i}'), 'test') for i in range(3)]
+    
+    assert batch_set_completed(table, {ids[0]: True, 'deleted': True, ids[1]: True}, '2024-05-01T10:00:00') == 2
+    
+    assert table.get_item(Key={'id': ids[0]})['Item']['completed_at'] == '2024-05-01T10:00:00'
+    assert table.get_item(Key={'id': ids[2]})['Item']['completed'] is False
+    assert 'Item' not in table.get_item(Key={'id': 'deleted'})
+
+def test_ticked_checkbox_reaches_dynamodb(dynamodb, monkeypatch, tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    table = dynamodb.Table('tasks')
+    task_id = lambda_function.store_task(organized('Renew passport'), 'test')
+    lambda_function.store_task(organized('Book flights'), 'test')
+    sync_obsidian.sync_to_obsidian()
+    
+    manifest = VaultManifest(tmp_path / 'vault_manifest.sqlite')
+    note = vault / manifest.path_for(task_id)
+    note.write_text(note.read_text().replace('- [ ] Renew passport', '- [x] Renew passport'))
+    
+    # Only the edited note is read
+    assert [entry['task_id'] for entry in manifest.changed_notes(vault)] == [task_id]
+    
+    sync_obsidian.sync_completions()
+    
+    item = table.get_item(Key={'id': task_id})['Item']
+    assert item['completed'] is True
+    assert 'completed_at' in item
+    assert manifest.changed_notes(vault) == []
+    
+    note.write_text(note.read_text().replace('- [x] Renew passport', '- [ ] Renew passport'))
+    sync_obsidian.sync_completions()
+    
+    item = table.get_item(Key={'id': task_id})['Item']
+    assert item['completed'] is False
+    assert 'completed_at' not in item
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming email parsing and multi-task email ingestion
+"""
+
+import io
+import os
+from email.message import EmailMessage
+
+import email_handler
+from shared.bedrock_client import ResilientBedrockClient
+from shared.email_ingest import TextPartFeed, extract_tasks, message_text, parse_raw_email
+from shared.pipeline import TaskPipeline
+from shared.task_utils import TaskOrganizer
+from tests.fakes import FakeBedrockClient
+from tests.test_batch_ingest import batch_responder
+
+BODY = """Hi,
+
+Things for this week:
+- Review the budget
+* [ ] Draft the roadmap
+- [x] Send the invoice
+1. Prepare the demo
+☐ Book the venue
+
+Not a task line.
+
+> - Quoted reply item
+
+--
+Sent from my phone
+- Signature bullet
+"""
+
+def raw_email(attachment_size=0):
+    message = EmailMessage()
+    message['From'] = 'me@example.com'
+    message['To'] = 'tasks@example.com'
+    message['Subject'] = '[task] This week'
+    message.set_content(BODY)
+    message.add_alternative('<ul><li>Review the budget</li><li>Draft the roadmap</li></ul>', subtype='html')
+    if attachment_size:
+        message.add_attachment(os.urandom(attachment_size), maintype='application', subtype='pdf',
+                               filename='slides.pdf')
+    return bytes(message)
+
+def test_bullet_and_open_checkbox_lines_become_tasks():
+    assert extract_tasks(BODY) == ['Review the budget', 'Draft the roadmap', 'Prepare the demo', 'Book the venue']
+
+def test_attachment_bodies_never_reach_the_parser():
+    raw = raw_email(attachment_size=2 * 1024 * 1024)
+    feed = TextPartFeed()
+    stream = io.BytesIO(raw)
+    while True:
+        chunk = stream.read(4096)
+        if not chunk:
+            break
+        feed.feed(chunk)
+    message = feed.close()
+    
+    assert feed.skipped_bytes > 2 * 1024 * 1024
+    [attachment] = [part for part in message.walk() if part.get_content_disposition() == 'attachment']
+    assert attachment.get_filename() == 'slides.pdf'
+    assert attachment.get_payload().strip() == ''
+    assert extract_tasks(message_text(message))[0] == 'Review the budget'
+
+def test_crlf_lines_split_across_chunks():
+    raw = raw_email().replace(b'\n', b'\r\n')
+    
+    message = parse_raw_email(io.BytesIO(raw), chunk_size=7)
+    
+    assert message['Subject'] == '[task] This week'
+    assert len(extract_tasks(message_text(message))) == 4
+
+def test_html_only_emails_use_list_items():
+    message = EmailMessage()
+    message['Subject'] = '[task] List'
+    message.set_content('<p>Todo:</p><ul><li>Review the budget</li><li>Call &amp; confirm</li></ul>', subtype='html')
+    
+    parsed = parse_raw_email(io.BytesIO(bytes(message)))
+    
+    assert extract_tasks(message_text(parsed)) == ['Review the budget', 'Call & confirm']
+
+def test_email_tasks_are_organized_and_stored_in_one_batch(dynamodb, tmp_path, monkeypatch):
+    (tmp_path / 'msg-1').write_bytes(raw_email(attachment_size=64 * 1024))
+    bedrock = FakeBedrockClient(batch_responder)
+    organizer = TaskOrganizer(bedrock=ResilientBedrockClient(client=bedrock), local_threshold=1.1)
+    confirmations = []
+    monkeypatch.setattr(email_handler, '_ingestor', TaskPipeline(organizer))
+    monkeypatch.setattr(email_handler, 'EMAIL_STORE_URI', str(tmp_path))
+    monkeypatch.setattr(email_handler, 'send_confirmation_email',
+                        lambda recipient, organized: confirmations.append(organized))
+    event = {'Records': [{'eventSource': 'aws:ses', 'ses': {'mail': {
+        'messageId': 'msg-1',
+        'commonHeaders': {'subject': '[task] This week', 'from': ['me@example.com']}
+    }}}]}
+    
+    email_handler.lambda_handler(event, None)
+    email_handler.lambda_handler(event, None)
+    
+    assert bedrock.calls == 1
+    items = dynamodb.Table('tasks').scan()['Items']
+    assert sorted(item['task'] for item in items) == [
+        'Book the venue', 'Draft the roadmap', 'Prepare the demo', 'Review the budget'
+    ]
+    assert {item['source'] for item in items} == {'email:me@example.com'}
+    assert [len(organized) for organized in confirmations] == [4, 4]
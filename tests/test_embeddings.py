@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for embedding-based task linking
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import lambda_function
+from shared.embeddings import (
+    EMBEDDING_ATTRIBUTE, EmbeddingStore, HashingEmbedder, create_embedder, decode_vector, encode_vector
+)
+from tests.fakes import FakeBedrockClient
+
+def test_hashing_embedder_is_deterministic_unit_vector():
+    embedder = HashingEmbedder(dimension=64)
+    task = {'task': 'Buy groceries for dinner party', 'category': 'Shopping', 'tags': ['food']}
+    
+    first = embedder.embed(task)
+    second = HashingEmbedder(dimension=64).embed(dict(task))
+    
+    assert first.dtype == np.float32
+    assert first.shape == (64,)
+    assert np.allclose(first, second)
+    assert np.isclose(np.linalg.norm(first), 1.0)
+
+def test_store_search_returns_most_similar_first():
+    embedder = HashingEmbedder()
+    store = EmbeddingStore()
+    tasks = {
+        'wine': {'task': 'Pick up wine for the dinner party', 'category': 'Shopping'},
+        'report': {'task': 'Finish quarterly report', 'category': 'Work'},
+        'cake': {'task': 'Order cake for dinner party', 'category': 'Shopping'},
+    }
+    for task_id, task in tasks.items():
+        store.add(task_id, embedder.embed(task))
+    
+    query = embedder.embed({'task': 'Send dinner party invites', 'category': 'Shopping'})
+    results = store.search(query, top_k=2)
+    
+    assert {task_id for task_id, _ in results} == {'wine', 'cake'}
+    assert results[0][1] >= results[1][1]
+    assert 'wine' not in [task_id for task_id, _ in store.search(query, top_k=3, exclude=['wine'])]
+    assert store.search(query, top_k=3, min_score=0.99) == []
+
+def test_store_grows_and_replaces_vectors():
+    store = EmbeddingStore(dimension=4)
+    for i in range(40):
+        store.add(f"task-{i}", np.eye(4, dtype=np.float32)[i % 4])
+    store.add('task-0', np.eye(4, dtype=np.float32)[3])
+    
+    assert len(store) == 40
+    assert np.allclose(store.get('task-0'), np.eye(4)[3])
+    
+    with pytest.raises(ValueError):
+        store.add('bad', np.ones(3))
+
+def test_vectors_round_trip_through_task_items():
+    embedder = HashingEmbedder(dimension=32)
+    vectors = {'a': embedder.embed({'task': 'call dentist'}), 'b': embedder.embed({'task': 'book flights'})}
+    items = [{'id': task_id, EMBEDDING_ATTRIBUTE: encode_vector(vector)} for task_id, vector in vectors.items()]
+    
+    # Tasks stored before embedding mode, or with another dimension, are skipped
+    items += [{'id': 'plain'}, {'id': 'wide', EMBEDDING_ATTRIBUTE: encode_vector(np.ones(64) / 8)}]
+    loaded = EmbeddingStore.from_items(items, 32)
+    
+    assert loaded.ids == ['a', 'b']
+    assert loaded.vectors.dtype == np.float32
+    assert np.allclose(loaded.vectors, np.stack([vectors['a'], vectors['b']]), atol=1e-3)
+    assert np.isclose(np.linalg.norm(decode_vector(items[0][EMBEDDING_ATTRIBUTE])), 1.0)
+
+def test_unknown_embedder_rejected():
+    with pytest.raises(ValueError):
+        create_embedder('word2vec')
+
+def test_embedding_mode_links_without_bedrock(dynamodb, monkeypatch):
+    bedrock = FakeBedrockClient()
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    monkeypatch.setattr(lambda_function, 'LINK_MODE', 'embedding')
+    
+    def organized(text, category):
+        return {'task': text, 'category': category, 'priority': 'medium', 'estimated_time': 30, 'tags': []}
+    
+    wine_id = lambda_function.store_task(organized('Pick up wine for the dinner party', 'Shopping'), 'test')
+    lambda_function.store_task(organized('Renew car insurance', 'Personal'), 'test')
+    
+    new_task = organized('Buy snacks for the dinner party', 'Shopping')
+    new_id = lambda_function.store_task(new_task, 'test')
+    lambda_function.find_and_store_links(new_id, new_task)
+    
+    links = dynamodb.Table('task-links').scan()['Items']
+    assert [link['target_task_id'] for link in links] == [wine_id]
+    assert bedrock.calls == 0
+    items = dynamodb.Table('tasks').scan()['Items']
+    assert all(EMBEDDING_ATTRIBUTE in item for item in items) and len(items) == 3
+
+def test_containers_storing_at_once_keep_every_vector(dynamodb, monkeypatch):
+    monkeypatch.setattr(lambda_function, 'LINK_MODE', 'embedding')
+    task = {'task': 'Plan the garden', 'category': 'Projects', 'priority': 'low', 'estimated_time': 30, 'tags': []}
+    
+    # Two containers with their own cached matrix each write only their task's vector
+    containers = [{}, {}]
+    for state in containers:
+        monkeypatch.setattr(lambda_function, '_embedding_state', state)
+        lambda_function.get_embedding_store()
+    for task_id, state in zip(('one', 'two'), containers):
+        monkeypatch.setattr(lambda_function, '_embedding_state', state)
+        lambda_function.store_task(dict(task, task=f'Plan the garden {task_id}'), 'test', task_id=task_id)
+    
+    assert [state['store'].ids for state in containers] == [['one'], ['two']]
+    monkeypatch.setattr(lambda_function, '_embedding_state', {})
+    assert sorted(lambda_function.get_embedding_store().ids) == ['one', 'two']
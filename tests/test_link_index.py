@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for link candidate selection
+"""
+
+import json
+
+import pytest
+
+import lambda_function
+from shared.link_index import TaskIndex, tokenize
+from tests.fakes import FakeBedrockClient, link_numbers
+
+EXISTING_TASKS = [
+    {'id': 'groceries', 'task': 'Buy groceries for dinner party', 'category': 'Shopping', 'tags': ['food']},
+    {'id': 'report', 'task': 'Finish quarterly report', 'category': 'Work', 'tags': ['report']},
+    {'id': 'dentist', 'task': 'Call dentist', 'category': 'Health', 'tags': []},
+    {'id': 'wine', 'task': 'Pick up wine for the dinner party', 'category': 'Shopping', 'tags': ['party']},
+]
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("Buy milk, eggs & the bread!") == ['buy', 'milk', 'eggs', 'bread']
+
+@pytest.mark.parametrize('scoring', ['bm25', 'tfidf'])
+def test_search_ranks_overlapping_tasks(scoring):
+    index = TaskIndex(scoring=scoring)
+    index.add_all(EXISTING_TASKS)
+    
+    new_task = {'task': 'Send invites for dinner party', 'category': 'Personal', 'tags': ['party']}
+    ranked = [task_id for task_id, _ in index.search(new_task, top_k=2)]
+    
+    assert ranked[0] == 'wine'
+    assert set(ranked) == {'wine', 'groceries'}
+
+def test_search_respects_top_k_and_exclude():
+    index = TaskIndex()
+    index.add_all(EXISTING_TASKS)
+    
+    query = {'task': 'dinner party shopping', 'category': 'Shopping', 'tags': []}
+    assert len(index.search(query, top_k=1)) == 1
+    assert 'wine' not in [task_id for task_id, _ in index.search(query, top_k=5, exclude=['wine'])]
+    assert index.search({'task': 'zebra', 'category': '', 'tags': []}, top_k=5) == []
+
+def test_unknown_scoring_rejected():
+    with pytest.raises(ValueError):
+        TaskIndex(scoring='cosine')
+
+def test_find_and_store_links_sends_only_candidates(dynamodb, monkeypatch):
+    for task in EXISTING_TASKS:
+        dynamodb.Table('tasks').put_item(Item=task)
+    
+    # 99 was never offered and is ignored
+    bedrock = FakeBedrockClient(lambda prompt: json.dumps(link_numbers(prompt, 'wine') + [99]))
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    monkeypatch.setattr(lambda_function, 'LINK_CANDIDATES_K', 2)
+    
+    new_task = {'task': 'Send invites for dinner party', 'category': 'Personal', 'tags': ['party']}
+    lambda_function.find_and_store_links('new', new_task)
+    
+    assert bedrock.calls == 1
+    assert 'Pick up wine for the dinner party (Shopping)' in bedrock.prompts[0]
+    assert 'quarterly report' not in bedrock.prompts[0]
+    
+    links = dynamodb.Table('task-links').scan()['Items']
+    assert [link['target_task_id'] for link in links] == ['wine']
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for batched link resolution during sync
+"""
+
+import pytest
+
+import sync_obsidian
+from shared.task_store import DynamoDBTaskStore
+from shared.task_utils import batch_get_tasks
+
+class CountingResource:
+    """DynamoDB resource wrapper that counts BatchGetItem calls and can defer keys"""
+    
+    def __init__(self, dynamodb, unprocessed_rounds=0):
+        self.dynamodb = dynamodb
+        self.unprocessed_rounds = unprocessed_rounds
+        self.batch_gets = []
+    
+    def Table(self, name):
+        return self.dynamodb.Table(name)
+    
+    def batch_get_item(self, RequestItems):
+        self.batch_gets.append(len(RequestItems['tasks']['Keys']))
+        if self.unprocessed_rounds:
+            self.unprocessed_rounds -= 1
+            return {'Responses': {}, 'UnprocessedKeys': RequestItems}
+        return self.dynamodb.batch_get_item(RequestItems=RequestItems)
+
+def test_batch_get_dedupes_and_chunks(dynamodb):
+    tasks = dynamodb.Table('tasks')
+    with tasks.batch_writer() as batch:
+        for i in range(150):
+            batch.put_item(Item={'id': f'task-{i}', 'task': f'Task {i}'})
+    
+    resource = CountingResource(dynamodb)
+    ids = [f'task-{i}' for i in range(150)] * 2 + ['missing']
+    found = batch_get_tasks(resource, ids)
+    
+    assert len(found) == 150
+    assert found['task-7']['task'] == 'Task 7'
+    assert sorted(resource.batch_gets) == [51, 100]
+
+def test_batch_get_retries_unprocessed_keys(dynamodb):
+    dynamodb.Table('tasks').put_item(Item={'id': 'a', 'task': 'Plan party'})
+    
+    resource = CountingResource(dynamodb, unprocessed_rounds=2)
+    assert batch_get_tasks(resource, ['a'], sleep=lambda seconds: None)['a']['task'] == 'Plan party'
+    assert len(resource.batch_gets) == 3
+    
+    stuck = CountingResource(dynamodb, unprocessed_rounds=10)
+    with pytest.raises(RuntimeError):
+        batch_get_tasks(stuck, ['a'], max_retries=2, sleep=lambda seconds: None)
+
+def test_resolver_fetches_all_linked_titles_in_one_batch(dynamodb):
+    tasks = dynamodb.Table('tasks')
+    links = dynamodb.Table('task-links')
+    for task_id in ('new-1', 'new-2', 'old-1', 'old-2'):
+        tasks.put_item(Item={'id': task_id, 'task': f'Task {task_id}'})
+    links.put_item(Item={'source_task_id': 'new-1', 'target_task_id': 'old-1'})
+    links.put_item(Item={'source_task_id': 'new-2', 'target_task_id': 'old-1'})
+    links.put_item(Item={'source_task_id': 'old-2', 'target_task_id': 'new-2'})
+    links.put_item(Item={'source_task_id': 'new-2', 'target_task_id': 'deleted'})
+    
+    resource = CountingResource(dynamodb)
+    resolver = sync_obsidian.LinkResolver(DynamoDBTaskStore(resource))
+    resolver.remember([{'id': 'new-1', 'task': 'Task new-1'}, {'id': 'new-2', 'task': 'Task new-2'}])
+    resolver.prefetch(['new-1', 'new-2'])
+    
+    # old-1, old-2 and the dangling ID, each fetched once
+    assert resource.batch_gets == [3]
+    assert resolver.links_for('new-1') == [{'id': 'old-1', 'task': 'Task old-1', 'direction': 'outgoing'}]
+    assert {(link['id'], link['direction']) for link in resolver.links_for('new-2')} == {
+        ('old-1', 'outgoing'), ('old-2', 'incoming')
+    }
+    assert resource.batch_gets == [3]
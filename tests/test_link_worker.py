@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for asynchronous link discovery
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import lambda_function
+import sync_obsidian
+from shared.link_queue import InProcessLinkQueue
+from shared.task_utils import build_task_item
+from tests.fakes import FakeBedrockClient, link_numbers
+
+def link_to_wine(prompt):
+    return json.dumps(link_numbers(prompt, 'wine'))
+
+def api_event(task):
+    return {'body': json.dumps({'task': task, 'source': 'test'})}
+
+def test_handler_enqueues_and_worker_drains(dynamodb, monkeypatch):
+    dynamodb.Table('tasks').put_item(Item={
+        'id': 'wine', 'task': 'Pick up wine for dinner party', 'category': 'Shopping', 'tags': []
+    })
+    
+    organize = FakeBedrockClient(lambda prompt: json.dumps({
+        'task': 'Buy snacks for dinner party', 'category': 'Shopping',
+        'priority': 'low', 'estimated_time': 20, 'tags': ['party']
+    }))
+    queue = InProcessLinkQueue()
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: organize)
+    monkeypatch.setattr(lambda_function, 'get_link_queue', lambda: queue)
+    
+    response = lambda_function.lambda_handler(api_event('Buy snacks for dinner party'), None)
+    task_id = json.loads(response['body'])['id']
+    
+    # Only the organize call happens on the request path
+    assert response['statusCode'] == 200
+    assert organize.calls == 1
+    assert len(queue) == 1
+    tasks = dynamodb.Table('tasks')
+    assert tasks.get_item(Key={'id': task_id})['Item']['link_status'] == 'pending'
+    
+    linker = FakeBedrockClient(link_to_wine)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: linker)
+    assert lambda_function.drain_link_queue(queue) == 1
+    
+    assert len(queue) == 0
+    assert tasks.get_item(Key={'id': task_id})['Item']['link_status'] == 'linked'
+    links = dynamodb.Table('task-links').scan()['Items']
+    assert [(link['source_task_id'], link['target_task_id']) for link in links] == [(task_id, 'wine')]
+
+def test_worker_retries_then_marks_failed(dynamodb, monkeypatch):
+    for task_id in ('a', 'b'):
+        dynamodb.Table('tasks').put_item(Item={
+            'id': task_id, 'task': 'Plan team offsite', 'category': 'Work', 'tags': [], 'link_status': 'pending'
+        })
+    
+    broken = FakeBedrockClient(lambda prompt: 'not json')
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: broken)
+    
+    def record(message_id, task_id, attempts):
+        job = {'task_id': task_id, 'task': {'task': 'Plan team offsite', 'category': 'Work', 'tags': []}}
+        return {
+            'messageId': message_id,
+            'body': json.dumps(job),
+            'attributes': {'ApproximateReceiveCount': str(attempts)}
+        }
+    
+    result = lambda_function.link_worker_handler({'Records': [record('m1', 'a', 1), record('m2', 'b', 3)]}, None)
+    
+    # Bedrock is asked once per job but the tasks table is scanned once per batch
+    assert broken.calls == 2
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'm1'}]}
+    tasks = dynamodb.Table('tasks')
+    assert tasks.get_item(Key={'id': 'a'})['Item']['link_status'] == 'pending'
+    assert tasks.get_item(Key={'id': 'b'})['Item']['link_status'] == 'failed'
+
+def test_sync_waits_for_pending_links(monkeypatch):
+    monkeypatch.setenv('LINK_WAIT_SECONDS', '600')
+    now = datetime.utcnow()
+    
+    assert sync_obsidian.links_final({'timestamp': now.isoformat()})
+    assert sync_obsidian.links_final({'timestamp': now.isoformat(), 'link_status': 'linked'})
+    assert not sync_obsidian.links_final({'timestamp': now.isoformat(), 'link_status': 'pending'})
+    
+    stale = (now - timedelta(hours=1)).isoformat()
+    assert sync_obsidian.links_final({'timestamp': stale, 'link_status': 'pending'})
+
+def test_link_wait_uses_the_timestamp_offset(monkeypatch):
+    monkeypatch.setenv('LINK_WAIT_SECONDS', '600')
+    
+    # A task just stored from a machine far from UTC is not mistaken for an old one
+    task = build_task_item('a', {'task': 'Buy milk', 'category': 'Shopping', 'priority': 'low',
+                                 'estimated_time': 5, 'tags': []}, 'test', link_status='pending')
+    local = datetime.fromisoformat(task['timestamp']).astimezone(timezone(timedelta(hours=-10)))
+    
+    assert not sync_obsidian.links_final(task)
+    assert not sync_obsidian.links_final(dict(task, timestamp=local.isoformat()))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the local keyword classifier
+"""
+
+import lambda_function
+from shared.local_classifier import classify_task, confident_organization
+from shared.task_utils import fallback_organization
+from tests.fakes import FakeBedrockClient
+
+def test_obvious_tasks_are_confident():
+    milk = classify_task('buy milk')
+    gym = classify_task('Gym workout at 6')
+    
+    assert milk['category'] == 'Shopping'
+    assert 'groceries' in milk['tags']
+    assert gym['category'] == 'Health'
+    assert min(milk['confidence'], gym['confidence']) >= 0.75
+
+def test_conflicting_or_unknown_tasks_are_not_confident():
+    assert classify_task('Buy a book for the course')['confidence'] < 0.75
+    assert classify_task('Plan vacation')['confidence'] == 0.0
+    assert confident_organization('Plan vacation') is None
+
+def test_lone_or_ambiguous_keywords_are_not_confident():
+    for text in ('Run payroll for March', 'Book flights to Denver', 'Store winter tires in garage',
+                 'Read the lease renewal contract', 'Review the car insurance quote', 'Gym at 6'):
+        assert confident_organization(text) is None, text
+    assert classify_task('Go for a run then stretch')['confidence'] >= 0.75
+
+def test_keywords_match_whole_words_only():
+    # "run" must not match inside "brunch", nor "store" inside "restore"
+    assert classify_task('Book brunch table')['category'] != 'Health'
+    assert classify_task('restore laptop backup')['category'] == 'Personal'
+
+def test_priority_and_quick_task_estimates():
+    assert classify_task('URGENT: send the client report')['priority'] == 'high'
+    assert classify_task('maybe learn piano someday')['priority'] == 'low'
+    assert classify_task('Call mom')['estimated_time'] == 10
+
+def test_fallback_uses_classifier_without_confidence():
+    organized = fallback_organization('Pick up groceries')
+    
+    assert organized['category'] == 'Shopping'
+    assert organized['organized_by'] == 'fallback'
+    assert 'confidence' not in organized
+
+def test_confident_tasks_skip_bedrock(dynamodb, monkeypatch):
+    bedrock = FakeBedrockClient()
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    
+    organized = lambda_function.organize_with_bedrock('Buy milk and eggs')
+    
+    assert bedrock.calls == 0
+    assert organized['category'] == 'Shopping'
+    assert organized['organized_by'] == 'local'
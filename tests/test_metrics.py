@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for per-invocation metrics and sampled prompt logging
+"""
+
+import json
+
+import lambda_function
+from shared import metrics
+from shared.bedrock_client import ResilientBedrockClient
+from tests.fakes import FakeBedrockClient, FakeClock, link_numbers
+
+def organized(text):
+    return {'task': text, 'category': 'Shopping', 'priority': 'low', 'estimated_time': 15, 'tags': ['party']}
+
+def emf_records(output):
+    return [json.loads(line) for line in output.splitlines() if line.startswith('{"_aws"')]
+
+def test_record_is_embedded_metric_format():
+    clock = FakeClock()
+    invocation = metrics.Metrics('task-organizer', clock=clock)
+    for _ in range(2):
+        with invocation.span('TaskScan'):
+            clock.sleep(0.25)
+    invocation.count('ItemsScanned', 40)
+    invocation.count('ItemsScanned', 2)
+    
+    record = invocation.record()
+    
+    [directive] = record['_aws']['CloudWatchMetrics']
+    assert directive['Dimensions'] == [['Function']]
+    assert {'Name': 'TaskScanMs', 'Unit': 'Milliseconds'} in directive['Metrics']
+    assert {'Name': 'ItemsScanned', 'Unit': 'Count'} in directive['Metrics']
+    assert record['Function'] == 'task-organizer'
+    assert (record['TaskScanMs'], record['TaskScanCalls'], record['ItemsScanned']) == (500.0, 2, 42)
+    assert record['DurationMs'] == 500.0
+
+def test_handler_emits_one_record_without_prompts(dynamodb, bedrock_only, monkeypatch, capsys):
+    for task_id in ('wine', 'cheese'):
+        lambda_function.store_task(organized(f'Buy {task_id} for the dinner party'), 'test', task_id=task_id)
+    bedrock = FakeBedrockClient(lambda prompt: json.dumps(link_numbers(prompt, 'wine')) if 'relationships' in prompt else 'not json')
+    client = ResilientBedrockClient(client=bedrock)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: client)
+    capsys.readouterr()
+    
+    lambda_function.lambda_handler({'body': json.dumps({'task': 'Send dinner party invites'})}, None)
+    
+    output = capsys.readouterr().out
+    [record] = emf_records(output)
+    assert 'Prompt for link finding' not in output
+    assert record['BedrockInvokeCalls'] == 2
+    assert record['TaskPutCalls'] == record['TaskScanCalls'] == record['LinkWriteCalls'] == 1
+    assert (record['ItemsScanned'], record['LinksWritten']) == (3, 1)
+    assert record['FallbackOrganizations'] == 1
+    assert record['CacheMisses'] == 1 and record['CacheHits'] == 0
+
+def test_sampled_invocations_log_prompts(dynamodb, monkeypatch, capsys):
+    lambda_function.store_task(organized('Buy wine for the dinner party'), 'test', task_id='wine')
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: FakeBedrockClient(lambda prompt: '[]'))
+    monkeypatch.setattr(metrics, 'DEBUG_SAMPLE_RATE', 1.0)
+    
+    metrics.start_invocation()
+    lambda_function.find_and_store_links('new', organized('Buy cheese for the dinner party'))
+    
+    assert '[1] Buy wine for the dinner party (Shopping)' in capsys.readouterr().out
+
+def test_cache_hits_are_not_counted_as_bedrock_organizations(dynamodb, bedrock_only, monkeypatch, capsys):
+    bedrock = FakeBedrockClient(lambda prompt: json.dumps({'category': 'Shopping'}) if 'Analyze this task' in prompt else '[]')
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    
+    for _ in range(2):
+        lambda_function.lambda_handler({'body': json.dumps({'task': 'Buy oat milk'})}, None)
+    
+    first, second = emf_records(capsys.readouterr().out)
+    assert first['BedrockOrganizations'] == 1 and 'CacheOrganizations' not in first
+    assert second['CacheOrganizations'] == 1 and 'BedrockOrganizations' not in second
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the organization cache
+"""
+
+import json
+import time
+
+import lambda_function
+from shared.organization_cache import (
+    DynamoDBCacheTier, LRUCache, OrganizationCache, cache_version, normalize_task_text
+)
+from tests.fakes import FakeBedrockClient
+
+GROCERIES = {'task': 'Buy groceries', 'category': 'Shopping', 'priority': 'medium', 'estimated_time': 45, 'tags': ['food']}
+
+def test_normalize_task_text_ignores_case_spacing_and_punctuation():
+    assert normalize_task_text("  Buy   Groceries! ") == normalize_task_text("buy groceries")
+    assert normalize_task_text("Weekly report.") == "weekly report"
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    lru.get('a')
+    lru.put('c', 3)
+    
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.evictions == 1
+
+def test_cache_hit_keeps_original_text_and_counts():
+    cache = OrganizationCache(version='v1')
+    assert cache.get('Buy groceries') is None
+    
+    cache.put('Buy groceries', GROCERIES)
+    hit = cache.get('buy groceries!')
+    
+    assert hit['category'] == 'Shopping'
+    assert hit['task'] == 'buy groceries!'
+    assert cache.stats() == {'hits': 1, 'shared_hits': 0, 'misses': 1, 'evictions': 0, 'size': 1}
+
+def test_version_change_invalidates():
+    cache = OrganizationCache(version=cache_version('prompt', 'model-a'))
+    cache.put('Buy groceries', GROCERIES)
+    
+    cache.invalidate(cache_version('prompt', 'model-b'))
+    
+    assert cache.get('Buy groceries') is None
+    assert cache_version('prompt', 'model-a') != cache_version('prompt v2', 'model-a')
+
+def test_shared_tier_serves_other_containers_and_honours_ttl(dynamodb):
+    table = dynamodb.Table('task-organization-cache')
+    writer = OrganizationCache('v1', shared_tier=DynamoDBCacheTier(table))
+    writer.put('Weekly report', dict(GROCERIES, category='Work'))
+    
+    reader = OrganizationCache('v1', shared_tier=DynamoDBCacheTier(table))
+    assert reader.get('weekly report')['category'] == 'Work'
+    assert reader.stats()['shared_hits'] == 1
+    
+    # A second read is served from the local tier
+    reader.get('weekly report')
+    assert reader.stats()['shared_hits'] == 1
+    
+    table.put_item(Item={'cache_key': 'v1:call mom', 'organized': json.dumps(GROCERIES), 'expires_at': int(time.time()) - 1})
+    assert reader.get('Call mom') is None
+
+def test_organize_with_bedrock_skips_bedrock_on_repeat(dynamodb, bedrock_only, monkeypatch):
+    bedrock = FakeBedrockClient(lambda prompt: json.dumps(GROCERIES))
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    
+    first = lambda_function.organize_with_bedrock('Buy groceries')
+    second = lambda_function.organize_with_bedrock('buy  groceries')
+    
+    assert bedrock.calls == 1
+    assert second['category'] == first['category'] == 'Shopping'
+    assert second['task'] == 'buy  groceries'
+
+def test_fallback_results_are_not_cached(dynamodb, bedrock_only, monkeypatch):
+    bedrock = FakeBedrockClient(lambda prompt: 'not json')
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    
+    lambda_function.organize_with_bedrock('Buy groceries')
+    lambda_function.organize_with_bedrock('Buy groceries')
+    
+    assert bedrock.calls == 2
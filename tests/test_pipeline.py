@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process ingestion pipeline used by the trigger Lambdas
+"""
+
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+import email_handler
+import lambda_function
+import whatsapp_webhook
+from shared.bedrock_client import ResilientBedrockClient
+from shared.link_queue import InProcessLinkQueue, LINK_PENDING
+from shared.pipeline import HttpIngestor, InvalidTask, TaskPipeline, create_ingestor
+from shared.task_utils import TaskOrganizer
+from tests.fakes import FakeBedrockClient
+
+def organize_responder(prompt):
+    return json.dumps({'category': 'Work', 'priority': 'high', 'estimated_time': 45, 'tags': ['review']})
+
+@pytest.fixture
+def pipeline(dynamodb):
+    bedrock = FakeBedrockClient(organize_responder)
+    organizer = TaskOrganizer(bedrock=ResilientBedrockClient(client=bedrock), local_threshold=1.1)
+    return TaskPipeline(organizer, InProcessLinkQueue())
+
+def test_pipeline_stores_the_task_and_enqueues_its_link_job(dynamodb, pipeline):
+    result = pipeline.ingest('  Review the quarterly numbers ', 'whatsapp:+15550100')
+    
+    item = dynamodb.Table('tasks').get_item(Key={'id': result['id']})['Item']
+    assert item['task'] == 'Review the quarterly numbers'
+    assert (item['category'], item['priority'], item['source']) == ('Work', 'high', 'whatsapp:+15550100')
+    assert item['link_status'] == LINK_PENDING
+    
+    [job] = pipeline.link_queue.receive()
+    assert job['task_id'] == result['id']
+    assert result['organized_task']['category'] == 'Work'
+
+def test_pipeline_rejects_invalid_tasks(dynamodb, pipeline):
+    with pytest.raises(InvalidTask):
+        pipeline.ingest(' a ', 'whatsapp:+15550100')
+    
+    assert dynamodb.Table('tasks').scan()['Items'] == []
+    assert len(pipeline.link_queue) == 0
+
+def test_whatsapp_webhook_ingests_in_process(dynamodb, pipeline, monkeypatch):
+    monkeypatch.setattr(whatsapp_webhook, '_ingestor', pipeline)
+    event = {'body': urlencode({'Body': 'Review the quarterly numbers', 'From': 'whatsapp:+15550100'})}
+    
+    response = whatsapp_webhook.lambda_handler(event, None)
+    
+    assert 'Category: Work' in response['body']
+    [item] = dynamodb.Table('tasks').scan()['Items']
+    assert item['source'].endswith('+15550100')
+
+def test_email_handler_ingests_in_process(dynamodb, pipeline, monkeypatch):
+    monkeypatch.setattr(email_handler, '_ingestor', pipeline)
+    confirmations = []
+    monkeypatch.setattr(email_handler, 'send_confirmation_email',
+                        lambda recipient, organized: confirmations.append((recipient, organized[0]['category'])))
+    event = {'Records': [{'eventSource': 'aws:ses', 'ses': {'mail': {'commonHeaders': {
+        'subject': '[task] Review the quarterly numbers', 'from': ['me@example.com']
+    }}}}]}
+    
+    assert email_handler.lambda_handler(event, None)['statusCode'] == 200
+    
+    [item] = dynamodb.Table('tasks').scan()['Items']
+    assert (item['task'], item['source']) == ('Review the quarterly numbers', 'email:me@example.com')
+    assert confirmations == [('me@example.com', 'Work')]
+
+def test_http_ingestor_reports_api_failures(monkeypatch):
+    class FailingSession:
+        def post(self, url, json=None, timeout=None):
+            return type('Response', (), {'status_code': 500, 'text': 'boom'})()
+    
+    monkeypatch.setattr(whatsapp_webhook, '_ingestor', HttpIngestor('https://example.test/task', FailingSession()))
+    event = {'body': urlencode({'Body': 'Review the quarterly numbers', 'From': 'whatsapp:+15550100'})}
+    
+    assert 'Failed to organize task' in whatsapp_webhook.lambda_handler(event, None)['body']
+
+def test_direct_ingestion_refuses_to_start_without_a_link_queue(monkeypatch):
+    monkeypatch.delenv('TASK_INGEST_MODE', raising=False)
+    monkeypatch.delenv('LINK_QUEUE_URL', raising=False)
+    monkeypatch.delenv('TASK_API_ENDPOINT', raising=False)
+    
+    with pytest.raises(ValueError, match='LINK_QUEUE_URL'):
+        create_ingestor()
+
+def test_triggers_with_only_a_task_api_endpoint_keep_using_it(monkeypatch):
+    monkeypatch.delenv('TASK_INGEST_MODE', raising=False)
+    monkeypatch.delenv('LINK_QUEUE_URL', raising=False)
+    monkeypatch.setenv('TASK_API_ENDPOINT', 'https://example.test/task')
+    
+    ingestor = create_ingestor()
+    
+    assert isinstance(ingestor, HttpIngestor)
+    assert ingestor.endpoint == 'https://example.test/task'
+
+def test_pipeline_stores_vectors_in_embedding_mode(dynamodb, monkeypatch):
+    pytest.importorskip('numpy')
+    from shared.embeddings import EMBEDDING_ATTRIBUTE
+    
+    monkeypatch.setenv('LINK_MODE', 'embedding')
+    organizer = TaskOrganizer(bedrock=ResilientBedrockClient(client=FakeBedrockClient(organize_responder)),
+                              local_threshold=1.1)
+    pipeline = TaskPipeline(organizer, InProcessLinkQueue())
+    
+    one = pipeline.ingest('Review the quarterly numbers', 'whatsapp:+15550100')['id']
+    many = pipeline.ingest_many(['Draft the board memo', 'Book the offsite venue'], 'email:me@example.com')['ids']
+    
+    items = dynamodb.Table('tasks').scan()['Items']
+    assert all(item.get(EMBEDDING_ATTRIBUTE) for item in items) and len(items) == 3
+    # The link worker's similarity search sees tasks ingested by the triggers
+    assert sorted(lambda_function.get_embedding_store().ids) == sorted([one] + many)
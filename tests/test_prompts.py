@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for compact Bedrock prompts
+"""
+
+import uuid
+
+from shared import metrics
+from shared.prompts import (
+    build_batch_organize_prompt, build_link_prompt, build_organize_prompt, compact_text, estimate_tokens, record_usage
+)
+from shared.task_utils import organize_chunk_with_bedrock
+from tests.fakes import FakeBedrockClient
+
+def candidate(text, category='Shopping'):
+    return {'id': str(uuid.uuid4()), 'task': text, 'category': category}
+
+def test_compact_text_collapses_whitespace_and_cuts_at_a_word():
+    assert compact_text('  Buy\n\nmilk \t now ', 50) == 'Buy milk now'
+    assert compact_text('Pick up the dry cleaning before Friday', 20) == 'Pick up the dry…'
+    assert len(compact_text('x' * 300, 40)) == 40
+
+def test_link_prompt_numbers_candidates_and_maps_replies_back():
+    candidates = [candidate('Buy wine for the party'), candidate('Buy cheese for the party')]
+    
+    prompt = build_link_prompt({'task': 'Send party invites', 'category': 'Personal'}, candidates)
+    
+    assert '[1] Buy wine for the party (Shopping)' in prompt.text
+    assert candidates[0]['id'] not in prompt.text
+    assert prompt.resolve([2, '1', 2, 7, 'abc']) == [candidates[1]['id'], candidates[0]['id']]
+
+def test_link_prompt_drops_candidates_over_the_budget():
+    candidates = [candidate(f'Errand number {i} ' + 'detail ' * 40) for i in range(50)]
+    new_task = {'task': 'Plan the weekend errands', 'category': 'Personal'}
+    
+    prompt = build_link_prompt(new_task, candidates, budget=400)
+    
+    assert prompt.input_tokens <= 400
+    assert 0 < len(prompt.aliases) < 50 and prompt.dropped == 50 - len(prompt.aliases)
+    assert prompt.aliases['1'] == candidates[0]['id']
+    assert len(build_link_prompt(new_task, candidates[:1], budget=10).aliases) == 1
+
+def test_organize_prompt_is_cut_and_usage_is_counted():
+    prompt = build_organize_prompt('word ' * 1000, max_chars=200)
+    assert prompt.input_tokens < estimate_tokens('word ' * 1000) // 4
+    
+    invocation = metrics.start_invocation()
+    record_usage('Organize', prompt, {'usage': {'input_tokens': 90, 'output_tokens': 25}})
+    
+    assert invocation.counters == {
+        'OrganizePromptTokens': prompt.input_tokens, 'OrganizeInputTokens': 90, 'OrganizeOutputTokens': 25
+    }
+
+def test_batch_prompt_is_compact_and_counted():
+    prompt = build_batch_organize_prompt(['  Buy\n milk ', 'word ' * 400])
+    
+    assert '1. Buy milk\n2. word' in prompt.text
+    assert '"task"' not in prompt.text
+    assert prompt.input_tokens < estimate_tokens('word ' * 400)
+    
+    invocation = metrics.start_invocation()
+    bedrock = FakeBedrockClient(lambda prompt: '[{"index": 1, "category": "Shopping"}]')
+    [entry] = organize_chunk_with_bedrock(bedrock, ['Buy milk'])
+    
+    assert entry['category'] == 'Shopping'
+    assert invocation.counters['BatchOrganizePromptTokens'] == bedrock.prompt_tokens
+    assert invocation.counters['BatchOrganizeOutputTokens'] == bedrock.output_tokens
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the resident sync daemon
+"""
+
+import threading
+
+import lambda_function
+import sync_daemon
+from shared.task_store import DynamoDBTaskStore
+from sync_daemon import AdaptivePoller, LatencyStats, SyncDaemon, send_command
+from vault_manifest import VaultManifest
+
+def organized(text):
+    return {'task': text, 'category': 'Personal', 'priority': 'medium', 'estimated_time': 30, 'tags': []}
+
+def test_poller_backs_off_when_idle_and_resets_on_activity():
+    poller = AdaptivePoller(min_interval=10, max_interval=60, factor=2)
+    
+    assert [poller.next_interval(0) for _ in range(4)] == [20, 40, 60, 60]
+    assert poller.next_interval(3) == 10
+
+def test_latency_summary():
+    stats = LatencyStats()
+    for ms in range(1, 101):
+        stats.add(ms / 1000)
+    
+    assert stats.summary() == {'count': 100, 'p50_ms': 51.0, 'p95_ms': 96.0, 'max_ms': 100.0}
+
+def test_daemon_reuses_its_session_and_only_checks_changed_notes(dynamodb, monkeypatch, tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    task_id = lambda_function.store_task(organized('Renew passport'), 'test')
+    
+    daemon = SyncDaemon(socket_path=tmp_path / 'daemon.sock', store=DynamoDBTaskStore(dynamodb))
+    daemon.watching = True
+    assert daemon.run_once(full_check=True) == 1
+    
+    manifest = VaultManifest(tmp_path / 'vault_manifest.sqlite')
+    note_path = manifest.path_for(task_id)
+    note = vault / note_path
+    note.write_text(note.read_text().replace('- [ ]', '- [x]'))
+    
+    # Without a file event the edited note is left for later
+    assert daemon.run_once() == 0
+    
+    daemon.note_changed(note_path)
+    assert daemon.run_once() == 1
+    assert dynamodb.Table('tasks').get_item(Key={'id': task_id})['Item']['completed'] is True
+    assert daemon.status()['latency']['reverse']['count'] == 2
+
+def test_control_socket_reports_status(dynamodb, monkeypatch, tmp_path):
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(tmp_path))
+    monkeypatch.setattr(sync_daemon, 'DEBOUNCE_SECONDS', 0)
+    socket_path = tmp_path / 'daemon.sock'
+    daemon = SyncDaemon(socket_path=socket_path, store=DynamoDBTaskStore(dynamodb))
+    
+    ran = threading.Event()
+    original_run_once = daemon.run_once
+    def run_once(full_check=False):
+        result = original_run_once(full_check)
+        ran.set()
+        return result
+    daemon.run_once = run_once
+    
+    thread = threading.Thread(target=daemon.serve_forever, args=(tmp_path,))
+    thread.start()
+    try:
+        assert ran.wait(10)
+        status = send_command('status', socket_path)
+        assert status['cycles'] >= 1
+        assert status['mode'] == 'index'
+        assert 'forward' in status['latency']
+    finally:
+        assert send_command('stop', socket_path) == {'ok': True}
+        thread.join(10)
+    
+    assert not socket_path.exists()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the sparse unsynced-task index and the Obsidian sync
+"""
+
+import lambda_function
+import sync_obsidian
+from shared.task_utils import backfill_sync_index, mark_task_synced, query_incoming_links, query_unsynced_tasks
+
+def organized(text):
+    return {'task': text, 'category': 'Personal', 'priority': 'medium', 'estimated_time': 30, 'tags': []}
+
+def test_only_pending_tasks_are_queried(dynamodb):
+    table = dynamodb.Table('tasks')
+    first = lambda_function.store_task(organized('Renew passport'), 'test')
+    second = lambda_function.store_task(organized('Book flights'), 'test')
+    
+    assert [item['id'] for item in query_unsynced_tasks(table)] == [first, second]
+    
+    mark_task_synced(table, first)
+    
+    assert [item['id'] for item in query_unsynced_tasks(table)] == [second]
+    item = table.get_item(Key={'id': first})['Item']
+    assert item['synced_to_obsidian'] is True
+    assert 'sync_pending' not in item
+
+def test_query_follows_pagination(dynamodb):
+    table = dynamodb.Table('tasks')
+    padding = 'x' * 20000
+    for i in range(60):
+        lambda_function.store_task(organized(f'Task {i} {padding}'), 'test')
+    
+    # 60 items of ~20 KB span more than one 1 MB page
+    assert len(query_unsynced_tasks(table)) == 60
+
+def test_backfill_adds_legacy_unsynced_tasks(dynamodb):
+    table = dynamodb.Table('tasks')
+    table.put_item(Item={'id': 'legacy', 'task': 'Old task', 'timestamp': '2024-01-01T00:00:00', 'synced_to_obsidian': False})
+    table.put_item(Item={'id': 'done', 'task': 'Old synced task', 'timestamp': '2024-01-01T00:00:00', 'synced_to_obsidian': True})
+    
+    assert backfill_sync_index(table) == 1
+    assert [item['id'] for item in query_unsynced_tasks(table)] == ['legacy']
+
+def test_sync_writes_notes_and_empties_index(dynamodb, monkeypatch, tmp_path):
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(tmp_path))
+    lambda_function.store_task(organized('Renew passport'), 'test')
+    
+    sync_obsidian.sync_to_obsidian()
+    
+    assert len(list((tmp_path / 'Tasks' / 'Personal').glob('*.md'))) == 1
+    assert query_unsynced_tasks(dynamodb.Table('tasks')) == []
+
+def test_task_links_are_found_in_both_directions(dynamodb):
+    tasks = dynamodb.Table('tasks')
+    links = dynamodb.Table('task-links')
+    for task_id, text in [('a', 'Plan party'), ('b', 'Buy wine'), ('c', 'Send invites')]:
+        tasks.put_item(Item={'id': task_id, 'task': text})
+    links.put_item(Item={'source_task_id': 'a', 'target_task_id': 'b', 'link_type': 'related'})
+    links.put_item(Item={'source_task_id': 'c', 'target_task_id': 'a', 'link_type': 'related'})
+    
+    assert [link['source_task_id'] for link in query_incoming_links(links, 'a')] == ['c']
+    
+    result = sync_obsidian.get_task_links('a')
+    assert {(link['id'], link['direction']) for link in result} == {('b', 'outgoing'), ('c', 'incoming')}
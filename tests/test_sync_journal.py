@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched, checkpointed Obsidian sync
+"""
+
+import lambda_function
+import sync_obsidian
+from shared.task_store import DynamoDBTaskStore
+from shared.task_utils import batch_mark_tasks_synced, query_unsynced_tasks
+from sync_journal import SyncJournal
+
+def organized(text):
+    return {'task': text, 'category': 'Personal', 'priority': 'medium', 'estimated_time': 30, 'tags': ['errand']}
+
+def test_batch_mark_updates_only_the_sync_attributes(dynamodb):
+    table = dynamodb.Table('tasks')
+    for i in range(130):
+        lambda_function.store_task(organized(f'Task {i}'), 'test')
+    items = query_unsynced_tasks(table)
+    
+    # Written after the index read; a whole-item rewrite would revert these
+    table.update_item(Key={'id': items[0]['id']}, UpdateExpression='SET link_status = :s, completed = :c',
+                      ExpressionAttributeValues={':s': 'linked', ':c': True})
+    table.delete_item(Key={'id': items[1]['id']})
+    
+    # moto's transactions aren't thread-safe, so chunks go one at a time here
+    assert batch_mark_tasks_synced(table, [item['id'] for item in items], max_workers=1) == 2
+    
+    assert query_unsynced_tasks(table) == []
+    item = table.get_item(Key={'id': items[0]['id']})['Item']
+    assert item['synced_to_obsidian'] is True
+    assert (item['link_status'], item['completed'], item['tags']) == ('linked', True, ['errand'])
+    assert 'Item' not in table.get_item(Key={'id': items[1]['id']})
+
+def test_journal_round_trip(tmp_path):
+    journal = SyncJournal(tmp_path / 'journal')
+    journal.record('a')
+    journal.record('b')
+    journal.checkpoint()
+    
+    assert SyncJournal(tmp_path / 'journal').pending() == {'a', 'b'}
+    
+    journal.forget(['a'])
+    assert journal.pending() == {'b'}
+    journal.forget(['b'])
+    assert not (tmp_path / 'journal').exists()
+
+def test_interrupted_sync_resumes_without_rewriting(dynamodb, monkeypatch, tmp_path, sync_journal_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    ids = [lambda_function.store_task(organized(f'Task {i}'), 'test') for i in range(3)]
+    
+    def fail(*args, **kwargs):
+        raise RuntimeError("connection lost")
+    
+    mark_synced = DynamoDBTaskStore.mark_synced
+    monkeypatch.setattr(DynamoDBTaskStore, 'mark_synced', fail)
+    sync_obsidian.sync_to_obsidian()
+    
+    assert len(list((vault / 'Tasks' / 'Personal').glob('*.md'))) == 3
+    assert SyncJournal(sync_journal_path).pending() == set(ids)
+    
+    # Journaled notes are not written again, so removed files stay removed
+    for note in (vault / 'Tasks' / 'Personal').glob('*.md'):
+        note.unlink()
+    monkeypatch.setattr(DynamoDBTaskStore, 'mark_synced', mark_synced)
+    sync_obsidian.sync_to_obsidian()
+    
+    assert list((vault / 'Tasks' / 'Personal').glob('*.md')) == []
+    assert query_unsynced_tasks(dynamodb.Table('tasks')) == []
+    assert not sync_journal_path.exists()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the local task agent and the thin add_task client
+"""
+
+import threading
+
+import add_task
+from task_agent import TaskAgent
+from task_spool import TaskSpool, task_id_for
+
+class FakeResponse:
+    status_code = 200
+    text = ''
+    
+    def __init__(self, payload):
+        self.payload = payload
+    
+    def json(self):
+        return self.payload
+
+class FakeSession:
+    """Records batch posts and answers like the task API"""
+    
+    def __init__(self):
+        self.posts = []
+    
+    def post(self, url, json=None, **kwargs):
+        self.posts.append(json)
+        return FakeResponse({
+            'ids': [task_id_for(entry['idempotency_key']) for entry in json['tasks']],
+            'organized_tasks': [
+                {'task': entry['task'], 'category': 'Work', 'priority': 'high'} for entry in json['tasks']
+            ]
+        })
+
+def start_agent(tmp_path, monkeypatch, notifier=None):
+    socket_path = tmp_path / 'agent.sock'
+    monkeypatch.setenv('TASK_AGENT_SOCKET', str(socket_path))
+    monkeypatch.setenv('TASK_SPOOL_PATH', str(tmp_path / 'spool.sqlite'))
+    agent = TaskAgent('https://example.test/task', socket_path, spool=TaskSpool(tmp_path / 'spool.sqlite'),
+                      session=FakeSession(), notifier=notifier or (lambda title, message: None))
+    agent.start()
+    return agent
+
+def test_client_waits_for_the_classification(tmp_path, monkeypatch, capsys):
+    agent = start_agent(tmp_path, monkeypatch)
+    try:
+        add_task.submit_task('Prepare slides')
+    finally:
+        agent.stop()
+    
+    assert "Task organized: Work" in capsys.readouterr().out
+    [post] = agent.session.posts
+    assert [entry['task'] for entry in post['tasks']] == ['Prepare slides']
+
+def test_fire_and_forget_notifies_later(tmp_path, monkeypatch, capsys):
+    notified = threading.Event()
+    messages = []
+    def notifier(title, message):
+        messages.append((title, message))
+        notified.set()
+    
+    agent = start_agent(tmp_path, monkeypatch, notifier)
+    try:
+        add_task.submit_task('Prepare slides', wait=False)
+        assert "Task sent" in capsys.readouterr().out
+        assert notified.wait(5)
+    finally:
+        agent.stop()
+    
+    assert messages == [('Task organized', 'Work, high priority: Prepare slides')]
+
+def test_client_sends_directly_without_an_agent(tmp_path, monkeypatch):
+    monkeypatch.setenv('TASK_AGENT_SOCKET', str(tmp_path / 'missing.sock'))
+    monkeypatch.setenv('TASK_SPOOL_PATH', str(tmp_path / 'spool.sqlite'))
+    monkeypatch.setenv('TASK_API_ENDPOINT', 'https://example.test/task')
+    sent = []
+    monkeypatch.setattr(add_task, 'flush_directly', lambda spool, key, endpoint: sent.append(key))
+    monkeypatch.setattr('sys.argv', ['add_task.py', 'Buy', 'milk'])
+    
+    add_task.main()
+    
+    [key] = sent
+    assert TaskSpool(tmp_path / 'spool.sqlite').due()[0]['key'] == key
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline task spool and idempotent batch ingestion
+"""
+
+import json
+
+import lambda_function
+from task_spool import PENDING, REJECTED, SENT, TaskSpool, flush_spool
+from tests.fakes import FakeBedrockClient
+from tests.test_batch_ingest import batch_responder
+
+class LambdaSession:
+    """Posts straight into lambda_handler, optionally failing the first calls"""
+    
+    def __init__(self, failures=0, status_code=None):
+        self.failures = failures
+        self.status_code = status_code
+        self.calls = 0
+    
+    def post(self, url, json=None, **kwargs):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("network is down")
+        response = lambda_function.lambda_handler({'body': json}, None)
+        return Response(self.status_code or response['statusCode'], response['body'])
+
+class Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = body
+    
+    def json(self):
+        return json.loads(self.text)
+
+def test_offline_tasks_are_kept_and_flushed_in_bulk(dynamodb, bedrock_only, monkeypatch, tmp_path):
+    bedrock = FakeBedrockClient(batch_responder)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    spool = TaskSpool(tmp_path / 'spool.sqlite')
+    keys = [spool.append(f'Buy item {i}') for i in range(120)]
+    
+    session = LambdaSession(failures=1)
+    assert flush_spool(spool, session, 'https://example.test/task') == (0, 50)
+    assert spool.pending_count() == 120
+    
+    # Failed tasks wait for their retry time
+    assert len(spool.due(now=0)) == 0
+    monkeypatch.setattr('time.time', lambda: 1e12)
+    assert flush_spool(spool, session, 'https://example.test/task') == (120, 0)
+    
+    assert session.calls == 4
+    assert len(dynamodb.Table('tasks').scan()['Items']) == 120
+    state, result, error = spool.status(keys[0])
+    assert state == SENT
+    assert (result['task'], result['category']) == ('Buy item 0', 'Shopping')
+
+def test_retried_batches_do_not_duplicate_tasks(dynamodb, bedrock_only, monkeypatch):
+    bedrock = FakeBedrockClient(batch_responder)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    body = json.dumps({'tasks': [
+        {'task': 'Buy milk', 'idempotency_key': 'a'},
+        {'task': 'Buy eggs', 'idempotency_key': 'b'}
+    ]})
+    
+    first = json.loads(lambda_function.lambda_handler({'body': body}, None)['body'])
+    calls = bedrock.calls
+    retried = json.loads(lambda_function.lambda_handler({'body': body}, None)['body'])
+    
+    assert retried['ids'] == first['ids']
+    assert retried['organized_tasks'][1]['task'] == 'Buy eggs'
+    assert bedrock.calls == calls
+    assert len(dynamodb.Table('tasks').scan()['Items']) == 2
+
+def test_rejected_batches_are_not_retried(tmp_path):
+    spool = TaskSpool(tmp_path / 'spool.sqlite')
+    key = spool.append('Buy milk')
+    
+    session = LambdaSession(status_code=400)
+    session.post = lambda url, json=None, **kwargs: Response(400, '{"error": "bad request"}')
+    assert flush_spool(spool, session, 'https://example.test/task') == (0, 1)
+    
+    assert spool.status(key)[0] == REJECTED
+    assert spool.pending_count() == 0
+
+def test_blank_tasks_do_not_shift_batch_results(dynamodb, bedrock_only, monkeypatch, tmp_path):
+    bedrock = FakeBedrockClient(batch_responder)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: bedrock)
+    spool = TaskSpool(tmp_path / 'spool.sqlite')
+    first = spool.append('Buy milk')
+    blank = spool.append('')
+    last = spool.append('Buy eggs')
+    
+    assert flush_spool(spool, LambdaSession(), 'https://example.test/task') == (2, 1)
+    
+    assert spool.status(first)[1]['task'] == 'Buy milk'
+    assert spool.status(last)[1]['task'] == 'Buy eggs'
+    assert spool.status(blank)[0] == REJECTED
+    assert spool.pending_count() == 0
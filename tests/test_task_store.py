@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the DynamoDB and SQLite task stores
+"""
+
+import json
+
+import pytest
+
+import lambda_function
+import sync_obsidian
+from shared.task_store import DynamoDBTaskStore, SqliteTaskStore, create_task_store
+from shared.task_utils import build_task_item
+from tests.fakes import FakeBedrockClient, link_numbers
+from tests.test_batch_ingest import batch_responder
+from vault_manifest import VaultManifest
+
+def organized(text, category='Personal'):
+    return {'task': text, 'category': category, 'priority': 'medium', 'estimated_time': 30, 'tags': ['errand']}
+
+@pytest.fixture(params=['dynamodb', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        yield SqliteTaskStore(tmp_path / 'tasks.sqlite')
+    else:
+        yield DynamoDBTaskStore(request.getfixturevalue('dynamodb'))
+
+def test_tasks_round_trip(store):
+    store.put_tasks([build_task_item(f't{i}', organized(f'Task {i}'), 'test') for i in range(3)])
+    store.put_task(build_task_item('t3', organized('Task 3', 'Work'), 'test', link_status='pending'))
+    
+    found = store.get_tasks(['t0', 't3', 'missing', 't0'], attributes=('id', 'task', 'tags'))
+    assert found == {'t0': {'id': 't0', 'task': 'Task 0', 'tags': ['errand']},
+                     't3': {'id': 't3', 'task': 'Task 3', 'tags': ['errand']}}
+    assert sorted(task['id'] for task in store.scan_tasks(('id', 'category'))) == ['t0', 't1', 't2', 't3']
+    
+    store.set_link_status('t3', 'done')
+    assert store.get_tasks(['t3'])['t3']['link_status'] == 'done'
+
+def test_sync_state(store):
+    store.put_tasks([build_task_item(f't{i}', organized(f'Task {i}'), 'test') for i in range(4)])
+    
+    unsynced = store.unsynced_tasks()
+    assert len(unsynced) == 4
+    store.mark_synced(unsynced[:2])
+    store.mark_synced_ids(['t2'])
+    
+    assert [task['id'] for task in store.unsynced_tasks()] == ['t3']
+    assert store.get_tasks(['t0'])['t0']['synced_to_obsidian'] is True
+    
+    assert store.set_completed({'t0': True, 'deleted': True}, '2024-05-01T10:00:00') == 1
+    assert store.get_tasks(['t0'])['t0']['completed_at'] == '2024-05-01T10:00:00'
+    assert store.set_completed({'t0': False}) == 1
+    assert 'completed_at' not in store.get_tasks(['t0'])['t0']
+
+def test_links_in_both_directions(store):
+    store.put_links([
+        {'source_task_id': 'a', 'target_task_id': 'b', 'link_type': 'related', 'created_at': '2024-05-01'},
+        {'source_task_id': 'c', 'target_task_id': 'b', 'link_type': 'related', 'created_at': '2024-05-01'}
+    ])
+    
+    assert [link['target_task_id'] for link in store.outgoing_links('a')] == ['b']
+    assert sorted(link['source_task_id'] for link in store.incoming_links('b')) == ['a', 'c']
+    assert store.outgoing_links('b') == []
+
+def test_sqlite_store_uses_its_indexes(tmp_path):
+    store = SqliteTaskStore(tmp_path / 'tasks.sqlite')
+    
+    def plan(sql, *params):
+        return ' '.join(row[-1] for row in store.db.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+    
+    assert 'tasks_unsynced' in plan('SELECT item FROM tasks WHERE sync_pending = ? ORDER BY timestamp', 'pending')
+    assert 'tasks_category' in plan('SELECT id FROM tasks WHERE category = ?', 'Work')
+    assert 'task_links_target' in plan('SELECT source_task_id FROM task_links WHERE target_task_id = ?', 'b')
+
+def test_create_task_store(tmp_path, monkeypatch):
+    monkeypatch.setenv('TASK_STORE', f'sqlite:{tmp_path / "tasks.sqlite"}')
+    assert isinstance(create_task_store(), SqliteTaskStore)
+    
+    with pytest.raises(ValueError):
+        create_task_store('postgres://localhost')
+
+def test_sqlite_runs_make_no_aws_calls(bedrock_only, monkeypatch, tmp_path):
+    import boto3
+    
+    def no_aws(*args, **kwargs):
+        raise AssertionError("boto3 used by a SQLite-backed run")
+    monkeypatch.setattr(boto3, 'resource', no_aws)
+    monkeypatch.setattr(boto3, 'client', no_aws)
+    monkeypatch.setattr(lambda_function, 'TASK_STORE', f'sqlite:{tmp_path / "tasks.sqlite"}')
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: FakeBedrockClient(batch_responder))
+    
+    response = lambda_function.lambda_handler({'body': json.dumps({'task': 'Buy wine for the dinner party'})}, None)
+    
+    assert response['statusCode'] == 200
+    assert lambda_function.get_organization_cache().shared is None
+
+def test_pipeline_links_and_sync_run_on_sqlite(bedrock_only, monkeypatch, tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    monkeypatch.setenv('TASK_STORE', f'sqlite:{tmp_path / "tasks.sqlite"}')
+    monkeypatch.setattr(lambda_function, 'TASK_STORE', f'sqlite:{tmp_path / "tasks.sqlite"}')
+    
+    def responder(prompt):
+        # Link every candidate offered
+        if prompt.startswith('Analyze if this new task'):
+            return json.dumps(link_numbers(prompt))
+        return batch_responder(prompt)
+    monkeypatch.setattr(lambda_function, 'get_bedrock_client', lambda: FakeBedrockClient(responder))
+    
+    lambda_function.lambda_handler({'body': json.dumps({'task': 'Buy wine for the dinner party'})}, None)
+    response = lambda_function.lambda_handler({'body': json.dumps({'task': 'Buy cheese for the dinner party'})}, None)
+    new_id = json.loads(response['body'])['id']
+    
+    assert sync_obsidian.sync_to_obsidian() == 2
+    
+    store = lambda_function.get_task_store()
+    assert store.unsynced_tasks() == []
+    [link] = store.outgoing_links(new_id)
+    note = vault / VaultManifest(tmp_path / 'vault_manifest.sqlite').path_for(new_id)
+    assert 'Buy wine for the dinner party' in note.read_text()
+    assert store.get_tasks([link['target_task_id']])[link['target_task_id']]['category'] == 'Shopping'
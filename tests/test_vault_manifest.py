@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the vault manifest and exact note links
+"""
+
+import lambda_function
+import sync_obsidian
+from tests.fakes import FakeTaskStream
+from vault_manifest import VaultManifest
+
+def organized(text, priority='medium'):
+    return {'task': text, 'category': 'Personal', 'priority': priority, 'estimated_time': 30, 'tags': []}
+
+def test_manifest_round_trip(tmp_path):
+    manifest = VaultManifest(tmp_path / 'manifest.sqlite')
+    manifest.record_many([(f'task-{i}', f'Tasks/Work/{i}.md', 'hash', i, 100, False) for i in range(1200)])
+    
+    assert manifest.path_for('task-7') == 'Tasks/Work/7.md'
+    assert len(manifest.entries(f'task-{i}' for i in range(0, 1200, 2))) == 600
+    
+    manifest.remove('task-7')
+    assert manifest.get('task-7') is None
+    manifest.close()
+
+def test_notes_link_to_real_files(dynamodb, monkeypatch, tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    first = lambda_function.store_task(organized('Plan party'), 'test')
+    second = lambda_function.store_task(organized('Buy wine'), 'test')
+    dynamodb.Table('task-links').put_item(Item={'source_task_id': second, 'target_task_id': first})
+    
+    sync_obsidian.sync_to_obsidian()
+    
+    manifest = VaultManifest(tmp_path / 'vault_manifest.sqlite')
+    first_path = manifest.path_for(first)
+    second_note = (vault / manifest.path_for(second)).read_text()
+    assert f"[[{first_path[:-3]}|Plan party]]" in second_note
+    assert (vault / first_path).exists()
+
+def test_updates_replace_the_existing_note(dynamodb, monkeypatch, tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    stream = FakeTaskStream(dynamodb.Table('tasks'))
+    task_id = lambda_function.store_task(organized('Renew passport'), 'test')
+    stream.capture(task_id)
+    lambda_function.changelog_handler(stream.event(), None)
+    sync_obsidian.sync_changes()
+    
+    stream.update(task_id, priority='high')
+    lambda_function.changelog_handler(stream.event(), None)
+    sync_obsidian.sync_changes()
+    
+    [note] = list(vault.glob('Tasks/*/*.md'))
+    assert note.name.startswith('high-')
+    assert VaultManifest(tmp_path / 'vault_manifest.sqlite').path_for(task_id) == str(note.relative_to(vault))
+
+def test_notes_from_before_the_manifest_are_replaced_once(dynamodb, monkeypatch, tmp_path):
+    vault = tmp_path / 'vault'
+    monkeypatch.setenv('OBSIDIAN_VAULT_PATH', str(vault))
+    task_id = lambda_function.store_task(organized('Renew passport'), 'test')
+    old_note = vault / 'Tasks' / 'Work' / f'low-Renew-passport-{task_id[:8]}.md'
+    old_note.parent.mkdir(parents=True)
+    old_note.write_text('old')
+    
+    sync_obsidian.sync_to_obsidian()
+    
+    assert not old_note.exists()
+    [note] = list(vault.glob('Tasks/*/*.md'))
+    
+    # With notes in the manifest, legacy notes are only looked for on request
+    manifest = VaultManifest(tmp_path / 'vault_manifest.sqlite')
+    assert sync_obsidian.legacy_notes(vault, manifest) == {}
+    monkeypatch.setenv('VAULT_MIGRATE_NOTES', '1')
+    assert sync_obsidian.legacy_notes(vault, manifest) == {task_id[:8]: [note]}
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel, atomic vault writer
+"""
+
+import pytest
+
+import vault_writer
+from vault_writer import VaultWriter, render_note
+
+def task(i, **fields):
+    item = {
+        'id': f'{i:08d}-task', 'task': f'Task {i}', 'category': 'Work', 'priority': 'medium',
+        'source': 'test', 'timestamp': '2024-01-01T00:00:00', 'tags': ['work']
+    }
+    item.update(fields)
+    return item
+
+def test_writes_many_notes_and_skips_unchanged(tmp_path):
+    notes = [render_note(task(i), tmp_path, []) for i in range(200)]
+    writer = VaultWriter(max_workers=4)
+    
+    assert all(writer.write_notes(notes))
+    assert len(list((tmp_path / 'Tasks' / 'Work').glob('*.md'))) == 200
+    
+    # A fresh writer still recognises unchanged files on disk
+    rewriter = VaultWriter(max_workers=4)
+    changed = render_note(task(0, completed=True), tmp_path, [])
+    assert rewriter.write_notes([changed] + notes[1:]) == [True] + [False] * 199
+    assert '- [x] Task 0' in changed[0].read_text()
+    assert (rewriter.written, rewriter.unchanged) == (1, 199)
+
+def test_failed_write_leaves_old_note_and_no_temp_file(tmp_path, monkeypatch):
+    path, content = render_note(task(1), tmp_path, [])
+    VaultWriter().write_notes([(path, content)])
+    
+    def broken_fsync(fd):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(vault_writer.os, 'fsync', broken_fsync)
+    with pytest.raises(OSError):
+        VaultWriter().write_notes([(path, content + 'more')])
+    
+    assert path.read_text() == content
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+def test_related_tasks_are_linked(tmp_path):
+    _, content = render_note(task(1), tmp_path, [{'id': '00000002-task', 'task': 'Task 2'}])
+    
+    assert '- [[*-*-Task 2-00000002|Task 2]]' in content
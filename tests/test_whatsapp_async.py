@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the immediate WhatsApp acknowledgement and queued confirmations
+"""
+
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+import whatsapp_webhook
+from shared.bedrock_client import ResilientBedrockClient
+from shared.job_queue import InProcessJobQueue
+from shared.messaging import LocalMessenger, TwilioMessenger, format_confirmation
+from shared.pipeline import TaskPipeline
+from shared.task_utils import TaskOrganizer
+from tests.fakes import FakeBedrockClient
+
+TWILIO_NUMBER = 'whatsapp:+15550000'
+
+def organize_responder(prompt):
+    return json.dumps({'category': 'Work', 'priority': 'high', 'estimated_time': 45, 'tags': []})
+
+def webhook_event(text, sender, sid):
+    return {'body': urlencode({'Body': text, 'From': sender, 'To': TWILIO_NUMBER, 'MessageSid': sid})}
+
+def sqs_event(jobs):
+    return {'Records': [{'messageId': f'm{i}', 'body': json.dumps(job)} for i, job in enumerate(jobs)]}
+
+@pytest.fixture
+def bedrock():
+    return FakeBedrockClient(organize_responder)
+
+@pytest.fixture
+def webhook(dynamodb, bedrock, monkeypatch):
+    """Webhook with an in-memory ingest queue and a recording messenger"""
+    organizer = TaskOrganizer(bedrock=ResilientBedrockClient(client=bedrock), local_threshold=1.1)
+    queue = InProcessJobQueue()
+    monkeypatch.setattr(whatsapp_webhook, '_ingestor', TaskPipeline(organizer))
+    monkeypatch.setattr(whatsapp_webhook, '_messenger', LocalMessenger())
+    monkeypatch.setattr(whatsapp_webhook, 'get_ingest_queue', lambda: queue)
+    return queue
+
+def test_webhook_acknowledges_without_organizing(dynamodb, bedrock, webhook):
+    response = whatsapp_webhook.lambda_handler(webhook_event('Review the budget', 'whatsapp:+15550100', 'SM1'), None)
+    
+    assert response['body'].endswith('<Response/>')
+    assert bedrock.calls == 0
+    assert dynamodb.Table('tasks').scan()['Items'] == []
+    assert webhook.receive() == [{'message_sid': 'SM1', 'body': 'Review the budget',
+                                  'from': 'whatsapp:+15550100', 'to': TWILIO_NUMBER}]
+
+def test_confirmations_are_coalesced_per_sender(dynamodb, webhook):
+    for sid, text, sender in (('SM1', 'Review the budget', 'whatsapp:+15550100'),
+                              ('SM2', 'Draft the roadmap', 'whatsapp:+15550100'),
+                              ('SM3', 'Prepare the demo', 'whatsapp:+15550199')):
+        whatsapp_webhook.lambda_handler(webhook_event(text, sender, sid), None)
+    
+    result = whatsapp_webhook.lambda_handler(sqs_event(webhook.receive()), None)
+    
+    assert result == {'batchItemFailures': []}
+    assert len(dynamodb.Table('tasks').scan()['Items']) == 3
+    sent = whatsapp_webhook._messenger.sent
+    assert [(sender, recipient) for sender, recipient, _ in sent] == [
+        (TWILIO_NUMBER, 'whatsapp:+15550100'), (TWILIO_NUMBER, 'whatsapp:+15550199')
+    ]
+    assert sent[0][2].splitlines() == [
+        "✅ 2 tasks organized!",
+        "• Review the budget: Work, high, 45 min",
+        "• Draft the roadmap: Work, high, 45 min"
+    ]
+    assert sent[1][2] == format_confirmation([{'category': 'Work', 'priority': 'high', 'estimated_time': 45}])
+
+def test_redelivered_messages_are_not_stored_twice(dynamodb, bedrock, webhook):
+    job = {'message_sid': 'SM1', 'body': 'Review the budget', 'from': 'whatsapp:+15550100', 'to': TWILIO_NUMBER}
+    
+    whatsapp_webhook.lambda_handler(sqs_event([job]), None)
+    whatsapp_webhook.lambda_handler(sqs_event([job]), None)
+    
+    assert bedrock.calls == 1
+    assert len(dynamodb.Table('tasks').scan()['Items']) == 1
+    assert len(whatsapp_webhook._messenger.sent) == 2
+
+def test_failed_confirmations_are_retried(dynamodb, webhook, monkeypatch):
+    def fail(sender, recipient, body):
+        raise ConnectionError("network is down")
+    monkeypatch.setattr(whatsapp_webhook._messenger, 'send', fail)
+    job = {'message_sid': 'SM1', 'body': 'Review the budget', 'from': 'whatsapp:+15550100', 'to': TWILIO_NUMBER}
+    
+    result = whatsapp_webhook.lambda_handler(sqs_event([job]), None)
+    
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'm0'}]}
+
+def test_twilio_messenger_posts_to_the_messages_api():
+    posts = []
+    class Session:
+        def post(self, url, **kwargs):
+            posts.append((url, kwargs))
+            return type('Response', (), {'status_code': 201, 'text': ''})()
+    
+    TwilioMessenger('AC123', 'secret', Session()).send(TWILIO_NUMBER, 'whatsapp:+15550100', 'Hello')
+    
+    [(url, kwargs)] = posts
+    assert url == 'https://api.twilio.com/2010-04-01/Accounts/AC123/Messages.json'
+    assert kwargs['data'] == {'From': TWILIO_NUMBER, 'To': 'whatsapp:+15550100', 'Body': 'Hello'}
+    assert kwargs['auth'] == ('AC123', 'secret')
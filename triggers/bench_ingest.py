@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the WhatsApp webhook with in-process and HTTP ingestion
+Drives the webhook handler against moto DynamoDB and a fake Bedrock with
+a fixed model latency. The HTTP path posts to a local server running the
+task organizer Lambda handler, so the gap measured here is the extra hop
+alone; deployed, the HTTP path also pays for API Gateway and a second
+Lambda invocation (and its cold starts).
+
+Usage: bench_ingest.py [runs] [bedrock_ms]
+"""
+
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).parent.parent
+for path in (ROOT, ROOT / 'aws', ROOT / 'triggers' / 'whatsapp'):
+    sys.path.append(str(path))
+
+for name, value in (('AWS_DEFAULT_REGION', 'us-east-1'), ('AWS_ACCESS_KEY_ID', 'testing'),
+                    ('AWS_SECRET_ACCESS_KEY', 'testing')):
+    os.environ.setdefault(name, value)
+
+def organize_responder(prompt):
+    return json.dumps({'category': 'Work', 'priority': 'medium', 'estimated_time': 30, 'tags': ['bench']})
+
+class LambdaApi(BaseHTTPRequestHandler):
+    """Runs the task organizer Lambda handler for every POST, like API Gateway"""
+    
+    def do_POST(self):
+        import lambda_function
+        
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8')
+        response = lambda_function.lambda_handler({'body': body}, None)
+        reply = response['body'].encode('utf-8')
+        self.send_response(response['statusCode'])
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+    
+    def log_message(self, *args):
+        pass
+
+def time_runs(webhook, runs, label):
+    timings = []
+    for i in range(runs):
+        event = {'body': urlencode({'Body': f'Benchmark {label} message {i}', 'From': 'whatsapp:+15550100'})}
+        start = time.perf_counter()
+        response = webhook.lambda_handler(event, None)
+        timings.append(time.perf_counter() - start)
+        assert 'Task organized' in response['body'], response['body']
+    return {
+        'runs': runs,
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'p95_ms': round(sorted(timings)[int(0.95 * (runs - 1))] * 1000, 1)
+    }
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    bedrock_latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.3
+    
+    import boto3
+    from moto import mock_aws
+    
+    import lambda_function
+    import whatsapp_webhook
+    from shared.bedrock_client import ResilientBedrockClient
+    from shared.link_queue import InProcessLinkQueue
+    from shared.pipeline import HttpIngestor, TaskPipeline
+    from shared.task_utils import TaskOrganizer
+    from tests.fakes import FakeBedrockClient, create_tables
+    
+    with mock_aws():
+        create_tables(boto3.resource('dynamodb'))
+        
+        # Both paths send every task to Bedrock and enqueue its link job
+        bedrock = FakeBedrockClient(organize_responder, latency=bedrock_latency)
+        lambda_function.LOCAL_CONFIDENCE_THRESHOLD = 1.1
+        lambda_function._bedrock_client = ResilientBedrockClient(client=bedrock)
+        lambda_function.get_link_queue = InProcessLinkQueue
+        
+        organizer = TaskOrganizer(bedrock=ResilientBedrockClient(client=bedrock), local_threshold=1.1)
+        whatsapp_webhook._ingestor = TaskPipeline(organizer, InProcessLinkQueue())
+        results = {'direct': time_runs(whatsapp_webhook, runs, 'direct')}
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), LambdaApi)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        whatsapp_webhook._ingestor = HttpIngestor(f"http://127.0.0.1:{server.server_port}/task")
+        try:
+            results['http'] = time_runs(whatsapp_webhook, runs, 'http')
+        finally:
+            server.shutdown()
+    
+    results['bedrock_latency_ms'] = round(bedrock_latency * 1000, 1)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
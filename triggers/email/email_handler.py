@@ -4,11 +4,27 @@ Deploy this as a Lambda function triggered by SES
 """
 
 import json
-import requests
 import os
-import email
-from email.mime.text import MIMEText
 
+from shared import metrics
+from shared.email_ingest import read_email_tasks
+from shared.pipeline import IngestError, create_ingestor
+
+# Where the SES receipt rule's S3 action stores raw messages, as
+# s3://bucket/prefix or a local directory; without it only the subject is read
+EMAIL_STORE_URI = os.environ.get('EMAIL_STORE_URI')
+
+# Organizer used for every email in this container; TASK_INGEST_MODE
+# picks the in-process pipeline (default) or the task API
+_ingestor = None
+
+def get_ingestor():
+    global _ingestor
+    if _ingestor is None:
+        _ingestor = create_ingestor()
+    return _ingestor
+
+@metrics.instrument
 def lambda_handler(event, context):
     """Handle incoming emails from SES"""
     try:
@@ -24,61 +40,66 @@ def lambda_handler(event, context):
         return {'statusCode': 500, 'body': str(e)}
 
 def handle_ses_email(ses_data):
-    """Process SES email data"""
+    """Process SES email data
+    
+    Every bullet or checkbox line in the body becomes a task; an email
+    without any is one task named by its subject.
+    """
     mail = ses_data['mail']
+    message_id = mail.get('messageId')
     
     # Extract email details
     subject = mail['commonHeaders']['subject']
     sender = mail['commonHeaders']['from'][0]
     
-    # Get message content (simplified - in real implementation, 
-    # you'd parse the full email content from S3)
-    task_content = f"{subject}"
-    
     # Only process emails with specific subject prefix
     if not subject.lower().startswith('[task]'):
         print(f"Ignoring email without [task] prefix: {subject}")
         return
     
-    # Remove [task] prefix
-    task_content = subject[6:].strip()
-    
-    # Forward to main task organizer
-    task_api_endpoint = os.environ['TASK_API_ENDPOINT']
-    
-    payload = {
-        'task': task_content,
-        'source': f'email:{sender}'
-    }
+    tasks = []
+    if EMAIL_STORE_URI and message_id:
+        tasks = read_email_tasks(EMAIL_STORE_URI, message_id)
+    if not tasks:
+        # Remove [task] prefix
+        tasks = [subject[6:].strip()]
     
-    response = requests.post(task_api_endpoint, json=payload, timeout=10)
+    keys = [f"{message_id}:{i}" if message_id else None for i in range(len(tasks))]
+    try:
+        result = get_ingestor().ingest_many(tasks, f'email:{sender}', idempotency_keys=keys)
+    except IngestError as e:
+        print(f"❌ Failed to organize tasks from email: {str(e)}")
+        return
     
-    if response.status_code == 200:
-        result = response.json()
-        organized_task = result.get('organized_task', {})
-        
-        # Send confirmation email back
-        send_confirmation_email(sender, organized_task)
-        print(f"✅ Task organized from email: {task_content}")
-    else:
-        print(f"❌ Failed to organize task from email: {response.text}")
+    # Send confirmation email back
+    send_confirmation_email(sender, result['organized_tasks'])
+    print(f"✅ {len(result['ids'])} tasks organized from email in {result['elapsed_ms']} ms")
 
-def send_confirmation_email(recipient, organized_task):
+def send_confirmation_email(recipient, organized_tasks):
     """Send confirmation email using SES"""
     import boto3
     
     ses = boto3.client('ses')
     
-    subject = f"✅ Task Organized: {organized_task.get('category', 'Unknown')}"
+    if len(organized_tasks) == 1:
+        subject = f"✅ Task Organized: {organized_tasks[0].get('category', 'Unknown')}"
+    else:
+        subject = f"✅ {len(organized_tasks)} Tasks Organized"
     
-    body = f"""Your task has been organized!
-
-Task: {organized_task.get('task', 'Unknown')}
+    details = "\n\n".join(
+        f"""Task: {organized_task.get('task', 'Unknown')}
 Category: {organized_task.get('category', 'Unknown')}
 Priority: {organized_task.get('priority', 'medium')}
-Estimated Time: {organized_task.get('estimated_time', 30)} minutes
+Estimated Time: {organized_task.get('estimated_time', 30)} minutes"""
+        for organized_task in organized_tasks
+    )
+    
+    noun = 'task has' if len(organized_tasks) == 1 else 'tasks have'
+    body = f"""Your {noun} been organized!
+
+{details}
 
-The task has been added to your Obsidian vault and will sync automatically.
+The {noun} been added to your Obsidian vault and will sync automatically.
 
 ---
 Task Organizer System
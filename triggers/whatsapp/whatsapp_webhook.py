@@ -4,12 +4,48 @@ Deploy this as a separate Lambda function
 """
 
 import json
-import requests
 import os
 from urllib.parse import parse_qs
 
+from shared import metrics
+from shared.job_queue import SqsJobQueue
+from shared.messaging import create_messenger, format_confirmation
+from shared.pipeline import IngestError, InvalidTask, create_ingestor
+
+# With a queue set, messages are acknowledged at once and organized by this
+# function's SQS invocations. The event source mapping's batching window
+# decides how long confirmations for one sender are collected into one.
+INGEST_QUEUE_URL = os.environ.get('INGEST_QUEUE_URL')
+
+# Organizer used for every message in this container; TASK_INGEST_MODE
+# picks the in-process pipeline (default) or the task API
+_ingestor = None
+_messenger = None
+
+def get_ingestor():
+    global _ingestor
+    if _ingestor is None:
+        _ingestor = create_ingestor()
+    return _ingestor
+
+def get_messenger():
+    global _messenger
+    if _messenger is None:
+        _messenger = create_messenger()
+    return _messenger
+
+def get_ingest_queue():
+    """Return the ingest job queue, or None when messages are organized inline"""
+    if not INGEST_QUEUE_URL:
+        return None
+    return SqsJobQueue(INGEST_QUEUE_URL)
+
+@metrics.instrument
 def lambda_handler(event, context):
-    """Handle WhatsApp messages from Twilio"""
+    """Handle WhatsApp messages from Twilio, or a batch of queued messages from SQS"""
+    if 'Records' in event:
+        return process_queued_messages(event)
+    
     try:
         # Parse Twilio webhook data
         body = event.get('body', '')
@@ -23,38 +59,74 @@ def lambda_handler(event, context):
         # Extract message details
         message_body = data.get('Body', [''])[0]
         from_number = data.get('From', [''])[0]
+        message_sid = data.get('MessageSid', [''])[0]
         
         if not message_body:
             return create_response("No message received")
         
-        # Forward to main task organizer
-        task_api_endpoint = os.environ['TASK_API_ENDPOINT']
-        
-        payload = {
-            'task': message_body,
-            'source': f'whatsapp:{from_number}'
-        }
-        
-        response = requests.post(task_api_endpoint, json=payload, timeout=10)
+        queue = get_ingest_queue()
+        if queue is not None:
+            try:
+                queue.enqueue({
+                    'message_sid': message_sid,
+                    'body': message_body,
+                    'from': from_number,
+                    'to': data.get('To', [''])[0]
+                })
+                return create_twilio_ack()
+            except Exception as e:
+                print(f"Ingest enqueue error: {str(e)}")
         
-        if response.status_code == 200:
-            result = response.json()
-            organized_task = result.get('organized_task', {})
-            
-            # Send confirmation back to WhatsApp
-            confirmation = f"✅ Task organized!\n"
-            confirmation += f"Category: {organized_task.get('category', 'Unknown')}\n"
-            confirmation += f"Priority: {organized_task.get('priority', 'medium')}\n"
-            confirmation += f"Est. time: {organized_task.get('estimated_time', 30)} min"
-            
-            return create_twilio_response(confirmation)
-        else:
+        try:
+            result = get_ingestor().ingest(message_body, f'whatsapp:{from_number}', idempotency_key=message_sid)
+        except IngestError as e:
+            print(f"Ingest error: {str(e)}")
             return create_twilio_response("❌ Failed to organize task")
+        
+        print(f"Task ingested in {result['elapsed_ms']} ms")
+        return create_twilio_response(format_confirmation([result['organized_task']]))
             
     except Exception as e:
         print(f"Error: {str(e)}")
         return create_twilio_response("❌ Error processing task")
 
+def process_queued_messages(event):
+    """Organize a batch of queued messages and send one confirmation per sender
+    
+    Messages are keyed on their Twilio MessageSid, so a redelivered message
+    is confirmed again without being organized or stored twice. Failed
+    messages are reported back to SQS for retry.
+    """
+    records = event['Records']
+    ingestor = get_ingestor()
+    failed = set()
+    by_sender = {}
+    
+    for index, record in enumerate(records):
+        job = json.loads(record['body'])
+        try:
+            result = ingestor.ingest(job['body'], f"whatsapp:{job['from']}",
+                                     idempotency_key=job.get('message_sid') or None)
+            organized = result['organized_task']
+            print(f"Task ingested in {result['elapsed_ms']} ms")
+        except InvalidTask:
+            organized = None
+        except Exception as e:
+            print(f"Ingest error: {str(e)}")
+            failed.add(index)
+            continue
+        by_sender.setdefault((job['to'], job['from']), []).append((index, organized))
+    
+    messenger = get_messenger()
+    for (twilio_number, sender), entries in by_sender.items():
+        try:
+            messenger.send(twilio_number, sender, format_confirmation([organized for _, organized in entries]))
+        except Exception as e:
+            print(f"Confirmation error: {str(e)}")
+            failed.update(index for index, _ in entries)
+    
+    return {'batchItemFailures': [{'itemIdentifier': records[index]['messageId']} for index in sorted(failed)]}
+
 def create_response(message):
     """Create standard HTTP response"""
     return {
@@ -62,6 +134,14 @@ def create_response(message):
         'body': json.dumps({'message': message})
     }
 
+def create_twilio_ack():
+    """Empty TwiML response; the confirmation follows as a separate message"""
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'text/xml'},
+        'body': '<?xml version="1.0" encoding="UTF-8"?>\n<Response/>'
+    }
+
 def create_twilio_response(message):
     """Create Twilio TwiML response"""
     twiml = f"""<?xml version="1.0" encoding="UTF-8"?>